@@ -1,33 +1,155 @@
 # api/api.py
 import requests
 import logging
-from assets.config import setup_logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+from assets.config import (
+    setup_logging,
+    STRAVA_API_URL,
+    STRAVA_PAGE_SIZE,
+    STRAVA_MAX_WORKERS,
+)
 from api.auth import get_strava_tokens
+from api.client import client
 
 # Setup logging for this module
 setup_logging()
 logger = logging.getLogger(__name__)
 
 
-def get_strava_activities() -> None:
+def fetch_activity_page(
+    page: int,
+    headers: dict,
+    per_page: int = STRAVA_PAGE_SIZE,
+    base_url: str = STRAVA_API_URL,
+    after: int = None,
+) -> list:
     """
-    Fetches all Strava activities for the authenticated user.
+    Fetches a single page of activities.
 
-    :return: JSON response containing Strava activities, or None if the request fails.
+    :param page: Page number (1-based).
+    :param headers: Request headers, including the authorization header.
+    :param per_page: Number of activities per page.
+    :param base_url: Base URL of the Strava API.
+    :param after: Only return activities that started after this epoch timestamp.
+    :return: List of activities on the page (empty past the last page).
+    """
+    params = {"per_page": per_page, "page": page}
+    if after is not None:
+        params["after"] = after
+    response = client.get(
+        f"{base_url}/athlete/activities", headers=headers, params=params
+    )
+    return response.json()
+
+
+def iter_strava_activity_pages(
+    access_token: str = None,
+    per_page: int = STRAVA_PAGE_SIZE,
+    max_workers: int = STRAVA_MAX_WORKERS,
+    base_url: str = STRAVA_API_URL,
+    after: int = None,
+) -> Iterator[list]:
+    """
+    Walks every page of the authenticated user's activities.
+
+    Up to `max_workers` pages are kept in flight at once. Pages are yielded in order
+    as soon as each one arrives, and no new pages are requested once a short (or
+    empty) page marks the end of the history.
+
+    :param access_token: Access token to use. Fetched with the refresh token if None.
+    :param per_page: Number of activities per page.
+    :param max_workers: Maximum number of concurrent page requests.
+    :param base_url: Base URL of the Strava API.
+    :param after: Only return activities that started after this epoch timestamp.
+    :return: Iterator over pages, each a list of activities as JSON dicts.
     """
-    access_token = get_strava_tokens()
     if access_token is None:
-        raise Exception("Failed to retrieve access token.")
+        access_token = get_strava_tokens()
+        if access_token is None:
+            raise Exception("Failed to retrieve access token.")
 
-    activities_url = "https://www.strava.com/api/v3/athlete/activities"
     headers = {"Authorization": "Bearer " + access_token}
-    params = {"per_page": 200, "page": 1}
 
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        next_page = 1
+        last_page_reached = False
+
+        def submit():
+            nonlocal next_page
+            in_flight.append(
+                executor.submit(
+                    fetch_activity_page, next_page, headers, per_page, base_url, after
+                )
+            )
+            next_page += 1
+
+        for _ in range(max_workers):
+            submit()
+
+        try:
+            while in_flight:
+                activities = in_flight.popleft().result()
+
+                if len(activities) < per_page:
+                    last_page_reached = True
+                elif not last_page_reached:
+                    submit()
+
+                yield activities
+        finally:
+            # Stop pending pages if the consumer bails out early or a page fails
+            for future in in_flight:
+                future.cancel()
+
+
+def iter_strava_activities(**kwargs) -> Iterator[dict]:
+    """
+    Walks every activity of the authenticated user, page by page.
+
+    :param kwargs: Passed on to iter_strava_activity_pages.
+    :return: Iterator over activities as JSON dicts.
+    """
+    for page in iter_strava_activity_pages(**kwargs):
+        yield from page
+
+
+def get_strava_activities(after: int = None) -> list:
+    """
+    Fetches all Strava activities for the authenticated user.
+
+    :param after: Only fetch activities that started after this epoch timestamp.
+    :return: JSON response containing Strava activities, or None if the request fails.
+    """
     try:
-        response = requests.get(activities_url, headers=headers, params=params)
-        response.raise_for_status()  # Raise exception for non-200 status codes
-        logger.info(f"API call successful.")
-        return response.json()  # Return the list of activities as JSON
+        activities = list(iter_strava_activities(after=after))
+        logger.info(f"API call successful. Fetched {len(activities)} activities.")
+        return activities  # Return the list of activities as JSON
     except requests.exceptions.RequestException as e:
         logger.error(f"Error occurred while fetching activities: {e}")
-        return None  # Return None if the request fails
\ No newline at end of file
+        return None  # Return None if the request fails
+
+
+def get_strava_activity(
+    activity_id: int, access_token: str = None, base_url: str = STRAVA_API_URL
+) -> dict:
+    """
+    Fetches a single activity.
+
+    :param activity_id: Strava activity id.
+    :param access_token: Access token to use. Fetched with the refresh token if None.
+    :param base_url: Base URL of the Strava API.
+    :return: The activity as a JSON dict.
+    """
+    if access_token is None:
+        access_token = get_strava_tokens()
+        if access_token is None:
+            raise Exception("Failed to retrieve access token.")
+
+    response = client.get(
+        f"{base_url}/activities/{activity_id}",
+        headers={"Authorization": "Bearer " + access_token},
+    )
+    return response.json()
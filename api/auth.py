@@ -1,9 +1,19 @@
 # api/auth.py
 import os
+import json
+import time
+import fcntl
+import threading
 import requests
 import logging
-from dotenv import load_dotenv, set_key
-from assets.config import setup_logging
+from dotenv import load_dotenv
+from assets.config import (
+    setup_logging,
+    STRAVA_OAUTH_URL,
+    TOKEN_CACHE_PATH,
+    TOKEN_EXPIRY_MARGIN,
+)
+from api.client import client
 
 # Load logging configuration
 setup_logging()
@@ -15,38 +25,124 @@ strava_client_id = os.getenv("STRAVA_CLIENT_ID")
 strava_client_secret = os.getenv("STRAVA_CLIENT_SECRET")
 strava_refresh_token = os.getenv("STRAVA_REFRESH_TOKEN")
 
+"""
+Access tokens are cached in-process and on disk until shortly before `expires_at`,
+so a sync only hits the OAuth endpoint when the current token is about to expire.
+"""
 
-def get_strava_tokens() -> str:
+# In-process token cache, guarded by a lock so threads refresh at most once
+token_cache = {}
+token_lock = threading.Lock()
+
+
+def is_token_fresh(token_data: dict, margin: int = TOKEN_EXPIRY_MARGIN) -> bool:
     """
-    Fetches a new Strava access token using the refresh token and updates the .env file.
+    Check whether a cached token is valid for at least `margin` more seconds.
 
-    :return: Access token as a string if successful, None otherwise.
+    :param token_data: Cached token data with "access_token" and "expires_at".
+    :param margin: Seconds before expiry at which the token is considered stale.
+    :return: True if the token can still be used.
+    """
+    return bool(token_data.get("access_token")) and (
+        token_data.get("expires_at", 0) - margin > time.time()
+    )
+
+
+def read_token_cache(cache_file: str = TOKEN_CACHE_PATH) -> dict:
+    """
+    Read the on-disk token cache.
+
+    :param cache_file: Path to the token cache file.
+    :return: Cached token data, or an empty dict if there is none.
+    """
+    try:
+        with open(cache_file) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_token_cache(token_data: dict, cache_file: str = TOKEN_CACHE_PATH) -> None:
+    """
+    Atomically write the on-disk token cache, readable only by the current user.
+
+    :param token_data: Token data to cache.
+    :param cache_file: Path to the token cache file.
     """
-    token_url = "https://www.strava.com/oauth/token"
+    tmp_file = cache_file + ".tmp"
+    fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump(token_data, f)
+    os.replace(tmp_file, cache_file)
+
+
+def refresh_strava_tokens(refresh_token: str) -> dict:
+    """
+    Exchange a refresh token for a new access token.
+
+    :param refresh_token: The current refresh token.
+    :return: Token data with "access_token", "refresh_token" and "expires_at".
+    """
+    token_url = f"{STRAVA_OAUTH_URL}/token"
     refresh_payload = {
         "client_id": strava_client_id,
         "client_secret": strava_client_secret,
-        "refresh_token": strava_refresh_token,
+        "refresh_token": refresh_token,
         "grant_type": "refresh_token",
     }
 
-    try:
-        response = requests.post(token_url, data=refresh_payload)
-        response.raise_for_status()  # Raise exception for non-200 status codes
-        data = response.json()
-        access_token = data.get("access_token")
-
-        if access_token:
-            # Load existing .env file and update the access token
-            env_file = "assets/.env"
-            load_dotenv(env_file)
-            set_key(env_file, "token", access_token)
-        else:
-            logger.warning("Access token not found in the response.")
-        return access_token
-    except requests.exceptions.RequestException as e:
-        logger.error("Error occurred while refreshing token: %s", e)
-        return None
+    data = client.post(token_url, data=refresh_payload).json()
+
+    return {
+        "access_token": data.get("access_token"),
+        # Strava may rotate the refresh token, keep whichever one is current
+        "refresh_token": data.get("refresh_token", refresh_token),
+        "expires_at": data.get("expires_at", 0),
+    }
+
+
+def get_strava_tokens(cache_file: str = TOKEN_CACHE_PATH) -> str:
+    """
+    Returns a valid Strava access token, refreshing it only when it is near expiry.
+
+    The token is looked up in the in-process cache first, then in the on-disk cache.
+    Refreshes are serialised with a thread lock and an exclusive file lock, so
+    concurrent workers (threads or processes) trigger a single OAuth request and
+    pick up the token it produced.
+
+    :param cache_file: Path to the token cache file.
+    :return: Access token as a string if successful, None otherwise.
+    """
+    if is_token_fresh(token_cache):
+        return token_cache["access_token"]
+
+    with token_lock:
+        if is_token_fresh(token_cache):
+            return token_cache["access_token"]
+
+        try:
+            with open(cache_file + ".lock", "w") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+
+                # Another process may have refreshed while we waited for the lock
+                cached = read_token_cache(cache_file)
+                if not is_token_fresh(cached):
+                    refresh_token = cached.get("refresh_token") or strava_refresh_token
+                    cached = refresh_strava_tokens(refresh_token)
+
+                    if not cached["access_token"]:
+                        logger.warning("Access token not found in the response.")
+                        return None
+
+                    write_token_cache(cached, cache_file)
+                    logger.info("Refreshed Strava access token.")
+
+            token_cache.clear()
+            token_cache.update(cached)
+            return token_cache["access_token"]
+        except requests.exceptions.RequestException as e:
+            logger.error("Error occurred while refreshing token: %s", e)
+            return None
 
 
 if __name__ == "__main__":
@@ -0,0 +1,221 @@
+# api/client.py
+import time
+import random
+import threading
+import requests
+import logging
+from collections import deque
+from requests.adapters import HTTPAdapter
+from api.rate_limit import RateLimiter
+from assets.config import (
+    setup_logging,
+    STRAVA_API_URL,
+    STRAVA_MAX_WORKERS,
+    HTTP_TIMEOUT,
+    HTTP_MAX_RETRIES,
+    HTTP_BACKOFF,
+)
+
+# Setup logging for this module
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Shared HTTP client for every Strava call in the api package.
+
+One keep-alive session is shared by the whole process so requests reuse pooled
+connections instead of paying a new TCP+TLS handshake each time. Transient failures
+(connection errors, timeouts and 5xx responses) are retried with jittered
+exponential backoff. An optional RateLimiter paces requests within Strava's limits,
+and a 429 response defers the retry to the next rate limit window.
+"""
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class ClientStats:
+    """
+    Thread-safe request counters and latency samples for a StravaClient.
+    """
+
+    def __init__(self, max_samples: int = 1000):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.latencies = deque(maxlen=max_samples)
+
+    def record(self, latency: float) -> None:
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(latency)
+
+    def record_retry(self) -> None:
+        with self.lock:
+            self.retries += 1
+
+    def record_failure(self) -> None:
+        with self.lock:
+            self.failures += 1
+
+
+class StravaClient:
+    """
+    Pooled HTTP client with timeouts, gzip and retries.
+
+    :param base_url: Base URL prepended to relative paths.
+    :param timeout: (connect, read) timeout in seconds.
+    :param max_retries: Number of retries after the first attempt.
+    :param backoff: Base delay in seconds for the exponential backoff.
+    :param pool_size: Maximum number of pooled connections per host.
+    :param rate_limiter: Optional RateLimiter every request has to pass through.
+    """
+
+    def __init__(
+        self,
+        base_url: str = STRAVA_API_URL,
+        timeout: tuple = HTTP_TIMEOUT,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff: float = HTTP_BACKOFF,
+        pool_size: int = STRAVA_MAX_WORKERS,
+        rate_limiter: RateLimiter = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.rate_limiter = rate_limiter
+        self.stats = ClientStats()
+
+        self.session = requests.Session()
+        self.session.headers.update({"Accept-Encoding": "gzip"})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.adapter = adapter
+
+    def url(self, path: str) -> str:
+        """
+        Resolve a path against the base URL; absolute URLs are returned unchanged.
+        """
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def backoff_delay(self, attempt: int) -> float:
+        """
+        Delay before retry number `attempt` (0-based), with full jitter.
+        """
+        return random.uniform(0, self.backoff * 2**attempt)
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the pooled session, retrying transient failures.
+
+        :param method: HTTP method.
+        :param path: Path relative to the base URL, or an absolute URL.
+        :param kwargs: Passed on to requests.Session.request.
+        :return: The response. Raises requests.HTTPError for non-2xx responses.
+        """
+        url = self.url(path)
+        kwargs.setdefault("timeout", self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire()
+
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error, response = e, None
+            else:
+                error = None
+            latency = time.perf_counter() - start
+            self.stats.record(latency)
+
+            if self.rate_limiter is not None and response is not None:
+                self.rate_limiter.update(response.headers)
+
+            retryable = error is not None or (
+                response.status_code in RETRY_STATUS_CODES
+            )
+            if not retryable or attempt == self.max_retries:
+                break
+
+            delay = self.backoff_delay(attempt)
+            rate_limited = response is not None and response.status_code == 429
+            if rate_limited and self.rate_limiter is not None:
+                # The limiter holds the retry back until the next window
+                self.rate_limiter.exhaust()
+                delay = 0
+            elif response is not None:
+                retry_after = response.headers.get("Retry-After", "")
+                if retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+
+            self.stats.record_retry()
+            logger.warning(
+                f"{method} {url} failed ({error or response.status_code}), "
+                f"retrying in {delay:.2f}s."
+            )
+            time.sleep(delay)
+
+        if error is not None:
+            self.stats.record_failure()
+            raise error
+
+        logger.debug(
+            f"{method} {url} -> {response.status_code} in {latency * 1000:.1f} ms"
+        )
+        if not response.ok:
+            self.stats.record_failure()
+        response.raise_for_status()  # Raise exception for non-200 status codes
+        return response
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def connections_opened(self) -> int:
+        """
+        Number of connections opened by the pools currently held by the session.
+        """
+        pools = self.adapter.poolmanager.pools
+        return sum(pools[key].num_connections for key in pools.keys())
+
+    def report(self) -> dict:
+        """
+        Summarise request latency and connection reuse.
+
+        :return: Dict with request, retry and failure counts, connections opened,
+            reused connections and latency percentiles in milliseconds.
+        """
+        with self.stats.lock:
+            latencies = sorted(self.stats.latencies)
+            requests_sent = self.stats.requests
+            report = {
+                "requests": requests_sent,
+                "retries": self.stats.retries,
+                "failures": self.stats.failures,
+            }
+
+        connections = self.connections_opened()
+        report["connections_opened"] = connections
+        report["connections_reused"] = max(requests_sent - connections, 0)
+
+        if latencies:
+            report["latency_ms"] = {
+                "mean": 1000 * sum(latencies) / len(latencies),
+                "p50": 1000 * latencies[len(latencies) // 2],
+                "p95": 1000 * latencies[int(len(latencies) * 0.95)],
+                "max": 1000 * latencies[-1],
+            }
+
+        return report
+
+
+# Shared client used by every module in the api package
+client = StravaClient(rate_limiter=RateLimiter())
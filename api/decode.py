@@ -0,0 +1,101 @@
+# api/decode.py
+import math
+from array import array
+import numpy as np
+import pandas as pd
+
+"""
+Decodes activity pages straight into typed column buffers.
+
+Only the summary fields `modules.processing` uses are kept. Each page is reduced to
+these columns as soon as it arrives, so nested fields (`map`, `athlete`, ...) never
+outlive their page and the history is held as compact typed arrays instead of one
+Python dict per activity.
+"""
+
+# Raw fields used by modules.processing and the buffer type they are decoded into
+RAW_COLUMNS = {
+    "id": "int",
+    "start_date": "str",
+    "timezone": "str",
+    "sport_type": "str",
+    "trainer": "bool",
+    "distance": "float",
+    "moving_time": "float",
+    "total_elevation_gain": "float",
+    "average_speed": "float",
+    "max_speed": "float",
+    "average_heartrate": "float",
+    "max_heartrate": "float",
+    "suffer_score": "float",
+    "average_watts": "float",
+    "average_cadence": "float",
+}
+
+BUFFER_TYPECODES = {"int": "q", "float": "d", "bool": "b"}
+
+
+class ActivityColumns:
+    """
+    Column buffers filled page by page from /athlete/activities responses.
+
+    :param columns: Mapping of field name to buffer type ("int", "float", "bool" or
+        "str"). Defaults to RAW_COLUMNS.
+    """
+
+    def __init__(self, columns: dict = None):
+        self.columns = columns or RAW_COLUMNS
+        self.buffers = {
+            name: array(BUFFER_TYPECODES[kind]) if kind in BUFFER_TYPECODES else []
+            for name, kind in self.columns.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.buffers["id"])
+
+    def extend(self, activities: list) -> None:
+        """
+        Append the wanted fields of a page of activities to the buffers.
+
+        Missing or null numbers are stored as NaN, missing strings as None.
+
+        :param activities: A page of activities as decoded JSON.
+        """
+        nan = math.nan
+        for name, kind in self.columns.items():
+            buffer = self.buffers[name]
+            if kind == "float":
+                buffer.extend(
+                    nan if (value := activity.get(name)) is None else value
+                    for activity in activities
+                )
+            elif kind == "bool":
+                buffer.extend(bool(activity.get(name)) for activity in activities)
+            elif kind == "int":
+                buffer.extend(activity[name] for activity in activities)
+            else:
+                buffer.extend(activity.get(name) for activity in activities)
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Build a DataFrame from the buffers.
+
+        The numeric columns are read as NumPy views of the buffers, without going
+        through Python objects, and copied once into the DataFrame's blocks. The frame
+        does not share memory with the buffers, which can keep growing.
+
+        :return: DataFrame with one column per field, in the order of `columns`.
+        """
+        data = {}
+        for name, kind in self.columns.items():
+            buffer = self.buffers[name]
+            if kind == "int":
+                data[name] = np.frombuffer(buffer, dtype=np.int64)
+            elif kind == "float":
+                data[name] = np.frombuffer(buffer, dtype=np.float64)
+            elif kind == "bool":
+                data[name] = np.frombuffer(buffer, dtype=np.int8).astype(bool)
+            else:
+                data[name] = pd.Series(buffer, dtype=object)
+
+        return pd.DataFrame(data)
@@ -0,0 +1,365 @@
+# api/fake_server.py
+import json
+import math
+import calendar
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+"""
+Local stand-in for the Strava API, so the api package can be exercised offline.
+
+Implements the endpoints the sync uses:
+
+- POST /oauth/token
+- GET  /api/v3/athlete/activities (page, per_page, before, after)
+- GET  /api/v3/activities/{id}
+- GET  /api/v3/activities/{id}/streams (keys, key_by_type)
+
+The history is synthetic and deterministic for a given seed. Every API request can be
+delayed by a fixed latency, and Strava-style 15-minute/daily rate limits are emulated
+(with a configurable window length) including the X-RateLimit headers.
+
+Point the api package at it with:
+
+    STRAVA_API_URL=http://127.0.0.1:<port>/api/v3
+    STRAVA_OAUTH_URL=http://127.0.0.1:<port>/oauth
+"""
+
+SPORT_TYPES = ["Ride", "Ride", "Ride", "Run", "Run", "Walk", "Hike", "Swim"]
+TIMEZONES = ["(GMT+01:00) Europe/Oslo"] * 9 + ["(GMT-08:00) America/Los_Angeles"]
+
+
+def make_activity(activity_id: int, start: int, rng: random.Random) -> dict:
+    """
+    Generate one synthetic activity summary in the /athlete/activities format.
+    """
+    sport_type = rng.choice(SPORT_TYPES)
+    trainer = sport_type == "Ride" and rng.random() < 0.3
+    moving_time = rng.randint(900, 5 * 3600 if sport_type == "Ride" else 2 * 3600)
+    speed = {"Ride": 8.0, "Run": 3.0}.get(sport_type, 1.4) * rng.uniform(0.7, 1.3)
+    distance = 0.0 if trainer and rng.random() < 0.5 else moving_time * speed
+    has_hr = rng.random() < 0.9
+    has_power = sport_type == "Ride" and rng.random() < 0.7
+
+    return {
+        "resource_state": 2,
+        "athlete": {"id": 1, "resource_state": 1},
+        "name": f"{sport_type} {activity_id}",
+        "distance": round(distance, 1),
+        "moving_time": moving_time,
+        "elapsed_time": moving_time + rng.randint(0, 900),
+        "total_elevation_gain": round(distance / 1000 * rng.uniform(0, 15), 1),
+        "type": sport_type,
+        "sport_type": sport_type,
+        "id": activity_id,
+        "start_date": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(start)),
+        "start_date_local": time.strftime(
+            "%Y-%m-%dT%H:%M:%SZ", time.gmtime(start + 3600)
+        ),
+        "timezone": rng.choice(TIMEZONES),
+        "trainer": trainer,
+        "map": {"id": f"a{activity_id}", "summary_polyline": "", "resource_state": 2},
+        "average_speed": round(speed, 3),
+        "max_speed": round(speed * rng.uniform(1.2, 2.0), 3),
+        "average_cadence": round(rng.uniform(70, 95), 1) if has_power else None,
+        "average_watts": round(rng.uniform(120, 260), 1) if has_power else None,
+        "has_heartrate": has_hr,
+        "average_heartrate": round(rng.uniform(120, 160), 1) if has_hr else None,
+        "max_heartrate": float(rng.randint(160, 195)) if has_hr else None,
+        "suffer_score": float(rng.randint(5, 250)) if has_hr else None,
+    }
+
+
+def make_history(activity_count: int, years: float = 5.0, seed: int = 0) -> list:
+    """
+    Generate a synthetic history, oldest first, spread evenly over `years` up to now.
+    """
+    rng = random.Random(seed)
+    end = int(time.time()) - 3600
+    step = max(int(years * 365 * 86400 / max(activity_count, 1)), 1)
+    first = end - step * activity_count
+
+    return [
+        make_activity(1000 + i, first + i * step + rng.randint(0, step // 2), rng)
+        for i in range(activity_count)
+    ]
+
+
+def make_streams(activity: dict) -> dict:
+    """
+    Generate 1 Hz streams for an activity, keyed by stream type.
+    """
+    rng = random.Random(activity["id"])
+    samples = activity["moving_time"]
+    speed = activity["distance"] / max(samples, 1)
+    lat, lng = 59.91 + rng.uniform(-0.1, 0.1), 10.75 + rng.uniform(-0.1, 0.1)
+
+    streams = {
+        "time": list(range(samples)),
+        "distance": [round(speed * t, 1) for t in range(samples)],
+        "altitude": [round(100 + 50 * math.sin(t / 600), 1) for t in range(samples)],
+    }
+    if activity["average_heartrate"] is not None:
+        hr = activity["average_heartrate"]
+        streams["heartrate"] = [int(hr + 10 * math.sin(t / 300)) for t in range(samples)]
+    if activity["average_watts"] is not None:
+        watts = activity["average_watts"]
+        streams["watts"] = [int(watts + rng.uniform(-60, 60)) for _ in range(samples)]
+        streams["cadence"] = [int(activity["average_cadence"])] * samples
+    if activity["distance"] > 0:
+        streams["latlng"] = [
+            [round(lat + 1e-5 * t, 6), round(lng + 1e-5 * t, 6)] for t in range(samples)
+        ]
+
+    return {
+        key: {
+            "type": key,
+            "data": data,
+            "series_type": "time",
+            "original_size": samples,
+            "resolution": "high",
+        }
+        for key, data in streams.items()
+    }
+
+
+class FakeStravaServer:
+    """
+    Threaded local HTTP server emulating the Strava API.
+
+    Use as a context manager; `url` and `oauth_url` hold the base URLs to point the
+    api package at.
+
+    :param activity_count: Number of activities in the synthetic history.
+    :param years: Number of years the history spans.
+    :param latency: Seconds to sleep before answering each API request.
+    :param short_limit: Requests allowed per short window (None for no limit).
+    :param daily_limit: Requests allowed in total (None for no limit).
+    :param window: Length of the short window in seconds.
+    :param token_ttl: Lifetime of issued access tokens in seconds.
+    :param seed: Seed for the synthetic history.
+    :param port: Port to listen on (0 picks a free port).
+    """
+
+    def __init__(
+        self,
+        activity_count: int = 1000,
+        years: float = 5.0,
+        latency: float = 0.05,
+        short_limit: int = None,
+        daily_limit: int = None,
+        window: int = 900,
+        token_ttl: int = 6 * 3600,
+        seed: int = 0,
+        port: int = 0,
+    ):
+        self.activities = make_history(activity_count, years, seed)
+        self.by_id = {activity["id"]: activity for activity in self.activities}
+        self.usage = {"window": None, "short": 0, "daily": 0, "rejected": 0}
+        self.tokens_issued = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive
+
+            def send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+
+                if url.path != "/oauth/token":
+                    self.send_json(404, {"message": "Record Not Found"})
+                    return
+
+                with server.lock:
+                    server.tokens_issued += 1
+                    issued = server.tokens_issued
+                self.send_json(
+                    200,
+                    {
+                        "token_type": "Bearer",
+                        "access_token": f"fake-access-{issued}",
+                        "refresh_token": "fake-refresh",
+                        "expires_at": int(time.time()) + token_ttl,
+                        "expires_in": token_ttl,
+                    },
+                )
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                parts = url.path.strip("/").split("/")
+
+                if parts[:2] != ["api", "v3"]:
+                    self.send_json(404, {"message": "Record Not Found"})
+                    return
+                if not self.headers.get("Authorization", "").startswith("Bearer "):
+                    self.send_json(401, {"message": "Authorization Error"})
+                    return
+
+                limited, headers = server.count_request()
+                time.sleep(latency)
+                if limited:
+                    self.send_json(429, {"message": "Rate Limit Exceeded"}, headers)
+                    return
+
+                status, payload = server.route(parts[2:], query)
+                self.send_json(status, payload, headers)
+
+            def log_message(self, *args):
+                pass
+
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self.window = window
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        root = f"http://127.0.0.1:{self.httpd.server_port}"
+        self.url = f"{root}/api/v3"
+        self.oauth_url = f"{root}/oauth"
+
+    def count_request(self) -> tuple:
+        """
+        Count an API request against the emulated rate limits.
+
+        :return: Tuple of (rate limited, rate limit headers).
+        """
+        with self.lock:
+            current_window = int(time.time() // self.window)
+            if self.usage["window"] != current_window:
+                self.usage["window"], self.usage["short"] = current_window, 0
+            self.usage["short"] += 1
+            self.usage["daily"] += 1
+
+            limited = bool(
+                (self.short_limit and self.usage["short"] > self.short_limit)
+                or (self.daily_limit and self.usage["daily"] > self.daily_limit)
+            )
+            if limited:
+                self.usage["rejected"] += 1
+
+            headers = {}
+            if self.short_limit or self.daily_limit:
+                headers = {
+                    "X-RateLimit-Limit": f"{self.short_limit},{self.daily_limit}",
+                    "X-RateLimit-Usage": f"{self.usage['short']},{self.usage['daily']}",
+                }
+            return limited, headers
+
+    def route(self, parts: list, query: dict) -> tuple:
+        """
+        Answer an API request.
+
+        :param parts: Path segments after /api/v3.
+        :param query: Query parameters.
+        :return: Tuple of (status code, JSON payload).
+        """
+        if parts == ["athlete", "activities"]:
+            page = int(query.get("page", 1))
+            per_page = int(query.get("per_page", 30))
+            after = int(query.get("after", 0)) if "after" in query else None
+            before = int(query.get("before", 0)) if "before" in query else None
+
+            activities = self.activities
+            if after is not None:
+                activities = [a for a in activities if self.epoch(a) > after]
+            if before is not None:
+                activities = [a for a in activities if self.epoch(a) < before]
+            # Newest first, unless paging forward from `after` like Strava does
+            if after is None:
+                activities = activities[::-1]
+
+            return 200, activities[(page - 1) * per_page : page * per_page]
+
+        if len(parts) >= 2 and parts[0] == "activities" and parts[1].isdigit():
+            activity = self.by_id.get(int(parts[1]))
+            if activity is None:
+                return 404, {"message": "Record Not Found"}
+            if len(parts) == 2:
+                return 200, dict(activity, calories=activity["moving_time"] / 6)
+            if parts[2:] == ["streams"]:
+                streams = make_streams(activity)
+                keys = query.get("keys")
+                if keys:
+                    wanted = set(keys.split(",")) | {"distance"}
+                    streams = {k: v for k, v in streams.items() if k in wanted}
+                if query.get("key_by_type") == "true":
+                    return 200, streams
+                return 200, list(streams.values())
+
+        return 404, {"message": "Record Not Found"}
+
+    @staticmethod
+    def epoch(activity: dict) -> int:
+        return calendar.timegm(
+            time.strptime(activity["start_date"], "%Y-%m-%dT%H:%M:%SZ")
+        )
+
+    def add_activity(self, activity: dict = None) -> dict:
+        """
+        Append a new activity to the history, e.g. to emulate an upload.
+
+        :param activity: Activity to add. A synthetic one starting now if None.
+        :return: The added activity.
+        """
+        with self.lock:
+            if activity is None:
+                activity_id = max(self.by_id, default=999) + 1
+                rng = random.Random(activity_id)
+                activity = make_activity(activity_id, int(time.time()) - 60, rng)
+            self.activities.append(activity)
+            self.by_id[activity["id"]] = activity
+        return activity
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a local fake Strava API.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--activities", type=int, default=1000)
+    parser.add_argument("--years", type=float, default=5.0)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--short-limit", type=int, default=200)
+    parser.add_argument("--daily-limit", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=900)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with FakeStravaServer(
+        activity_count=args.activities,
+        years=args.years,
+        latency=args.latency,
+        short_limit=args.short_limit,
+        daily_limit=args.daily_limit,
+        window=args.window,
+        seed=args.seed,
+        port=args.port,
+    ) as fake:
+        print(f"STRAVA_API_URL={fake.url}")
+        print(f"STRAVA_OAUTH_URL={fake.oauth_url}", flush=True)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
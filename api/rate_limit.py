@@ -0,0 +1,171 @@
+# api/rate_limit.py
+import time
+import threading
+import logging
+from assets.config import (
+    setup_logging,
+    STRAVA_SHORT_LIMIT,
+    STRAVA_DAILY_LIMIT,
+    STRAVA_SHORT_WINDOW,
+    STRAVA_BURST,
+)
+
+# Setup logging for this module
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Rate-limit-aware request scheduling for the Strava API.
+
+Strava allows a fixed number of requests per 15-minute window (reset at :00, :15,
+:30 and :45) and per day (reset at midnight UTC), and reports the current usage in the
+`X-RateLimit-Limit` / `X-RateLimit-Usage` headers as "<15-min>,<daily>".
+
+The RateLimiter is a token bucket whose refill rate is the remaining 15-minute budget
+spread over the time left in the window, so requests use the whole budget without
+going over. Once either budget is spent, callers wait for the next window.
+"""
+
+DAY = 86400
+
+
+def parse_rate_limit_header(value: str) -> tuple:
+    """
+    Parse a "<15-min>,<daily>" rate limit header.
+
+    :param value: Header value, e.g. "200,2000".
+    :return: Tuple of (short, daily) ints, or None if the header is missing/invalid.
+    """
+    try:
+        short, daily = value.split(",")[:2]
+        return int(short), int(daily)
+    except (AttributeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Token bucket that paces requests within Strava's short and daily limits.
+
+    :param short_limit: Requests allowed per short window.
+    :param daily_limit: Requests allowed per day.
+    :param window: Length of the short window in seconds.
+    :param burst: Maximum number of requests that can be sent back-to-back.
+    :param clock: Function returning the current epoch time (for tests).
+    :param sleep: Function used to wait (for tests).
+    """
+
+    def __init__(
+        self,
+        short_limit: int = STRAVA_SHORT_LIMIT,
+        daily_limit: int = STRAVA_DAILY_LIMIT,
+        window: int = STRAVA_SHORT_WINDOW,
+        burst: int = STRAVA_BURST,
+        clock=time.time,
+        sleep=time.sleep,
+    ):
+        self.short_limit = short_limit
+        self.daily_limit = daily_limit
+        self.window = window
+        self.burst = burst
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+
+        now = clock()
+        self.window_start = now - now % window
+        self.day_start = now - now % DAY
+        self.short_used = 0
+        self.daily_used = 0
+        self.tokens = float(min(burst, short_limit))
+        self.last_refill = now
+
+    def roll_windows(self, now: float) -> None:
+        """
+        Reset the usage counters when a new short window or day has started.
+        """
+        if now >= self.window_start + self.window:
+            self.window_start = now - now % self.window
+            self.short_used = 0
+            self.tokens = float(min(self.burst, self.short_limit))
+            self.last_refill = now
+        if now >= self.day_start + DAY:
+            self.day_start = now - now % DAY
+            self.daily_used = 0
+
+    def refill(self, now: float) -> None:
+        """
+        Add tokens at the rate that spends the remaining budget by the window's end.
+        """
+        remaining = max(self.short_limit - self.short_used, 0)
+        time_left = max(self.window_start + self.window - now, 1e-3)
+        rate = remaining / time_left
+        capacity = min(self.burst, remaining)
+
+        self.tokens = min(self.tokens + (now - self.last_refill) * rate, capacity)
+        self.last_refill = now
+
+    def reserve(self) -> float:
+        """
+        Try to take a request slot.
+
+        :return: 0 if the request may be sent now, otherwise seconds to wait first.
+        """
+        now = self.clock()
+        self.roll_windows(now)
+
+        if self.daily_used >= self.daily_limit:
+            return self.day_start + DAY - now
+        if self.short_used >= self.short_limit:
+            return self.window_start + self.window - now
+
+        self.refill(now)
+        if self.tokens < 1:
+            remaining = self.short_limit - self.short_used
+            time_left = self.window_start + self.window - now
+            return min((1 - self.tokens) * time_left / remaining, time_left)
+
+        self.tokens -= 1
+        self.short_used += 1
+        self.daily_used += 1
+        return 0
+
+    def acquire(self) -> None:
+        """
+        Block until a request may be sent without exceeding either limit.
+        """
+        while True:
+            with self.lock:
+                delay = self.reserve()
+            if delay <= 0:
+                return
+            if delay > 1:
+                logger.info(f"Rate limit budget spent, deferring for {delay:.0f}s.")
+            self.sleep(delay)
+
+    def update(self, headers) -> None:
+        """
+        Synchronise limits and usage with the rate limit headers of a response.
+
+        :param headers: Response headers.
+        """
+        limit = parse_rate_limit_header(headers.get("X-RateLimit-Limit"))
+        usage = parse_rate_limit_header(headers.get("X-RateLimit-Usage"))
+
+        with self.lock:
+            self.roll_windows(self.clock())
+            if limit:
+                self.short_limit, self.daily_limit = limit
+            if usage:
+                # Local counts include requests still in flight, keep the larger one
+                self.short_used = max(self.short_used, usage[0])
+                self.daily_used = max(self.daily_used, usage[1])
+
+    def exhaust(self) -> None:
+        """
+        Mark the short window as spent, e.g. after a 429 response.
+        """
+        with self.lock:
+            self.roll_windows(self.clock())
+            self.short_used = self.short_limit
+            self.tokens = 0.0
@@ -0,0 +1,194 @@
+# api/streams.py
+import os
+import json
+import threading
+import requests
+import pandas as pd
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from assets.config import (
+    setup_logging,
+    STRAVA_API_URL,
+    STRAVA_MAX_WORKERS,
+    STREAMS_DIR,
+)
+from api.auth import get_strava_tokens
+from api.client import client
+
+# Setup logging for this module
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Fetches activity streams (per-second time, power, heart rate, GPS and altitude) and
+stores them as one CSV per activity in STREAMS_DIR.
+
+Files are written atomically, so an interrupted run can be resumed: activities that
+already have a stream file are skipped. Activities the API answers with 404 (deleted, or
+private to another athlete) are recorded in MISSING_STREAMS_FILE and not requested
+again.
+"""
+
+STREAM_TYPES = ["time", "watts", "heartrate", "cadence", "latlng", "altitude"]
+STREAM_COLUMNS = ["time", "watts", "heartrate", "cadence", "lat", "lng", "altitude"]
+MISSING_STREAMS_FILE = "missing.json"  # In the streams directory
+
+missing_lock = threading.Lock()
+
+
+def stream_path(activity_id: int, streams_dir: str = STREAMS_DIR) -> str:
+    return os.path.join(streams_dir, f"{activity_id}.csv")
+
+
+def load_missing_streams(streams_dir: str = STREAMS_DIR) -> set:
+    """
+    Ids of the activities whose streams the API answered with 404.
+    """
+    try:
+        with open(os.path.join(streams_dir, MISSING_STREAMS_FILE)) as f:
+            return set(json.load(f))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return set()
+
+
+def save_missing_streams(activity_ids: set, streams_dir: str = STREAMS_DIR) -> None:
+    """
+    Atomically add activities to the ones without streams.
+
+    The file is re-read first, so ids recorded meanwhile by another process are kept.
+    """
+    path = os.path.join(streams_dir, MISSING_STREAMS_FILE)
+    with missing_lock:
+        missing = load_missing_streams(streams_dir) | set(activity_ids)
+        with open(path + ".tmp", "w") as f:
+            json.dump(sorted(missing), f)
+        os.replace(path + ".tmp", path)
+
+
+def streams_to_dataframe(streams: dict) -> pd.DataFrame:
+    """
+    Convert a `key_by_type` streams response into one row per sample.
+
+    :param streams: Streams response keyed by stream type.
+    :return: DataFrame with STREAM_COLUMNS, NaN where a stream is missing.
+    """
+    data = {}
+    for stream_type in STREAM_TYPES:
+        values = streams.get(stream_type, {}).get("data")
+        if values is None:
+            continue
+        if stream_type == "latlng":
+            data["lat"] = [point[0] for point in values]
+            data["lng"] = [point[1] for point in values]
+        else:
+            data[stream_type] = values
+
+    return pd.DataFrame(data).reindex(columns=STREAM_COLUMNS)
+
+
+def fetch_activity_streams(
+    activity_id: int, access_token: str, base_url: str = STRAVA_API_URL
+) -> pd.DataFrame:
+    """
+    Fetches the streams of a single activity.
+
+    :param activity_id: Strava activity id.
+    :param access_token: Access token to use.
+    :param base_url: Base URL of the Strava API.
+    :return: DataFrame with one row per sample.
+    """
+    response = client.get(
+        f"{base_url}/activities/{activity_id}/streams",
+        headers={"Authorization": "Bearer " + access_token},
+        params={"keys": ",".join(STREAM_TYPES), "key_by_type": "true"},
+    )
+    streams = response.json()
+
+    # Activities without any recorded streams come back as an empty list
+    return streams_to_dataframe(streams if isinstance(streams, dict) else {})
+
+
+def save_streams(
+    df: pd.DataFrame, activity_id: int, streams_dir: str = STREAMS_DIR
+) -> None:
+    """
+    Atomically write the streams of an activity.
+    """
+    path = stream_path(activity_id, streams_dir)
+    df.to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+
+
+def fetch_strava_streams(
+    activity_ids: list,
+    access_token: str = None,
+    max_workers: int = STRAVA_MAX_WORKERS,
+    streams_dir: str = STREAMS_DIR,
+    base_url: str = STRAVA_API_URL,
+    limit: int = None,
+) -> int:
+    """
+    Fetches and stores the streams of every activity that does not have them yet.
+
+    Streams are fetched in parallel with at most `max_workers` requests in flight.
+    A failed activity is logged and left for the next run, except for a 404, which is
+    recorded so the activity is skipped from then on.
+
+    :param activity_ids: Ids of the activities to fetch streams for.
+    :param access_token: Access token to use. Fetched with the refresh token if None.
+    :param max_workers: Maximum number of concurrent requests.
+    :param streams_dir: Directory holding one stream file per activity.
+    :param base_url: Base URL of the Strava API.
+    :param limit: Fetch at most this many activities, the first ones in activity_ids
+        without streams. All of them if None.
+    :return: Number of activities whose streams were stored.
+    """
+    os.makedirs(streams_dir, exist_ok=True)
+    missing = load_missing_streams(streams_dir)
+    pending = [
+        activity_id
+        for activity_id in activity_ids
+        if activity_id not in missing
+        and not os.path.exists(stream_path(activity_id, streams_dir))
+    ]
+    if limit is not None:
+        pending = pending[:limit]
+    if not pending:
+        return 0
+
+    if access_token is None:
+        access_token = get_strava_tokens()
+        if access_token is None:
+            raise Exception("Failed to retrieve access token.")
+
+    def fetch_and_save(activity_id):
+        df = fetch_activity_streams(activity_id, access_token, base_url)
+        save_streams(df, activity_id, streams_dir)
+
+    stored = 0
+    not_found = set()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(fetch_and_save, activity_id): activity_id
+            for activity_id in pending
+        }
+        for future in as_completed(futures):
+            try:
+                future.result()
+                stored += 1
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code != 404:
+                    logger.warning(
+                        f"Failed to fetch streams for {futures[future]}: {e}"
+                    )
+                    continue
+                logger.info(f"No streams for {futures[future]}, not asking again.")
+                not_found.add(futures[future])
+            except requests.exceptions.RequestException as e:
+                logger.warning(f"Failed to fetch streams for {futures[future]}: {e}")
+
+    if not_found:
+        save_missing_streams(not_found, streams_dir)
+
+    logger.info(f"Stored streams for {stored} of {len(pending)} activities.")
+    return stored
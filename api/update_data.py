@@ -1,12 +1,25 @@
 # api/update_data.py
 import os
+import json
+import requests
 import pandas as pd
 import logging
-from assets.config import setup_logging
-from api.api import get_strava_activities
+from assets.config import (
+    setup_logging,
+    SYNC_STATE_PATH,
+    SYNC_STREAMS,
+    SYNC_STREAMS_LIMIT,
+)
+from api.api import iter_strava_activity_pages
+from api.decode import ActivityColumns
+from api.streams import fetch_strava_streams
+from modules.raw_store import RawActivityStore
 
 """
-Fetches new data from the API and writes it to a CSV file.
+Fetches new data from the API and upserts it into the raw activity store.
+
+Each sync stores a watermark (latest start_date and id seen) so the next refresh only
+requests activities newer than the watermark through the API's `after` parameter.
 """
 
 # Setup logging for this module
@@ -14,20 +27,96 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
-def fetch_strava_data() -> None:
+def load_sync_watermark(state_file: str = SYNC_STATE_PATH) -> dict:
+    """
+    Load the sync watermark saved by the previous refresh.
+
+    :param state_file: Path to the JSON file holding the watermark.
+    :return: Dict with "after" (epoch seconds) and "last_id", or None if there is none.
+    """
+    try:
+        with open(state_file) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def save_sync_watermark(
+    df: pd.DataFrame, state_file: str = SYNC_STATE_PATH, previous: dict = None
+) -> dict:
+    """
+    Save the latest start_date and id seen as the new sync watermark.
+
+    :param df: The newly synced raw activities.
+    :param state_file: Path to the JSON file holding the watermark.
+    :param previous: The previous watermark, which the new one never moves behind.
+    :return: The saved watermark.
+    """
+    start_dates = pd.to_datetime(df["start_date"], utc=True)
+    watermark = {
+        "after": int(start_dates.max().timestamp()),
+        "last_id": int(df["id"].max()),
+    }
+    if previous:
+        watermark = {key: max(watermark[key], previous[key]) for key in watermark}
+
+    with open(state_file + ".tmp", "w") as f:
+        json.dump(watermark, f)
+    os.replace(state_file + ".tmp", state_file)
+
+    return watermark
+
+
+def fetch_strava_data(
+    full_refresh: bool = False,
+    with_streams: bool = SYNC_STREAMS,
+    streams_limit: int = SYNC_STREAMS_LIMIT,
+    store: RawActivityStore = None,
+    state_file: str = SYNC_STATE_PATH,
+) -> int:
     """
-    Fetches Strava data from the API and saves it to a CSV file.
+    Fetches Strava data from the API and upserts it into the raw activity store.
     Raises an exception if data retrieval fails.
+
+    :param full_refresh: Ignore the watermark and download the full history.
+    :param with_streams: Also fetch streams for activities that do not have them yet,
+        newest first.
+    :param streams_limit: Activities to fetch streams for in this run. All if None.
+    :param store: The raw activity store. Defaults to RAW_STORE_DIR.
+    :param state_file: Path to the JSON file holding the sync watermark.
+    :return: Number of activities fetched.
     """
-    strava_data = get_strava_activities()
+    store = store or RawActivityStore()
+    watermark = None if full_refresh else load_sync_watermark(state_file)
 
-    if strava_data is None:
+    if store.is_empty():
+        watermark = None
+
+    after = watermark["after"] if watermark else None
+
+    # Decode each page straight into column buffers as it arrives
+    columns = ActivityColumns()
+    try:
+        for page in iter_strava_activity_pages(after=after):
+            columns.extend(page)
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error occurred while fetching activities: {e}")
         raise Exception("Failed to fetch activities.")
 
-    # Convert the data to a DataFrame
-    df = pd.DataFrame(strava_data)
+    df = columns.to_frame()
 
-    if not df.empty:
-        df.to_csv("data/raw_data.csv", index=False)  # Save to CSV without the index
+    if df.empty:
+        logger.info("No new activities since the last sync.")
     else:
-        logger.warning("No data retrieved. DataFrame is empty.")
\ No newline at end of file
+        # Only the partitions of the new activities are written
+        store.upsert(df)
+        save_sync_watermark(df, state_file, previous=watermark)
+        logger.info(f"Synced {len(columns)} activities into '{store.root}'.")
+
+    if with_streams:
+        # The new activities first, then a bounded part of the backlog each run, so a
+        # first sync does not wait on the rate limit for the whole history
+        ids = store.read(columns=["id"])["id"].tolist()[::-1]
+        fetch_strava_streams(ids, limit=streams_limit)
+
+    return len(columns)
@@ -0,0 +1,88 @@
+# api/webhook_replay.py
+import sys
+import json
+import time
+import argparse
+import requests
+
+from assets.config import STRAVA_WEBHOOK_SUBSCRIPTION_ID, STRAVA_ATHLETE_ID
+
+"""
+Replays Strava webhook events against a local webhook endpoint.
+
+Events are read from a JSON-lines file (one event per line) or generated for a list
+of activity ids, and POSTed to the endpoint in order. Generated events carry the
+configured subscription and athlete ids, which the endpoint checks.
+
+Usage:
+    python -m api.webhook_replay --url http://127.0.0.1:8050/strava/webhook --file events.jsonl
+    python -m api.webhook_replay --url http://127.0.0.1:8050/strava/webhook --create 1001 1002
+"""
+
+
+def make_event(
+    activity_id: int,
+    aspect_type: str = "create",
+    updates: dict = None,
+    subscription_id: int = int(STRAVA_WEBHOOK_SUBSCRIPTION_ID or 1),
+    owner_id: int = int(STRAVA_ATHLETE_ID or 1),
+) -> dict:
+    """
+    Build a webhook event in the format Strava sends.
+
+    :param activity_id: Id of the activity the event is about.
+    :param aspect_type: "create", "update" or "delete".
+    :param updates: Changed fields, for "update" events.
+    :param subscription_id: Id of the webhook subscription.
+    :param owner_id: Id of the athlete owning the activity.
+    :return: The event as a dict.
+    """
+    return {
+        "object_type": "activity",
+        "object_id": activity_id,
+        "aspect_type": aspect_type,
+        "updates": updates or {},
+        "owner_id": owner_id,
+        "subscription_id": subscription_id,
+        "event_time": int(time.time()),
+    }
+
+
+def replay_events(url: str, events: list, interval: float = 0.0) -> list:
+    """
+    POST events to a webhook endpoint.
+
+    :param url: URL of the webhook endpoint.
+    :param events: Events to send, in order.
+    :param interval: Seconds to wait between events.
+    :return: HTTP status codes of the responses.
+    """
+    statuses = []
+    with requests.Session() as session:
+        for event in events:
+            response = session.post(url, json=event, timeout=5)
+            statuses.append(response.status_code)
+            time.sleep(interval)
+    return statuses
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay Strava webhook events.")
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--file", help="JSON-lines file with one event per line.")
+    parser.add_argument("--create", type=int, nargs="*", default=[])
+    parser.add_argument("--update", type=int, nargs="*", default=[])
+    parser.add_argument("--delete", type=int, nargs="*", default=[])
+    parser.add_argument("--interval", type=float, default=0.0)
+    args = parser.parse_args()
+
+    events = []
+    if args.file:
+        with open(args.file) as f:
+            events = [json.loads(line) for line in f if line.strip()]
+    for aspect_type in ("create", "update", "delete"):
+        events += [make_event(i, aspect_type) for i in getattr(args, aspect_type)]
+
+    statuses = replay_events(args.url, events, args.interval)
+    print(f"Sent {len(statuses)} events, statuses: {sorted(set(statuses))}")
+    sys.exit(0 if all(status == 200 for status in statuses) else 1)
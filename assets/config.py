@@ -1,16 +1,76 @@
 # assets/config.py
+import os
 import pytz
 import logging
 
 STRAVA_DATA_PATH = "/Users/daniel/Desktop/python/strava-dash-app/data/clean_data.csv"
 DASHAPP_TITLE = "Strava Dashboard"
+AUTO_REFRESH_MINUTES = 0  # Background data refresh interval for the dashboard, 0 = off
+DISPLAY_UNITS = "metric"  # Units of the dashboard: "metric" or "imperial"
+
+# Strava webhook subscription (push updates for new/updated/deleted activities)
+STRAVA_WEBHOOK_PATH = "/strava/webhook"
+STRAVA_WEBHOOK_VERIFY_TOKEN = os.getenv("STRAVA_WEBHOOK_VERIFY_TOKEN", "")
+# Events are only accepted from this subscription (none accepted when unset) and athlete
+STRAVA_WEBHOOK_SUBSCRIPTION_ID = os.getenv("STRAVA_WEBHOOK_SUBSCRIPTION_ID", "")
+STRAVA_ATHLETE_ID = os.getenv("STRAVA_ATHLETE_ID", "")
+
+# Strava API (override the base URL to point the api package at a local stub)
+STRAVA_API_URL = os.getenv("STRAVA_API_URL", "https://www.strava.com/api/v3")
+STRAVA_OAUTH_URL = os.getenv("STRAVA_OAUTH_URL", "https://www.strava.com/oauth")
+STRAVA_PAGE_SIZE = 200  # Maximum page size accepted by /athlete/activities
+STRAVA_MAX_WORKERS = 4  # Concurrent page requests during a sync
+
+# Strava rate limits (updated from the X-RateLimit headers at runtime)
+STRAVA_SHORT_LIMIT = 200  # Requests per 15-minute window
+STRAVA_DAILY_LIMIT = 2000  # Requests per day
+STRAVA_SHORT_WINDOW = 900  # Seconds
+STRAVA_BURST = 50  # Requests that may be sent back-to-back before pacing kicks in
+
+# HTTP client: (connect, read) timeout in seconds, retries and backoff base delay
+HTTP_TIMEOUT = (5, 30)
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF = 0.5
+
+# OAuth token cache, refreshed when the token expires within the margin (seconds)
+TOKEN_CACHE_PATH = "assets/.token_cache.json"
+TOKEN_EXPIRY_MARGIN = 300
+
+# Raw data and the incremental sync watermark
+RAW_DATA_PATH = "data/raw_data.csv"
+SYNC_STATE_PATH = "data/sync_state.json"
+STREAMS_DIR = "data/streams"  # One stream file per activity
+SYNC_STREAMS = False  # Fetch streams of new activities on sync and webhook creates
+SYNC_STREAMS_LIMIT = 100  # Activities per sync whose streams are fetched, newest first
+RAW_STORE_DIR = "data/raw"  # Year/month partitioned raw activity store
+RAW_STORE_MAX_PARTS = 8  # Parts per partition before it is compacted
+CLEAN_STATE_DIR = "data/clean_state"  # Cleaned rows and statistics between refreshes
+CLEAN_PROFILE_PATH = "data/clean_profile.json"  # Stage profile report (main --profile)
+STREAM_CHUNK_SIZE = 100_000  # Raw rows per chunk when cleaning a CSV in chunks
+CLEAN_MAX_WORKERS = os.cpu_count() or 1  # Processes of clean_data_parallel
+CLEAN_SHARD_SIZE = 50_000  # Maximum raw rows per clean_data_parallel task
+CLEAN_CACHE_DIR = "data/stage_cache"  # Cached clean_data stage outputs
+CLEAN_CACHE_MAX_BYTES = 512 * 2**20  # Size budget of the stage cache (LRU eviction)
+CLEAN_CACHE_CHECKPOINTS = ["filter_by_period", "replace_nan_values"]  # Also cached
+CLEAN_BACKEND = "pandas"  # DataFrame library of clean_data: "pandas" or "polars"
+
+# Bulk import of the Strava account export archive
+IMPORT_MAX_WORKERS = os.cpu_count() or 1  # Processes parsing activity files
+IMPORT_BATCH_SIZE = 500  # Activities written to the raw store at a time
 
 BIKE_DURATION_GOAL_2024 = 200
 BIKE_DISTANCE_GOAL_2024 = 2000
 RUN_DISTANCE_GOAL_2024 = 200
 RUN_DURATION_GOAL_2024 = 20
 
+# Training load (fitness/fatigue, see modules/training_load.py)
+CTL_DAYS = 42  # Time constant of fitness (chronic training load)
+ATL_DAYS = 7  # Time constant of fatigue (acute training load)
+TRAINING_LOAD_INPUT = "suffer_score"  # Daily load: "suffer_score" or "tss" (power)
+FTP_WATTS = 250  # Functional threshold power, for the power-based TSS
+
 # Set up max_hr, weight_kg and stride_lenght in assets/health_data.py
+# (resting_hr, weight_kg and max_hr can be dated measurements, see modules/health.py)
 
 local_tz = pytz.timezone("Europe/Oslo")  # Timezone
 ignored_tzs = ["(GMT-10:00) Pacific/Honolulu", "(GMT-08:00) America/Los_Angeles"]
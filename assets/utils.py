@@ -10,23 +10,30 @@ CURRENT_MONTH = datetime.now().strftime("%b")
 CURRENT_YEAR = datetime.now().strftime("%Y")
 
 
+def data_file_path(file_name: str) -> str:
+    """
+    Absolute path of a file in the data directory, creating the directory if needed.
+    """
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data"))
+
+    if not os.path.exists(base_dir):
+        os.makedirs(base_dir)
+        logger.info(f"Created directory: {base_dir}")
+
+    return os.path.join(base_dir, file_name)
+
+
 def save_to_csv(df: pd.DataFrame, file_name: str) -> None:
     """
     Save a DataFrame to a CSV file.
     """
     try:
-        base_dir = os.path.abspath(
-            os.path.join(os.path.dirname(__file__), "..", "data")
-        )
-
-        if not os.path.exists(base_dir):
-            os.makedirs(base_dir)
-            logger.info(f"Created directory: {base_dir}")
-
-        file_path = os.path.join(base_dir, f"{file_name}.csv")
+        file_path = data_file_path(f"{file_name}.csv")
 
-        # Save DataFrame to CSV
-        df.to_csv(file_path, index=False)
+        # Save DataFrame to CSV, replacing the old file atomically so readers never
+        # see a partially written file
+        df.to_csv(file_path + ".tmp", index=False)
+        os.replace(file_path + ".tmp", file_path)
 
     except Exception as e:
         logger.error(f"Failed to save DataFrame to CSV: {e}")
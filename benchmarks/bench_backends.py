@@ -0,0 +1,67 @@
+# benchmarks/bench_backends.py
+import os
+import sys
+import time
+import tempfile
+import pandas as pd
+
+from assets.utils import create_dataframe
+from benchmarks.bench_streaming import make_raw_csv
+from modules.backends import CLEAN_BACKENDS, clean_with_backend
+from modules.polars_processing import clean_lazy
+from modules.schema import apply_clean_schema
+
+"""
+The clean_data backends (modules.backends) against each other: checks that every
+backend produces exactly the same DataFrame as pandas, with and without fixed suffer
+score bins and fill values, and compares their run time.
+
+The raw activities are read from a CSV file with gaps in part of the columns (see
+bench_streaming), so the backends also have to agree on missing values.
+"""
+
+
+def measure(raw_df: pd.DataFrame, backend: str, **kwargs):
+    start = time.perf_counter()
+    clean_df = clean_with_backend(raw_df, backend, **kwargs)
+    return clean_df, time.perf_counter() - start
+
+
+def run(*activity_counts: int) -> None:
+    for count in activity_counts or (10_000, 100_000, 1_000_000):
+        with tempfile.TemporaryDirectory() as directory:
+            csv_file = os.path.join(directory, "raw.csv")
+            make_raw_csv(csv_file, count)
+            raw_df = create_dataframe(csv_file)
+
+        fixed = {
+            "suffer_score_bins": [0.0, 40.0, 90.0, 10_000.0],
+            "fill_values": {
+                "max_heartrate": 170.0,
+                "average_heartrate": 140.0,
+                "suffer_score": 50.0,
+            },
+        }
+
+        times = {}
+        for kwargs in [{}, fixed]:
+            expected, times["pandas"] = measure(raw_df, "pandas", **kwargs)
+            for backend in CLEAN_BACKENDS:
+                result, times[backend] = measure(raw_df, backend, **kwargs)
+                pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+        # The Polars clean table converts to the same table in the clean schema
+        pd.testing.assert_frame_equal(
+            apply_clean_schema(clean_lazy(raw_df).collect()),
+            apply_clean_schema(clean_with_backend(raw_df, "pandas")),
+            check_exact=True,
+        )
+
+        timings = ", ".join(
+            f"{backend} {seconds:6.2f} s" for backend, seconds in times.items()
+        )
+        print(f"{count:>9} activities: {timings}, outputs identical")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,173 @@
+# benchmarks/bench_clean.py
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from assets.utils import m_to_km, ms_to_kph, sec_to_h
+from modules.processing import get_clean_stages, run_stages
+
+"""
+clean_data with its vectorized stages against the previous row-by-row stages: checks
+that both produce exactly the same DataFrame and compares their run time.
+"""
+
+
+def make_raw_activities(count: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate `count` raw activities in the format of the raw activity store.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2022-06-01", tz="UTC").value // 10**9
+    seconds = np.sort(rng.integers(start, start + 4 * 365 * 86400, count))
+    sport_types = rng.choice(
+        ["Ride", "Ride", "Run", "Run", "Walk", "Hike", "Swim", "VirtualRide", "Rowing"],
+        count,
+    )
+    trainer = (sport_types == "VirtualRide") | (
+        (sport_types == "Ride") & (rng.random(count) < 0.2)
+    )
+    moving_time = rng.integers(600, 5 * 3600, count).astype(float)
+    speed = np.select(
+        [np.isin(sport_types, ["Ride", "VirtualRide"]), sport_types == "Run"],
+        [8.0, 3.0],
+        1.3,
+    ) * rng.uniform(0.7, 1.3, count)
+    distance = np.where(rng.random(count) < 0.1, 0.0, moving_time * speed).round(1)
+
+    def with_gaps(values, share):
+        values = values.astype(float)
+        values[rng.random(count) < share] = np.nan
+        return values
+
+    return pd.DataFrame(
+        {
+            "id": np.arange(count, dtype=np.int64) + 10**9,
+            "start_date": pd.to_datetime(seconds, unit="s").strftime(
+                "%Y-%m-%dT%H:%M:%SZ"
+            ),
+            "timezone": rng.choice(
+                ["(GMT+01:00) Europe/Oslo"] * 9 + ["(GMT-08:00) America/Los_Angeles"],
+                count,
+            ),
+            "sport_type": sport_types,
+            "trainer": trainer,
+            "distance": distance,
+            "moving_time": moving_time,
+            "total_elevation_gain": (
+                distance / 1000 * rng.uniform(0, 15, count)
+            ).round(1),
+            "average_speed": speed.round(3),
+            "max_speed": (speed * rng.uniform(1.2, 2.0, count)).round(3),
+            "average_heartrate": with_gaps(rng.uniform(110, 165, count).round(1), 0.1),
+            "max_heartrate": with_gaps(rng.integers(150, 200, count), 0.1),
+            "suffer_score": with_gaps(rng.integers(1, 300, count), 0.1),
+            "average_watts": with_gaps(rng.uniform(100, 300, count).round(1), 0.5),
+            "average_cadence": with_gaps(rng.uniform(60, 95, count).round(1), 0.5),
+        }
+    )
+
+
+# The stages as they were before vectorizing, row by row and cell by cell
+
+
+def convert_units(df):
+    if "distance" in df.columns:
+        df["distance"] = df["distance"].apply(m_to_km)
+    if "duration" in df.columns:
+        df["duration"] = df["duration"].apply(sec_to_h)
+    if "average_speed" in df.columns:
+        df["average_speed"] = df["average_speed"].apply(ms_to_kph)
+    if "max_speed" in df.columns:
+        df["max_speed"] = df["max_speed"].apply(ms_to_kph)
+    return df
+
+
+def add_year_month_column(df):
+    df["month"] = df["date"].dt.month_name().str.slice(stop=3).str.lower()
+    df["year"] = df["date"].dt.year
+    return df
+
+
+def add_day_of_week(df):
+    weekdays = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+    df["day_of_week"] = df["date"].dt.weekday.map(lambda x: weekdays[x])
+    return df
+
+
+def add_time_columns(df):
+    from assets.config import local_tz
+
+    if df["date"].dt.tz is None:
+        df["date"] = df["date"].dt.tz_localize("UTC")
+    df["date"] = df["date"].dt.tz_convert(local_tz)
+    df["end_time"] = df["date"] + pd.to_timedelta(df["duration"], unit="h")
+    df["start_time"] = df["date"].dt.strftime("%H:%M")
+    df["end_time"] = df["end_time"].dt.strftime("%H:%M")
+    return df
+
+
+def add_average_running_speed(df):
+    df["average_speed"] = df.apply(
+        lambda row: (
+            row["distance"] / row["duration"]
+            if row["sport_type"] == "Run" and row["duration"] > 0
+            else row["average_speed"]
+        ),
+        axis=1,
+    )
+    return df
+
+
+def update_environment(df):
+    df["environment"] = df["environment"].apply(lambda x: "indoor" if x else "outdoor")
+    return df
+
+
+def capitalize_all_strings(df):
+    return df.map(lambda x: x.capitalize() if isinstance(x, str) else x)
+
+
+ROW_BY_ROW_STAGES = {
+    stage.__name__: stage
+    for stage in [
+        convert_units,
+        add_year_month_column,
+        add_day_of_week,
+        add_time_columns,
+        add_average_running_speed,
+        update_environment,
+        capitalize_all_strings,
+    ]
+}
+
+
+def row_by_row_stages() -> list:
+    return [
+        (ROW_BY_ROW_STAGES.get(stage.__name__, stage), kwargs)
+        for stage, kwargs in get_clean_stages()
+    ]
+
+
+def measure(stages: list, raw_df: pd.DataFrame) -> tuple:
+    start = time.perf_counter()
+    df = run_stages(raw_df.copy(), stages)
+    return df, time.perf_counter() - start
+
+
+def run(*activity_counts: int) -> None:
+    for count in activity_counts or (10_000, 100_000, 1_000_000):
+        raw_df = make_raw_activities(count)
+
+        expected, before = measure(row_by_row_stages(), raw_df)
+        result, after = measure(get_clean_stages(), raw_df)
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+        print(
+            f"{count:>9} activities: row by row {before:8.2f} s, "
+            f"vectorized {after:6.2f} s ({before / after:5.1f}x), outputs identical"
+        )
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,63 @@
+# benchmarks/bench_decode.py
+import sys
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+from api.decode import ActivityColumns
+from api.fake_server import make_history
+
+"""
+Compare decoding a synced history with pd.DataFrame(list_of_dicts) against the
+page-by-page column decoder, in parse time and peak memory.
+"""
+
+
+def decode_list_of_dicts(pages: list) -> pd.DataFrame:
+    activities = []
+    for page in pages:
+        activities.extend(json.loads(page))
+    return pd.DataFrame(activities)
+
+
+def decode_columns(pages: list) -> pd.DataFrame:
+    columns = ActivityColumns()
+    for page in pages:
+        columns.extend(json.loads(page))
+    return columns.to_frame()
+
+
+def measure(decode, pages: list) -> tuple:
+    start = time.perf_counter()
+    decode(pages)
+    elapsed = time.perf_counter() - start
+
+    # Separate run for memory, tracemalloc slows everything down
+    tracemalloc.start()
+    df = decode(pages)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return df, elapsed, peak
+
+
+def run(*activity_counts: int) -> None:
+    for count in activity_counts or (1_000, 10_000, 50_000):
+        history = make_history(count)
+        # Raw response bodies, 200 activities per page
+        pages = [
+            json.dumps(history[i : i + 200]).encode() for i in range(0, count, 200)
+        ]
+        del history
+
+        for decode in (decode_list_of_dicts, decode_columns):
+            df, elapsed, peak = measure(decode, pages)
+            print(
+                f"{count:>7} activities {decode.__name__:<22} "
+                f"{elapsed * 1000:8.1f} ms  peak {peak / 2**20:8.1f} MiB  "
+                f"frame {df.memory_usage(deep=True).sum() / 2**20:7.1f} MiB"
+            )
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
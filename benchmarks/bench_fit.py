@@ -0,0 +1,101 @@
+# benchmarks/bench_fit.py
+import sys
+import time
+import struct
+import tempfile
+import numpy as np
+
+from modules.fit import read_fit
+
+"""
+Decode time of a synthetic FIT file (1 Hz records, with a lap/event message every
+10 minutes breaking up the runs of records), and a check that the decoded streams
+match what was written.
+"""
+
+# (field number, size, base type, struct format) of the record messages written
+RECORD_LAYOUT = [
+    (253, 4, 0x86, "I"),  # timestamp
+    (0, 4, 0x85, "i"),  # position_lat
+    (1, 4, 0x85, "i"),  # position_long
+    (78, 4, 0x86, "I"),  # enhanced_altitude
+    (3, 1, 0x02, "B"),  # heart_rate
+    (4, 1, 0x02, "B"),  # cadence
+    (7, 2, 0x84, "H"),  # power
+]
+EVENT_LAYOUT = [(253, 4, 0x86, "I"), (0, 1, 0x00, "B"), (1, 1, 0x00, "B")]
+
+
+def definition_message(local: int, global_number: int, layout: list) -> bytes:
+    fields = b"".join(bytes([number, size, base]) for number, size, base, _ in layout)
+    return bytes([0x40 | local, 0, 0]) + struct.pack("<HB", global_number, len(layout)) + fields
+
+
+def make_fit(samples: int) -> tuple:
+    """
+    Build a FIT file with `samples` records and return it with the expected streams.
+    """
+    rng = np.random.default_rng(0)
+    start = 1_000_000_000
+    lat = (59.9 + np.cumsum(rng.normal(0, 1e-5, samples))) * 2**31 / 180
+    lng = (10.7 + np.cumsum(rng.normal(0, 1e-5, samples))) * 2**31 / 180
+    altitude = 100 + 50 * np.sin(np.arange(samples) / 600)
+    heartrate = rng.integers(100, 180, samples)
+    cadence = rng.integers(70, 100, samples)
+    watts = rng.integers(0, 400, samples)
+    heartrate[::97] = 0xFF  # Dropouts are stored as the invalid value
+
+    record_format = "<B" + "".join(code for *_, code in RECORD_LAYOUT)
+    event_format = "<B" + "".join(code for *_, code in EVENT_LAYOUT)
+    body = [definition_message(0, 20, RECORD_LAYOUT), definition_message(1, 21, EVENT_LAYOUT)]
+    for i in range(samples):
+        if i % 600 == 0:
+            body.append(struct.pack(event_format, 1, start + i, 0, 4))
+        body.append(
+            struct.pack(
+                record_format, 0, start + i, int(lat[i]), int(lng[i]),
+                int(round((altitude[i] + 500) * 5)), heartrate[i], cadence[i], watts[i],
+            )
+        )
+    body = b"".join(body)
+    header = struct.pack("<BBHI4sH", 14, 0x20, 2132, len(body), b".FIT", 0)
+
+    expected = {
+        "time": np.arange(samples, dtype=float),
+        "lat": np.trunc(lat) * 180 / 2**31,
+        "lng": np.trunc(lng) * 180 / 2**31,
+        "altitude": np.round((altitude + 500) * 5) / 5 - 500,
+        "heartrate": np.where(heartrate == 0xFF, np.nan, heartrate),
+        "cadence": cadence.astype(float),
+        "watts": watts.astype(float),
+    }
+    return header + body + b"\0\0", expected
+
+
+def run(hours: float = 5.0) -> None:
+    samples = int(hours * 3600)
+    data, expected = make_fit(samples)
+
+    with tempfile.NamedTemporaryFile(suffix=".fit") as file:
+        file.write(data)
+        file.flush()
+
+        df = read_fit(file.name)
+        for column, values in expected.items():
+            if not np.allclose(df[column], values, equal_nan=True):
+                raise Exception(f"Decoded '{column}' does not match the written values.")
+
+        repeat = 20
+        start = time.perf_counter()
+        for _ in range(repeat):
+            read_fit(file.name)
+        elapsed = (time.perf_counter() - start) / repeat
+
+    print(
+        f"{hours:g} h ride, {samples} records, {len(data) / 2**20:.1f} MiB: "
+        f"decoded in {elapsed * 1000:.2f} ms, streams match"
+    )
+
+
+if __name__ == "__main__":
+    run(*(float(arg) for arg in sys.argv[1:]))
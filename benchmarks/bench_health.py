@@ -0,0 +1,88 @@
+# benchmarks/bench_health.py
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from modules.health import HealthSeries, utc_nanoseconds
+
+"""
+As-of lookup of health measurements (modules.health) against the previous lookups:
+checks that monthly measurements give the same values as the old lookup by (UTC)
+month, and daily measurements the same as pd.merge_asof, then compares the lookup
+time for a growing number of measurements (one a day over up to 100 years).
+"""
+
+
+def make_activity_dates(count: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2000-01-01", tz="UTC").value
+    nanoseconds = rng.integers(start, start + 25 * 365 * 86400 * 10**9, count)
+    return pd.Series(pd.to_datetime(nanoseconds, utc=True)).dt.tz_convert("Europe/Oslo")
+
+
+def month_lookup(resting_hr: dict, dates: pd.Series) -> np.ndarray:
+    # The lookup calculate_vo2_max did before the health store
+    resting_hr_by_month = {
+        int(year_month[:4]) * 100 + int(year_month[5:7]): value
+        for year_month, value in resting_hr.items()
+    }
+    utc_date = dates.dt.tz_convert(None)
+    year_month = utc_date.dt.year * 100 + utc_date.dt.month
+    return year_month.map(resting_hr_by_month).astype(float).to_numpy()
+
+
+def merge_asof_lookup(measurements: pd.DataFrame, dates: pd.Series) -> np.ndarray:
+    activities = pd.DataFrame({"date": dates.dt.tz_convert("UTC")})
+    activities["position"] = np.arange(len(activities))
+    merged = pd.merge_asof(
+        activities.sort_values("date"), measurements, on="date", direction="backward"
+    )
+    return merged.sort_values("position")["value"].to_numpy()
+
+
+def run(count: int = 1_000_000) -> None:
+    rng = np.random.default_rng(1)
+    dates = make_activity_dates(count)
+    times = utc_nanoseconds(dates)
+
+    resting_hr = {
+        f"{year}-{month:02d}": float(rng.integers(40, 60))
+        for year in range(1999, 2026)
+        for month in range(1, 13)
+    }
+    np.testing.assert_array_equal(
+        HealthSeries.from_value(resting_hr).at(times), month_lookup(resting_hr, dates)
+    )
+    print("Monthly measurements: same values as the lookup by month")
+
+    for years in [1, 10, 25, 100]:
+        days = pd.date_range(
+            pd.Timestamp("2025-01-01") - pd.DateOffset(years=years),
+            "2025-01-01",
+            freq="D",
+            tz="UTC",
+        )
+        measurements = pd.DataFrame(
+            {"date": days, "value": rng.normal(50, 5, len(days))}
+        )
+        series = HealthSeries(measurements["date"].array.asi8, measurements["value"])
+
+        start = time.perf_counter()
+        values = series.at(times)
+        as_of = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = merge_asof_lookup(measurements, dates)
+        merge = time.perf_counter() - start
+
+        np.testing.assert_array_equal(values, expected)
+        print(
+            f"{len(days):>7} daily measurements, {count} activities: as-of "
+            f"{as_of * 1000:7.1f} ms, merge_asof {merge * 1000:7.1f} ms, "
+            f"values identical"
+        )
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,143 @@
+# benchmarks/bench_import.py
+import os
+import sys
+import csv
+import gzip
+import time
+import shutil
+import zipfile
+import tempfile
+
+import pandas as pd
+from api.fake_server import make_history, make_streams
+from import_archive import import_archive
+from modules.raw_store import RawActivityStore
+
+"""
+Import throughput (activities/sec) of a synthetic Strava export archive at different
+process pool sizes.
+
+The archive holds an activities.csv in the export layout and one gzipped GPX or TCX
+file per activity with 1 Hz trackpoints.
+"""
+
+EXPORT_HEADER = [
+    "Activity ID", "Activity Date", "Activity Name", "Activity Type",
+    "Elapsed Time", "Distance", "Max Heart Rate", "Relative Effort", "Filename",
+    "Elapsed Time", "Moving Time", "Distance", "Max Speed", "Average Speed",
+    "Elevation Gain", "Average Cadence", "Max Heart Rate", "Average Heart Rate",
+    "Average Watts",
+]
+
+
+def make_gpx(activity: dict, streams: dict) -> str:
+    start = pd.Timestamp(activity["start_date"])
+    points = []
+    for i, t in enumerate(streams["time"]["data"]):
+        lat, lng = streams["latlng"]["data"][i] if "latlng" in streams else (0, 0)
+        hr = streams["heartrate"]["data"][i] if "heartrate" in streams else 0
+        points.append(
+            f'<trkpt lat="{lat}" lon="{lng}"><ele>{streams["altitude"]["data"][i]}</ele>'
+            f"<time>{(start + pd.Timedelta(seconds=t)).isoformat()}</time>"
+            f"<extensions><gpxtpx:TrackPointExtension><gpxtpx:hr>{hr}</gpxtpx:hr>"
+            f"</gpxtpx:TrackPointExtension></extensions></trkpt>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<gpx xmlns="http://www.topografix.com/GPX/1/1" xmlns:gpxtpx='
+        '"http://www.garmin.com/xmlschemas/TrackPointExtension/v1">'
+        f"<metadata><time>{start.isoformat()}</time></metadata>"
+        f"<trk><trkseg>{''.join(points)}</trkseg></trk></gpx>"
+    )
+
+
+def make_tcx(activity: dict, streams: dict) -> str:
+    start = pd.Timestamp(activity["start_date"])
+    points = []
+    for i, t in enumerate(streams["time"]["data"]):
+        watts = streams["watts"]["data"][i] if "watts" in streams else 0
+        points.append(
+            f"<Trackpoint><Time>{(start + pd.Timedelta(seconds=t)).isoformat()}</Time>"
+            f"<AltitudeMeters>{streams['altitude']['data'][i]}</AltitudeMeters>"
+            f"<Extensions><TPX><Watts>{watts}</Watts></TPX></Extensions></Trackpoint>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/'
+        'TrainingCenterDatabase/v2"><Activities><Activity><Lap><Track>'
+        f"{''.join(points)}</Track></Lap></Activity></Activities>"
+        "</TrainingCenterDatabase>"
+    )
+
+
+def make_archive(path: str, activity_count: int) -> None:
+    history = make_history(activity_count)
+    with zipfile.ZipFile(path, "w") as archive:
+        rows = []
+        for activity in history:
+            # Cap the tracks at an hour to keep the archive build quick
+            activity = {**activity, "moving_time": min(activity["moving_time"], 3600)}
+            streams = make_streams(activity)
+            extension = "gpx" if "latlng" in streams else "tcx"
+            filename = f"activities/{activity['id']}.{extension}.gz"
+            make_file = make_gpx if extension == "gpx" else make_tcx
+            archive.writestr(
+                filename, gzip.compress(make_file(activity, streams).encode())
+            )
+
+            start = pd.Timestamp(activity["start_date"])
+            rows.append(
+                [
+                    activity["id"], start.strftime("%b %d, %Y, %I:%M:%S %p"),
+                    activity["name"], activity["sport_type"],
+                    activity["elapsed_time"], activity["distance"] / 1000,
+                    activity["max_heartrate"], activity["suffer_score"], filename,
+                    activity["elapsed_time"], activity["moving_time"],
+                    activity["distance"], activity["max_speed"],
+                    activity["average_speed"], activity["total_elevation_gain"],
+                    activity["average_cadence"], activity["max_heartrate"],
+                    activity["average_heartrate"], activity["average_watts"],
+                ]
+            )
+
+        with archive.open("activities.csv", "w") as file:
+            text = tempfile.SpooledTemporaryFile(mode="w+", newline="")
+            writer = csv.writer(text)
+            writer.writerow(EXPORT_HEADER)
+            writer.writerows(rows)
+            text.seek(0)
+            file.write(text.read().encode())
+
+
+def run(activity_count: int = 200, *worker_counts: int) -> None:
+    directory = tempfile.mkdtemp()
+    try:
+        archive_path = os.path.join(directory, "export.zip")
+        make_archive(archive_path, activity_count)
+        size = os.path.getsize(archive_path) / 2**20
+        print(f"{activity_count} activities, archive {size:.1f} MiB")
+
+        for workers in worker_counts or (1, 2, 4):
+            store_dir = os.path.join(directory, f"raw-{workers}")
+            streams_dir = os.path.join(directory, f"streams-{workers}")
+
+            start = time.perf_counter()
+            imported = import_archive(
+                archive_path,
+                max_workers=workers,
+                store=RawActivityStore(store_dir),
+                streams_dir=streams_dir,
+            )
+            elapsed = time.perf_counter() - start
+
+            stored = len(RawActivityStore(store_dir).read(columns=["id"]))
+            print(
+                f"{workers} workers: {imported} imported, {stored} in store, "
+                f"{elapsed:6.2f} s, {imported / elapsed:7.1f} activities/s"
+            )
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,71 @@
+# benchmarks/bench_incremental.py
+import os
+import sys
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_clean import make_raw_activities
+from modules.incremental import IncrementalCleaner
+from modules.processing import clean_data
+from modules.raw_store import RawActivityStore
+
+"""
+IncrementalCleaner against cleaning the whole store with clean_data: the state is built
+from most of the history, then batches of new, changed and deleted activities are
+applied. After every batch the incremental result must be exactly the full rebuild.
+"""
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def run(count: int = 50_000, batch_size: int = 20) -> None:
+    rng = np.random.default_rng(1)
+    raw_df = make_raw_activities(count)
+    initial = int(count * 0.9)
+
+    with tempfile.TemporaryDirectory() as root:
+        store = RawActivityStore(os.path.join(root, "raw"))
+        cleaner = IncrementalCleaner(os.path.join(root, "state"))
+
+        store.upsert(raw_df.iloc[:initial])
+        _, elapsed = timed(cleaner.refresh, store)
+        print(f"Initial state from {initial} activities: {elapsed:.2f} s")
+
+        position = initial
+        for step in range(5):
+            # New activities at the end of the history
+            new = raw_df.iloc[position : position + batch_size]
+            position += batch_size
+
+            # Changed activities anywhere in the history, with new scores that can move
+            # the bucket edges
+            changed = raw_df.iloc[rng.choice(position - batch_size, batch_size)].copy()
+            changed["suffer_score"] = rng.integers(1, 600, batch_size).astype(float)
+            changed["average_heartrate"] = changed["average_heartrate"] + 1
+
+            store.upsert(pd.concat([new, changed], ignore_index=True))
+            deleted = rng.choice(store.read(columns=[])["id"], batch_size // 4)
+            store.delete(deleted)
+
+            # A fresh cleaner, so the state is loaded from disk as in a new process
+            refresh = IncrementalCleaner(cleaner.state_dir).refresh
+            result, incremental = timed(refresh, store)
+            expected, full = timed(lambda: clean_data(store.read()))
+            pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+            print(
+                f"Batch {step + 1}: +{len(new)} new, {len(changed)} changed, "
+                f"-{len(deleted)} deleted: incremental {incremental:6.2f} s, "
+                f"full rebuild {full:6.2f} s ({full / incremental:5.1f}x), "
+                f"outputs identical"
+            )
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,65 @@
+# benchmarks/bench_ingestion.py
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+"""
+End-to-end offline ingestion benchmark: a full sync with streams, followed by an
+incremental sync, against the local fake Strava server.
+
+The fake server runs in its own process so it does not compete with the client for
+the GIL.
+"""
+
+
+def run(activity_count: int = 200, latency: float = 0.02) -> None:
+    # Generous limits, advertised through the rate limit headers the client follows
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "api.fake_server", "--port", "0",
+            "--activities", str(activity_count), "--latency", str(latency),
+            "--short-limit", "100000", "--daily-limit", "1000000",
+        ],
+        cwd=ROOT,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # The api package reads its base URLs from the environment at import time
+        for _ in range(2):
+            key, value = server.stdout.readline().strip().split("=", 1)
+            os.environ[key] = value
+        from api.update_data import fetch_strava_data
+        from api.client import client
+
+        with tempfile.TemporaryDirectory() as workdir:
+            os.chdir(workdir)
+            os.makedirs("assets")
+            os.makedirs("data")
+
+            start = time.perf_counter()
+            count = fetch_strava_data(
+                full_refresh=True, with_streams=True, streams_limit=None
+            )
+            elapsed = time.perf_counter() - start
+            print(
+                f"full sync: {count} activities with streams in {elapsed:.2f}s "
+                f"({count / elapsed:.0f} activities/s)"
+            )
+
+            start = time.perf_counter()
+            count = fetch_strava_data(with_streams=True, streams_limit=None)
+            elapsed = time.perf_counter() - start
+            print(f"incremental sync: {count} new activities in {elapsed:.2f}s")
+
+        print(client.report())
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    run(*(float(arg) if "." in arg else int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,154 @@
+# benchmarks/bench_memory.py
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import pandas as pd
+
+from benchmarks.bench_clean import make_raw_activities
+from modules import processing
+from modules.processing import clean_data, get_clean_stages
+
+"""
+Peak memory (RSS) of clean_data on a large synthetic history, against the stages as
+they were before copy-on-write: an extra sort in filter_by_period, full copies in
+filter_columns and capitalize_all_strings, and the final sort on the date objects.
+
+Each variant runs in its own process, which reads the raw activities from a Parquet
+file, so the peaks do not include generating the data or the other variant.
+"""
+
+
+# The stages that copied the DataFrame, as they were before copy-on-write
+
+
+def rename_columns(df):
+    df.rename(
+        columns={
+            "trainer": "environment",
+            "start_date": "date",
+            "moving_time": "duration",
+            "total_elevation_gain": "elevation_gain",
+        },
+        inplace=True,
+    )
+    return df
+
+
+def rename_sport_types(df):
+    df.loc[:, "sport_type"] = df["sport_type"].replace({"Ride": "Bike", "Hike": "Walk"})
+    return df[~df["sport_type"].isin(["Swims", "Rowing"])]
+
+
+def filter_by_period(df, year=None):
+    df = df.sort_values(by="date", ascending=True)
+    if year:
+        df = df[df["date"].dt.year >= year]
+    return df
+
+
+
+def filter_columns(df):
+    return processing.filter_columns(df).copy()
+
+
+def capitalize_all_strings(df):
+    return processing.capitalize_all_strings(df.copy())
+
+
+def sort_and_reset_index(df):
+    df = df.sort_values(by="date")
+    df.reset_index(drop=True, inplace=True)
+    df.index += 1
+    return df
+
+
+COPYING_STAGES = {
+    stage.__name__: stage
+    for stage in [
+        rename_columns,
+        rename_sport_types,
+        filter_by_period,
+        filter_columns,
+        capitalize_all_strings,
+    ]
+}
+
+
+def copying_clean_data(df):
+    stages = [
+        (COPYING_STAGES.get(stage.__name__, stage), kwargs)
+        for stage, kwargs in get_clean_stages()
+        if stage.__name__ != "sort_and_reset_index"
+    ]
+    for stage, kwargs in stages + [(sort_and_reset_index, {})]:
+        df = stage(df, **kwargs)
+    return df
+
+
+VARIANTS = {"before": copying_clean_data, "after": clean_data}
+
+
+def current_rss() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss() -> int:
+    # VmHWM starts over in a new process, unlike ru_maxrss which is inherited from
+    # the parent
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def measure(variant: str, path: str) -> None:
+    """
+    Run one variant on the raw activities in `path` and print its memory use.
+    """
+    raw_df = pd.read_parquet(path)
+    base = current_rss()
+    start = time.perf_counter()
+    df = VARIANTS[variant](raw_df)
+    elapsed = time.perf_counter() - start
+
+    peak = peak_rss()
+    print(f"{base} {peak} {elapsed} {len(df)}")
+
+
+def run(count: int = 1_000_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "raw.parquet")
+        make_raw_activities(count).to_parquet(path)
+
+        results = {}
+        for variant in VARIANTS:
+            output = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.bench_memory",
+                    "--measure", variant, path,
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()
+            base, peak, elapsed, rows = output[-4:]
+            results[variant] = int(peak) - int(base)
+            print(
+                f"{variant:>6}: {count} activities -> {rows} rows in "
+                f"{float(elapsed):5.2f} s, peak RSS {int(peak) / 2**20:7.0f} MiB "
+                f"({results[variant] / 2**20:6.0f} MiB above the raw data)"
+            )
+
+    saved = 1 - results["after"] / results["before"]
+    print(f"Peak memory above the raw data reduced by {saved:.0%}")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--measure"]:
+        measure(sys.argv[2], sys.argv[3])
+    else:
+        run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,88 @@
+# benchmarks/bench_metrics.py
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from assets.health_data import stride_length
+from benchmarks.bench_clean import make_raw_activities
+from modules.metrics import DerivedMetrics, UNIT_SYSTEMS, dimension
+from modules.processing import clean_data, estimate_vo2_max
+from modules.schema import apply_clean_schema
+
+"""
+Derived metrics (modules.metrics) against the columns clean_data computed before they
+became lazy: checks that pace, elevation rate, cadence and VO2 max match the previous
+stages (VO2 max as of the exact start of each activity), that the imperial view is the
+metric value times its factor, and compares the time of the first access, a memoized
+access and an imperial view with clean_data.
+"""
+
+DERIVED = ["pace", "elevation_rate", "spm", "vo2_max"]
+CONVERTED = ["distance", "elevation_gain", "average_speed", "max_speed", *DERIVED]
+
+
+def stored_columns(clean_df: pd.DataFrame, raw_df: pd.DataFrame) -> pd.DataFrame:
+    # The derived columns as the clean_data stages computed them
+    distance, duration = clean_df["distance"], clean_df["duration"]
+    starts = raw_df.set_index("id")["start_date"].reindex(clean_df["id"])
+    is_run = clean_df["sport_type"] == "Run"
+    return pd.DataFrame(
+        {
+            "pace": (duration * 60 / distance).where(distance > 0, 0),
+            "elevation_rate": (clean_df["elevation_gain"] / distance).where(
+                distance > 0, 0
+            ),
+            "spm": ((distance * 1000 / stride_length) / (duration * 60)).where(is_run),
+            "vo2_max": estimate_vo2_max(
+                clean_df["average_watts"],
+                pd.Series(pd.to_datetime(starts.to_numpy(), utc=True)),
+            ).to_numpy(),
+        },
+        index=clean_df.index,
+    )
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def run(count: int = 200_000) -> None:
+    raw_df = make_raw_activities(count)
+    clean_df, seconds = timed(clean_data, raw_df)
+    clean_df = apply_clean_schema(clean_df)
+    print(f"clean_data: {seconds * 1000:8.1f} ms")
+
+    expected = stored_columns(clean_df, raw_df)
+    metrics = DerivedMetrics(clean_df)
+    for name in DERIVED:
+        values, seconds = timed(metrics.get, name)
+        np.testing.assert_allclose(values, expected[name], rtol=1e-6)
+        print(f"{name + ' (first)':>25}: {seconds * 1000:8.1f} ms")
+        _, seconds = timed(metrics.get, name)
+        print(f"{name + ' (memoized)':>25}: {seconds * 1000:8.3f} ms")
+
+    start = time.perf_counter()
+    imperial = metrics.frame(CONVERTED, "imperial")
+    print(f"{'imperial view':>25}: {(time.perf_counter() - start) * 1000:8.1f} ms")
+
+    for name in CONVERTED:
+        metric_factor = UNIT_SYSTEMS["metric"][dimension(name)][0]
+        imperial_factor = UNIT_SYSTEMS["imperial"][dimension(name)][0]
+        expected_metric = metrics.get(name).astype(float)
+        np.testing.assert_allclose(
+            imperial[name], expected_metric / metric_factor * imperial_factor, rtol=1e-6
+        )
+
+    # A filtered query only reads the rows it needs
+    rows = clean_df.index[clean_df["sport_type"] == "Run"]
+    pd.testing.assert_series_equal(
+        metrics.frame(["pace"], "metric", rows)["pace"], metrics.get("pace")[rows]
+    )
+    print("Derived metrics match the previous clean_data columns")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,34 @@
+# benchmarks/bench_pagination.py
+import sys
+import time
+
+from api.api import iter_strava_activities
+from api.client import client
+from api.fake_server import FakeStravaServer
+
+"""
+Benchmark a multi-year backfill against the local fake Strava server.
+"""
+
+
+def run(activity_count: int = 5000, latency: float = 0.25) -> None:
+    with FakeStravaServer(activity_count=activity_count, latency=latency) as server:
+        for workers in (1, 2, 4):
+            start = time.perf_counter()
+            count = sum(
+                1
+                for _ in iter_strava_activities(
+                    access_token="stub", max_workers=workers, base_url=server.url
+                )
+            )
+            elapsed = time.perf_counter() - start
+            print(
+                f"workers={workers}: {count} activities in {elapsed:.2f}s "
+                f"({count / elapsed:.0f} activities/s)"
+            )
+
+    print(client.report())
+
+
+if __name__ == "__main__":
+    run(*(float(arg) if "." in arg else int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,43 @@
+# benchmarks/bench_parallel.py
+import os
+import sys
+import time
+import pandas as pd
+
+from benchmarks.bench_clean import make_raw_activities
+from modules.parallel import clean_data_parallel
+from modules.processing import clean_data
+
+"""
+Scaling of clean_data_parallel with the number of worker processes: checks that every
+run produces exactly the same DataFrame as clean_data, and compares their run times.
+
+The speedup is bounded by the number of CPU cores (os.cpu_count()), and by the time
+spent sending the shards to the workers and back.
+"""
+
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def run(count: int = 1_000_000, *worker_counts: int) -> None:
+    raw_df = make_raw_activities(count)
+    print(f"{count} activities, {os.cpu_count()} CPU cores")
+
+    expected, baseline = timed(clean_data, raw_df)
+    print(f"clean_data:  {baseline:6.2f} s")
+
+    for workers in worker_counts or (1, 2, 4, 8):
+        result, elapsed = timed(clean_data_parallel, raw_df, max_workers=workers)
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+        print(
+            f"{workers} worker(s): {elapsed:6.2f} s ({baseline / elapsed:4.2f}x), "
+            f"outputs identical"
+        )
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
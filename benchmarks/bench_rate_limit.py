@@ -0,0 +1,43 @@
+# benchmarks/bench_rate_limit.py
+import sys
+import time
+
+from api.api import iter_strava_activities
+from api.client import client
+from api.rate_limit import RateLimiter
+from api.fake_server import FakeStravaServer
+
+"""
+Sync a history that needs several rate limit windows against the local fake Strava server,
+which emulates Strava's limits with a shortened window.
+"""
+
+
+def run(short_limit: int = 20, window: int = 3) -> None:
+    # Enough pages for roughly three windows
+    activity_count = 200 * short_limit * 3
+
+    with FakeStravaServer(
+        activity_count=activity_count,
+        latency=0.01,
+        short_limit=short_limit,
+        daily_limit=10_000,
+        window=window,
+    ) as server:
+        client.rate_limiter = RateLimiter(window=window)
+
+        start = time.perf_counter()
+        count = sum(
+            1 for _ in iter_strava_activities(access_token="stub", base_url=server.url)
+        )
+        elapsed = time.perf_counter() - start
+
+    print(
+        f"{count} activities in {elapsed:.2f}s, "
+        f"{server.usage['daily']} requests, {server.usage['rejected']} rejected (429)"
+    )
+    print(client.report())
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,75 @@
+# benchmarks/bench_schema.py
+import os
+import sys
+import time
+import tempfile
+import pandas as pd
+
+from benchmarks.bench_clean import make_raw_activities
+from modules.processing import clean_data
+from modules.schema import (
+    apply_clean_schema,
+    load_clean_data,
+    memory_report,
+    save_clean_data,
+)
+
+"""
+The clean activity table as the dashboard loaded it before (plain read_csv) against
+the declared schema (modules.schema): memory per column, load time, and the time of
+the overview filter run on every callback. Also checks that saving and loading in the
+schema gives back exactly the same table.
+"""
+
+
+def overview_filter(df: pd.DataFrame) -> pd.DataFrame:
+    # As in dashapp/callbacks/overview_callbacks.py
+    return df[
+        df["month"].isin(["Jan", "Feb", "Mar", "Jun"])
+        & df["year"].isin([2023, 2024])
+        & df["sport_type"].isin(["Bike", "Run"])
+    ]
+
+
+def timed(func, *args, repeat: int = 1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(*args)
+    return result, (time.perf_counter() - start) / repeat
+
+
+def run(count: int = 1_000_000) -> None:
+    clean_df = clean_data(make_raw_activities(count))
+
+    with tempfile.TemporaryDirectory() as directory:
+        plain_path = os.path.join(directory, "plain.csv")
+        typed_path = os.path.join(directory, "typed.csv")
+        clean_df.to_csv(plain_path, index=False)
+        saved = save_clean_data(clean_df, typed_path)
+
+        before, load_before = timed(pd.read_csv, plain_path)
+        after, load_after = timed(load_clean_data, typed_path)
+
+    # The CSV file does not keep the index
+    saved = saved.reset_index(drop=True)
+    pd.testing.assert_frame_equal(after, saved, check_exact=True)
+    expected = apply_clean_schema(clean_df).reset_index(drop=True)
+    pd.testing.assert_frame_equal(saved, expected, check_exact=True)
+
+    print(f"{len(clean_df)} clean activities, saved and loaded back identical\n")
+    print(memory_report(before, after))
+
+    filtered_before, filter_before = timed(overview_filter, before, repeat=20)
+    filtered_after, filter_after = timed(overview_filter, after, repeat=20)
+    if len(filtered_before) != len(filtered_after):
+        raise Exception("The overview filter selects different activities.")
+
+    print(
+        f"\nLoad: {load_before:.2f} s -> {load_after:.2f} s\n"
+        f"Overview filter: {filter_before * 1000:.1f} ms -> "
+        f"{filter_after * 1000:.1f} ms ({filter_before / filter_after:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
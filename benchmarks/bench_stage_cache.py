@@ -0,0 +1,74 @@
+# benchmarks/bench_stage_cache.py
+import sys
+import time
+import tempfile
+import pandas as pd
+
+from benchmarks.bench_clean import make_raw_activities
+from modules.processing import clean_data, get_clean_stages, run_stages
+from modules.stage_cache import StageCache
+
+"""
+clean_data with the stage cache (modules.stage_cache) against clean_data without it:
+checks that cached runs produce exactly the same DataFrame, and compares the run time
+of a run without cache, a cold cache, a warm cache, a changed last stage (only that
+stage re-runs) and a changed input. Then checks that the cache stays under a small
+size budget.
+"""
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def capitalize_all_strings(df):
+    # Same as the last stage, with different code
+    from modules.processing import capitalize_all_strings
+
+    return capitalize_all_strings(df)
+
+
+def run(count: int = 200_000) -> None:
+    raw_df = make_raw_activities(count)
+    expected, seconds = timed(clean_data, raw_df)
+    print(f"{'no cache':>14}: {seconds:6.2f} s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = StageCache(directory, max_bytes=2**40)
+        for label in ["cold cache", "warm cache"]:
+            result, seconds = timed(clean_data, raw_df, cache=cache)
+            pd.testing.assert_frame_equal(result, expected, check_exact=True)
+            cached = cache.size() / 2**20
+            print(f"{label:>14}: {seconds:6.2f} s ({cached:.0f} MiB cached)")
+
+        stages = get_clean_stages()
+        stages[-1] = (capitalize_all_strings, {})
+        result, seconds = timed(run_stages, raw_df, stages, cache=cache)
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+        print(f"{'changed stage':>14}: {seconds:6.2f} s")
+
+        changed_df = raw_df.copy()
+        changed_df.loc[0, "distance"] += 1
+        result, seconds = timed(clean_data, changed_df, cache=cache)
+        pd.testing.assert_frame_equal(result, clean_data(changed_df), check_exact=True)
+        print(f"{'changed input':>14}: {seconds:6.2f} s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        budget = 64 * 2**20
+        cache = StageCache(directory, max_bytes=budget)
+        result = clean_data(raw_df, cache=cache)
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
+        if cache.size() > budget:
+            raise Exception(f"Cache of {cache.size()} bytes over its {budget} budget.")
+        print(
+            f"Cache within a {budget / 2**20:.0f} MiB budget: "
+            f"{cache.size() / 2**20:.0f} MiB"
+        )
+
+    print("Cached outputs identical")
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,103 @@
+# benchmarks/bench_streaming.py
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import numpy as np
+
+from assets.utils import create_dataframe
+from benchmarks.bench_clean import make_raw_activities
+from benchmarks.bench_memory import current_rss, peak_rss
+from modules.processing import clean_data
+from modules.schema import apply_clean_schema
+from modules.streaming import clean_csv_in_chunks
+
+"""
+Chunked cleaning of a raw CSV file (modules.streaming) against cleaning the whole file
+in memory: checks that both write exactly the same clean CSV, and compares their run
+time and peak memory (RSS, each variant in its own process).
+
+The raw file is shuffled, and gaps only appear in part of the file, so chunks are
+parsed with different dtypes than the whole file (e.g. heart rates without gaps are
+read as integers).
+"""
+
+
+def make_raw_csv(path: str, count: int) -> None:
+    rng = np.random.default_rng(2)
+    df = make_raw_activities(count).sample(frac=1, random_state=2)
+
+    # Whole numbers, with gaps only in the second half of the file
+    first_half = np.arange(count) < count // 2
+    for column in ["max_heartrate", "suffer_score"]:
+        values = df[column].to_numpy()
+        values[first_half & np.isnan(values)] = rng.integers(150, 200)
+        df[column] = values
+    df["trainer"] = df["trainer"].astype(object)
+    df.loc[df.index[-count // 10 :], "trainer"] = np.nan
+
+    df.to_csv(path, index=False)
+
+
+def clean_in_memory(csv_file: str, output_path: str, chunksize: int) -> int:
+    df = apply_clean_schema(clean_data(create_dataframe(csv_file)))
+    df.to_csv(output_path, index=False)
+    return len(df)
+
+
+VARIANTS = {"in memory": clean_in_memory, "chunked": clean_csv_in_chunks}
+
+
+def measure(variant: str, csv_file: str, output_path: str, chunksize: int) -> None:
+    base = current_rss()
+    start = time.perf_counter()
+    rows = VARIANTS[variant](csv_file, output_path, chunksize)
+    elapsed = time.perf_counter() - start
+
+    peak = peak_rss()
+    print(f"{base} {peak} {elapsed} {rows}")
+
+
+def run(count: int = 1_000_000, chunksize: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as directory:
+        csv_file = os.path.join(directory, "raw.csv")
+        make_raw_csv(csv_file, count)
+
+        outputs = []
+        for variant in VARIANTS:
+            output_path = os.path.join(directory, f"{len(outputs)}.csv")
+            outputs.append(output_path)
+            output = subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.bench_streaming",
+                    "--measure",
+                    variant,
+                    csv_file,
+                    output_path,
+                    str(chunksize),
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout.split()
+            base, peak, elapsed, rows = output[-4:]
+            print(
+                f"{variant:>9}: {count} activities -> {rows} rows in "
+                f"{float(elapsed):5.2f} s, peak RSS {int(peak) / 2**20:7.0f} MiB "
+                f"({(int(peak) - int(base)) / 2**20:6.0f} MiB above the start)"
+            )
+
+        with open(outputs[0], "rb") as expected, open(outputs[1], "rb") as result:
+            if expected.read() != result.read():
+                raise Exception("The chunked output differs from the in-memory one.")
+        print("Clean CSV files identical")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--measure"]:
+        measure(sys.argv[2], sys.argv[3], sys.argv[4], int(sys.argv[5]))
+    else:
+        run(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,81 @@
+# benchmarks/bench_training_load.py
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_clean import make_raw_activities
+from modules.processing import clean_data
+from modules.schema import apply_clean_schema
+from modules.training_load import TrainingLoad, compute_training_load, daily_loads
+
+"""
+Incremental training load (modules.training_load) against the full recompute: checks
+that appending the days one at a time, and updating after a past day's load changed
+and new days were added, give the same CTL, ATL and TSB as pandas ewm over the whole
+series, for the suffer score and the power-based TSS as the load. Then compares the
+cost of keeping the training load current for a year of daily refreshes: one append
+per day against a full ewm over the history on every refresh.
+"""
+
+
+def assert_same(training_load: pd.DataFrame, expected: pd.DataFrame) -> None:
+    pd.testing.assert_series_equal(training_load["date"], expected["date"])
+    for column in ["load", "ctl", "atl", "tsb"]:
+        np.testing.assert_allclose(
+            training_load[column], expected[column], rtol=1e-9, atol=1e-9
+        )
+
+
+def run(count: int = 20_000, refresh_days: int = 365) -> None:
+    clean_df = apply_clean_schema(clean_data(make_raw_activities(count)))
+
+    for load in ["suffer_score", "tss"]:
+        loads = daily_loads(clean_df, load)
+
+        # One day at a time
+        training_load = TrainingLoad()
+        for day, value in loads.items():
+            training_load.append(day, value)
+        assert_same(training_load.to_frame(), compute_training_load(loads))
+
+        # A refresh that changes a past day and adds a week, with an end after it
+        refreshed = loads.copy()
+        refreshed.iloc[-30] += 50.0
+        end = loads.index[-1] + pd.Timedelta(days=7)
+        refreshed = refreshed.reindex(
+            pd.date_range(loads.index[0], end, freq="D", name="date"), fill_value=0.0
+        )
+        refreshed.iloc[-3] = 80.0
+        recomputed = training_load.update(refreshed)
+        assert recomputed == 30 + 7, recomputed
+        assert_same(training_load.to_frame(), compute_training_load(refreshed))
+        assert training_load.update(refreshed) == 0
+
+        print(f"{load:>12}: {len(loads)} days, incremental identical to full recompute")
+
+    # Keeping the training load current over a year of daily refreshes
+    history, new_days = loads.iloc[:-refresh_days], loads.iloc[-refresh_days:]
+    training_load = TrainingLoad()
+    training_load.update(history)
+
+    start = time.perf_counter()
+    for day, value in new_days.items():
+        training_load.append(day, value)
+    incremental = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for position in range(len(history) + 1, len(loads) + 1):
+        expected = compute_training_load(loads.iloc[:position])
+    full = time.perf_counter() - start
+
+    assert_same(training_load.to_frame(), expected)
+    print(
+        f"{refresh_days} daily refreshes over {len(history)}+ days: append "
+        f"{incremental / refresh_days * 1e6:7.1f} us/day, full recompute "
+        f"{full / refresh_days * 1e6:7.1f} us/day"
+    )
+
+
+if __name__ == "__main__":
+    run(*(int(arg) for arg in sys.argv[1:]))
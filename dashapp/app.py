@@ -4,16 +4,18 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-from dash import Dash, dcc, html, Input, Output
+from dash import Dash, dcc, html, Input, Output, State, no_update
 import dash_bootstrap_components as dbc
 import plotly.graph_objects as go
 import pandas as pd
 
-from main import main
-from assets.config import STRAVA_DATA_PATH
-from api.api import get_strava_activities
+from assets.config import STRAVA_DATA_PATH, AUTO_REFRESH_MINUTES, local_tz
 
+from dashapp.components.ids import *
 from dashapp.components.controls import *
+from dashapp.refresh import Dataset, RefreshManager
+from modules.schema import load_clean_data
+from dashapp.webhook import register_webhook
 
 from dashapp.layouts.overview import get_overview_layout
 from dashapp.layouts.goals import get_goals_layout
@@ -31,7 +33,12 @@ DASHBOARD
 # Load Strava Data
 #fetch_strava_data()
 #df = main()
-df = pd.read_csv(STRAVA_DATA_PATH)
+dataset = Dataset(load_clean_data(STRAVA_DATA_PATH))
+
+# Refresh jobs run in a separate process and publish to the shared dataset
+refresh_manager = RefreshManager(dataset, lambda: load_clean_data(STRAVA_DATA_PATH))
+if AUTO_REFRESH_MINUTES:
+    refresh_manager.schedule(AUTO_REFRESH_MINUTES)
 
 
 # Create the Dash app
@@ -48,44 +55,86 @@ app = Dash(
 
 server = app.server
 
+# Strava pushes new/updated/deleted activities to the webhook endpoint
+webhook_worker = register_webhook(server, dataset)
+
 # Set up the layout with a placeholder for dynamic content
 app.layout = dbc.Container(
     [
         dcc.Location(id="url", refresh=False),
         dcc.Store(id="pathname-store"),
+        dcc.Store(id=DATA_VERSION_STORE, data=dataset.version),
+        dcc.Interval(id=REFRESH_PROGRESS_INTERVAL, interval=1000, disabled=True),
+        html.Div(id=REFRESH_PROGRESS_DIV),
         html.Div(id="page-content"),
     ]
 )
 
 
-# Button to update Strava data
+# Button to update Strava data, the refresh itself runs in the background
 @app.callback(
     Output("alert-div", "children"),
+    Output(REFRESH_PROGRESS_INTERVAL, "disabled", allow_duplicate=True),
     Input(REFRESH_DATA_BUTTON, "n_clicks"),
     prevent_initial_call=True,
 )
 def update_data(n_clicks):
     if n_clicks:
-        get_strava_activities()
-        main()
-        df = pd.read_csv(STRAVA_DATA_PATH)
-        return dbc.Alert(
-            "Data updated.",
-            color="success",
-            dismissable=True,
-            duration=1000,
+        refresh_manager.start()  # No-op while a refresh is already running
+        return "", False
+    return "", True
+
+
+# Poll the background refresh and re-render the page once new data is published
+@app.callback(
+    Output(REFRESH_PROGRESS_DIV, "children"),
+    Output(REFRESH_PROGRESS_INTERVAL, "disabled"),
+    Output(DATA_VERSION_STORE, "data"),
+    Input(REFRESH_PROGRESS_INTERVAL, "n_intervals"),
+    State(DATA_VERSION_STORE, "data"),
+    prevent_initial_call=True,
+)
+def show_refresh_progress(n_intervals, shown_version):
+    state = refresh_manager.state
+    version = dataset.version if dataset.version != shown_version else no_update
+
+    if state["state"] == "running":
+        progress = dbc.Progress(
+            value=100 * state["progress"],
+            label=state["message"],
+            striped=True,
+            animated=True,
         )
-    return ""
+        return progress, False, version
+
+    if state["state"] == "done":
+        alert = dbc.Alert(
+            state["message"], color="success", dismissable=True, duration=3000
+        )
+        return alert, True, version
+
+    if state["state"] == "failed":
+        alert = dbc.Alert(state["message"], color="danger", dismissable=True)
+        return alert, True, version
+
+    return "", True, version
 
 
 # Layout Specific Callbacks
-register_overview_callbacks(app, df)
-register_bike_stats_callbacks(app, df)
+register_overview_callbacks(app, dataset)
+register_bike_stats_callbacks(app, dataset)
 
 
 # Callback to dynamically change page content based on URL pathname
-@app.callback(Output("page-content", "children"), [Input("url", "pathname")])
-def display_page(pathname: str):
+@app.callback(
+    Output("page-content", "children"),
+    [Input("url", "pathname"), Input(DATA_VERSION_STORE, "data")],
+)
+def display_page(pathname: str, data_version: int = None):
+    # The frame and its training load of the same version
+    with dataset.lock:
+        df, training_load = dataset.df, dataset.training_load
+
     if pathname == "/":
         return get_overview_layout(
             month_checklist=get_month_checklist(df),
@@ -96,7 +145,9 @@ def display_page(pathname: str):
     elif pathname == "/last_activity":
         return get_last_activity_layout()
     elif pathname == "/goals":
-        return get_goals_layout(df)
+        # Fitness and fatigue decay up to today, also without a publish since
+        today = pd.Timestamp.now(tz=local_tz).date()
+        return get_goals_layout(df, training_load.to_frame(end=today))
 
     elif pathname == "/stats/bike":
         return get_bike_stats_layout(
@@ -1,10 +1,12 @@
 # dashapp/callbacks/bike_stats_callback.py
 from dash import Input, Output, State, Dash, callback_context
-import pandas as pd
 
+from assets.config import DISPLAY_UNITS
 from assets.utils import ALL_MONTHS, CURRENT_MONTH
 from dashapp.components.plots.stats_plots import *
 from dashapp.components.ids import *
+from dashapp.refresh import Dataset
+from modules.metrics import DERIVED_METRICS
 
 
 """
@@ -12,7 +14,7 @@ Callbacks for the "Bike Stats"-layout.
 """
 
 
-def register_bike_stats_callbacks(app: Dash, df: pd.DataFrame):
+def register_bike_stats_callbacks(app: Dash, dataset: Dataset):
 
     @app.callback(
         [
@@ -27,6 +29,8 @@ def register_bike_stats_callbacks(app: Dash, df: pd.DataFrame):
         [Input(YEAR_DROPDOWN, "value"), Input(BIKE_METRICS_CHECKLIST, "value"), Input(ENVIRONMENT_CHECKLIST, "value")],
     )
     def update_bike_stats(selected_year, selected_metrics, selected_environment):
+        metrics = dataset.metrics  # Derived metrics of the latest published dataset
+        df = metrics.df
 
         # Enforce the limit of 2 options selected for the checklist
         if len(selected_metrics) > 2:
@@ -38,6 +42,14 @@ def register_bike_stats_callbacks(app: Dash, df: pd.DataFrame):
         else:
             df_filtered = df.copy()
 
+        # Speed and the selected metrics in the display units; derived metrics (e.g.
+        # elevation_rate) are not columns of the clean table
+        columns = ["average_speed"] + [
+            metric
+            for metric in selected_metrics
+            if metric in df_filtered.columns or metric in DERIVED_METRICS
+        ]
+        df_filtered[columns] = metrics.frame(columns, DISPLAY_UNITS, df_filtered.index)
 
         # Generate line charts based on the selected year
         bike_stats_average_speed_line_chart = get_average_metric_line_chart(
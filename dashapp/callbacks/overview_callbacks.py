@@ -1,17 +1,17 @@
 # dashapp/callbacks/overview_callbacks.py
 from dash import Input, Output, State, Dash, callback_context
-import pandas as pd
 
 from assets.utils import ALL_MONTHS, CURRENT_MONTH
 from dashapp.components.plots.overview_plots import *
 from dashapp.components.ids import *
+from dashapp.refresh import Dataset
 
 """
 Callbacks for the "Overview"-layout.
 """
 
 
-def register_overview_callbacks(app: Dash, df: pd.DataFrame):
+def register_overview_callbacks(app: Dash, dataset: Dataset):
     @app.callback(
         [
             Output(ACTIVITY_COUNT_MONTH, "children"),
@@ -51,6 +51,8 @@ def register_overview_callbacks(app: Dash, df: pd.DataFrame):
         current_sport_type_values,
         current_year_values,
     ):
+        df = dataset.df  # Latest published dataset
+
         # Handle button clicks
         triggered_id = callback_context.triggered_id
 
@@ -128,7 +128,7 @@ def get_bike_metrics_checklist(df: pd.DataFrame) -> html.Div:
 
 
 def get_environment_checklist(df: pd.DataFrame) -> html.Div:
-    options = df["environment"].unique()
+    options = list(df["environment"].dropna().unique())
     return html.Div(
         children=[
             dbc.Checklist(
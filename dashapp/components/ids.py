@@ -17,6 +17,11 @@ BIKE_METRICS_CHECKLIST = "bike-metrics-checklist"
 RUN_METRICS_CHECKLIST = "run-metrics-checklist"
 ENVIRONMENT_CHECKLIST = "environment-checklist"
 
+# REFRESH
+REFRESH_PROGRESS_INTERVAL = "refresh-progress-interval"
+REFRESH_PROGRESS_DIV = "refresh-progress-div"
+DATA_VERSION_STORE = "data-version-store"
+
 # DROPDOWNS
 YEAR_DROPDOWN = "year-dropdown"
 
@@ -33,6 +38,8 @@ BIKE_STATS_AVERAGE_POWER_LINE_CHART = "bike-stats-average-power-line-chart"
 BIKE_STATS_AVERAGE_HR_LINE_CHART = "bike-stats-average-hr-line-chart"
 BIKE_STATS_COMPARISON_CHART = "bike-stats-comparison-chart"
 
+TRAINING_LOAD_CHART = "training-load-chart"
+
 # GENERAL VALUES
 ACTIVITY_COUNT_MONTH = "month-activity-count"
 SUFFER_SCORE_MONTH = "month-suffer-score-sum"
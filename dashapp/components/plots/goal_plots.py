@@ -130,3 +130,43 @@ def get_duration_goal_chart(df: pd.DataFrame, current_month: str):
     fig = apply_plot_styles(fig, LINE_CHART_PLOT_STYLE)
 
     return fig
+
+
+def get_training_load_chart(df: pd.DataFrame, days: int = 365):
+    """Line Chart - Fitness (CTL), Fatigue (ATL) and Form (TSB) by Day"""
+
+    # Only the last year
+    df = df[df["date"] > df["date"].max() - pd.Timedelta(days=days)]
+
+    # Create the figure object
+    fig = go.Figure()
+
+    for column, name, color in [
+        ("ctl", "Fitness (CTL)", "#7eb0d5"),
+        ("atl", "Fatigue (ATL)", "#fd7f6f"),
+        ("tsb", "Form (TSB)", "gray"),
+    ]:
+        fig.add_trace(
+            go.Scatter(
+                x=df["date"],
+                y=df[column],
+                mode="lines",
+                name=name,
+                line=dict(color=color),
+            )
+        )
+
+    # Customize layout
+    fig.update_layout(
+        xaxis_title=None,
+        yaxis_title=dict(
+            text="Training load",
+            font=dict(size=16),
+        ),
+        margin=dict(l=0, r=0, t=20, b=0),
+        height=300,
+    )
+
+    fig = apply_plot_styles(fig, LINE_CHART_PLOT_STYLE)
+
+    return fig
@@ -23,9 +23,9 @@ def get_overview_duration_bar_chart(df: pd.DataFrame, selected_months: list):
     selected_months_sorted = sorted(valid_months, key=lambda x: ALL_MONTHS.index(x))
 
     # Aggregate data
-    df_aggregated = df.groupby(["month", "sport_type"], as_index=False).agg(
-        {"duration": "sum"}
-    )
+    df_aggregated = df.groupby(
+        ["month", "sport_type"], as_index=False, observed=True
+    ).agg({"duration": "sum"})
 
     # Sort by month
     df_aggregated["month"] = pd.Categorical(
@@ -91,9 +91,9 @@ def get_overview_distance_bar_chart(df: pd.DataFrame, selected_months: list):
     selected_months_sorted = sorted(valid_months, key=lambda x: ALL_MONTHS.index(x))
 
     # Aggregate data
-    df_aggregated = df.groupby(["month", "sport_type"], as_index=False).agg(
-        {"distance": "sum"}
-    )
+    df_aggregated = df.groupby(
+        ["month", "sport_type"], as_index=False, observed=True
+    ).agg({"distance": "sum"})
 
     # Sort by month
     df_aggregated["month"] = pd.Categorical(
@@ -153,7 +153,9 @@ def get_overview_activity_count_pie_chart(df: pd.DataFrame, selected_months: lis
     df = df.copy()
 
     # Aggregate data
-    df_aggregated = df.groupby("sport_type").size().reset_index(name="count")
+    df_aggregated = (
+        df.groupby("sport_type", observed=True).size().reset_index(name="count")
+    )
 
     # Ensure all sports types are present in the color map
     for sport_type in SPORT_TYPE_COLORS.keys():
@@ -204,9 +206,9 @@ def get_overview_effort_scatter_chart(df: pd.DataFrame, selected_months: list):
     selected_months_sorted = sorted(valid_months, key=lambda x: ALL_MONTHS.index(x))
 
     # Aggregate data
-    df_aggregated = df.groupby(["month", "sport_type"], as_index=False).agg(
-        {"suffer_score": "sum"}
-    )
+    df_aggregated = df.groupby(
+        ["month", "sport_type"], as_index=False, observed=True
+    ).agg({"suffer_score": "sum"})
 
     # Sort by month
     df_aggregated["month"] = pd.Categorical(
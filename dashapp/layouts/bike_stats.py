@@ -5,6 +5,8 @@ from dash import dcc, html
 
 from dashapp.components.navbar import navbar
 from dashapp.components.ids import *
+from assets.config import DISPLAY_UNITS
+from modules.metrics import unit_label
 
 """ 
 BIKE STATS
@@ -24,7 +26,7 @@ def get_bike_stats_layout(**controls):
                             dbc.CardBody(
                                 html.Div(
                                     children=[
-                                        html.H4("Speed (kph)"),
+                                        html.H4(f"Speed ({unit_label('average_speed', DISPLAY_UNITS)})"),
                                         dcc.Graph(
                                             id=BIKE_STATS_AVERAGE_SPEED_LINE_CHART,
                                             style={
@@ -9,6 +9,7 @@ from dashapp.components.ids import *
 from dashapp.components.plots.goal_plots import (
     get_duration_goal_chart,
     get_distance_goal_chart,
+    get_training_load_chart,
 )
 
 from assets.utils import CURRENT_MONTH
@@ -19,7 +20,7 @@ GOALS LAYOUT
 """
 
 
-def get_goals_layout(df: pd.DataFrame) -> html.Div:
+def get_goals_layout(df: pd.DataFrame, training_load: pd.DataFrame) -> html.Div:
     # Get the dataframes
     (
         df_bike_duration_goal_2024,
@@ -41,6 +42,8 @@ def get_goals_layout(df: pd.DataFrame) -> html.Div:
         df_run_distance_goal_2024, CURRENT_MONTH
     )
 
+    training_load_chart = get_training_load_chart(training_load)
+
     return dbc.Container(
         [
             # Navbar
@@ -101,6 +104,29 @@ def get_goals_layout(df: pd.DataFrame) -> html.Div:
                                     ),
                                 ],
                             ),
+                            dbc.Row(
+                                [
+                                    dbc.Col(
+                                        dbc.Card(
+                                            dbc.CardBody(
+                                                html.Div(
+                                                    children=[
+                                                        html.H4("Training Load"),
+                                                        dcc.Graph(
+                                                            id=TRAINING_LOAD_CHART,
+                                                            figure=training_load_chart,
+                                                        ),
+                                                    ],
+                                                    className="text-center",
+                                                )
+                                            ),
+                                            color="light",
+                                        ),
+                                        className="overview-large-card",
+                                        width=12,
+                                    ),
+                                ],
+                            ),
                         ],
                         width=12,
                     ),
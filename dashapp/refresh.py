@@ -0,0 +1,171 @@
+# dashapp/refresh.py
+import queue
+import logging
+import threading
+import multiprocessing
+import pandas as pd
+
+from assets.config import setup_logging
+from modules.metrics import DerivedMetrics
+from modules.training_load import TrainingLoad, daily_loads
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Background data refresh for the dashboard.
+
+The sync and clean run in a separate process, so the pandas work neither blocks a
+Dash request thread nor holds the server's GIL. The job reports its progress through
+a queue. When it finishes, the new clean dataset is published to every callback at
+once by swapping the reference held by the shared Dataset.
+"""
+
+
+class Dataset:
+    """
+    Holds the clean DataFrame shared by all callbacks.
+
+    Callbacks read `df` on every call, so publishing a new frame is a single reference
+    swap and readers see either the old or the new dataset, never a mix. `metrics`
+    holds the derived metrics of the same version (see modules.metrics); its `df` is
+    the frame they belong to. `training_load` holds fitness, fatigue and form up to
+    the last activity (see modules.training_load): a publish updates a copy, which
+    appends the new days and only recomputes from the first day whose load changed,
+    and swaps it in with `df` and `metrics`. Readers that need more than one of them
+    take them together under `lock`.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.lock = threading.Lock()
+        self.df = df
+        self.version = 0
+        self.metrics = DerivedMetrics(df, self.version)
+        self.training_load = TrainingLoad()
+        self.training_load.update(daily_loads(df))
+
+    def publish(self, df: pd.DataFrame) -> int:
+        """
+        Replace the dataset and bump its version.
+
+        :param df: The new clean DataFrame.
+        :return: The new version number.
+        """
+        with self.lock:
+            # The published training load is never modified, readers may still use it
+            training_load = self.training_load.copy()
+            training_load.update(daily_loads(df))
+
+            self.version += 1
+            self.metrics = DerivedMetrics(df, self.version)
+            self.training_load = training_load
+            self.df = df
+            return self.version
+
+
+def run_refresh_job(progress: multiprocessing.Queue) -> None:
+    """
+    Sync new activities and rebuild the clean dataset. Runs in the child process.
+
+    :param progress: Queue receiving (state, fraction done, message) tuples.
+    """
+    # Imported here so the dashboard process does not load the sync stack
+    from api.update_data import fetch_strava_data
+    from main import main
+
+    try:
+        progress.put(("running", 0.1, "Fetching new activities..."))
+        count = fetch_strava_data()
+
+        progress.put(("running", 0.5, f"Fetched {count} activities, cleaning data..."))
+        if main(incremental=True) is None:
+            raise Exception("Cleaning the data failed, see the logs for details.")
+
+        progress.put(("done", 1.0, "Data updated."))
+    except Exception as e:
+        progress.put(("failed", 1.0, f"Data refresh failed: {e}"))
+
+
+class RefreshManager:
+    """
+    Starts refresh jobs in a child process and publishes their result.
+
+    :param dataset: The Dataset to publish the refreshed data to.
+    :param load_data: Function returning the clean DataFrame written by the job.
+    """
+
+    def __init__(self, dataset: Dataset, load_data):
+        self.dataset = dataset
+        self.load_data = load_data
+        self.lock = threading.Lock()
+        self.process = None
+        self.state = {"state": "idle", "progress": 0.0, "message": ""}
+        self.stop_event = threading.Event()
+
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self) -> bool:
+        """
+        Start a refresh job unless one is already running.
+
+        :return: True if a new job was started.
+        """
+        with self.lock:
+            if self.is_running():
+                return False
+
+            context = multiprocessing.get_context("spawn")
+            progress = context.Queue()
+            self.process = context.Process(
+                target=run_refresh_job, args=(progress,), daemon=True
+            )
+            self.process.start()
+            self.state = {"state": "running", "progress": 0.0, "message": "Starting..."}
+
+        threading.Thread(
+            target=self.monitor, args=(self.process, progress), daemon=True
+        ).start()
+        return True
+
+    def monitor(self, process, progress) -> None:
+        """
+        Follow a job's progress and publish the new dataset when it succeeds.
+        """
+        while True:
+            try:
+                state, fraction, message = progress.get(timeout=1)
+            except queue.Empty:
+                if process.is_alive():
+                    continue
+                state, fraction, message = "failed", 1.0, "Data refresh crashed."
+
+            if state == "done":
+                try:
+                    self.dataset.publish(self.load_data())
+                except Exception as e:
+                    state, message = "failed", f"Loading refreshed data failed: {e}"
+
+            self.state = {"state": state, "progress": fraction, "message": message}
+            if state in ("done", "failed"):
+                logger.info(message)
+                process.join()
+                return
+
+    def schedule(self, interval_minutes: float) -> None:
+        """
+        Start a refresh job every `interval_minutes` in a background thread.
+        """
+
+        def loop():
+            while not self.stop_event.wait(interval_minutes * 60):
+                self.start()
+
+        threading.Thread(target=loop, daemon=True).start()
+        logger.info(f"Scheduled a data refresh every {interval_minutes} minutes.")
+
+    def stop(self) -> None:
+        """
+        Stop the scheduled refresh.
+        """
+        self.stop_event.set()
@@ -0,0 +1,165 @@
+# dashapp/webhook.py
+import queue
+import logging
+import threading
+import requests
+from flask import Flask, request, jsonify
+
+from assets.config import (
+    setup_logging,
+    STRAVA_WEBHOOK_PATH,
+    STRAVA_WEBHOOK_VERIFY_TOKEN,
+    STRAVA_WEBHOOK_SUBSCRIPTION_ID,
+    STRAVA_ATHLETE_ID,
+    SYNC_STREAMS,
+)
+from assets.utils import data_file_path
+from api.api import get_strava_activity
+from api.decode import ActivityColumns
+from api.streams import fetch_strava_streams
+from modules.incremental import IncrementalCleaner
+from modules.raw_store import RawActivityStore
+from modules.schema import save_clean_data
+from dashapp.refresh import Dataset
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Strava webhook endpoint for the dashboard's Flask server.
+
+Strava pushes an event for every created, updated or deleted activity. The endpoint only
+queues events of the configured subscription and athlete, and answers right away (Strava
+expects a reply within two seconds). A worker thread then hydrates the activity with a
+single API call, upserts it into the raw store and brings the clean dataset up to date
+incrementally, which is saved and published to the dashboard callbacks. A delete is only
+applied once the API confirms the activity is gone (404), so a forged event cannot
+remove activities. With SYNC_STREAMS, the streams of a created activity are fetched
+after the dataset is published.
+"""
+
+
+class WebhookWorker:
+    """
+    Applies queued webhook events one at a time in a background thread.
+
+    :param dataset: The Dataset shared by the dashboard callbacks.
+    :param store: The raw activity store. Defaults to RAW_STORE_DIR.
+    """
+
+    def __init__(self, dataset: Dataset, store: RawActivityStore = None):
+        self.dataset = dataset
+        self.store = store or RawActivityStore()
+        self.cleaner = IncrementalCleaner()
+        self.events = queue.Queue()
+        self.processed = 0
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, event: dict) -> None:
+        self.events.put(event)
+
+    def run(self) -> None:
+        while True:
+            event = self.events.get()
+            try:
+                self.handle(event)
+            except Exception as e:
+                logger.error(f"Failed to apply webhook event {event}: {e}")
+            finally:
+                self.processed += 1
+                self.events.task_done()
+
+    def handle(self, event: dict) -> None:
+        """
+        Apply a single webhook event to the raw store and the clean dataset.
+
+        :param event: Strava webhook event.
+        """
+        if event.get("object_type") != "activity":
+            return
+
+        activity_id = int(event["object_id"])
+
+        if event.get("aspect_type") == "delete":
+            if not activity_deleted(activity_id):
+                logger.warning(f"Ignored delete of {activity_id}, it still exists.")
+                return
+            self.store.delete([activity_id])
+        else:
+            columns = ActivityColumns()
+            columns.extend([get_strava_activity(activity_id)])
+            self.store.upsert(columns.to_frame())
+
+        clean_df = self.cleaner.refresh(self.store)
+        clean_df = save_clean_data(clean_df, data_file_path("clean_data.csv"))
+        self.dataset.publish(clean_df)
+        logger.info(f"Applied webhook {event.get('aspect_type')} for {activity_id}.")
+
+        if SYNC_STREAMS and event.get("aspect_type") == "create":
+            fetch_strava_streams([activity_id])
+
+
+def activity_deleted(activity_id: int) -> bool:
+    """
+    Whether the API answers 404 for an activity, i.e. it was really deleted.
+    """
+    try:
+        get_strava_activity(activity_id)
+    except requests.exceptions.HTTPError as e:
+        return e.response is not None and e.response.status_code == 404
+    return False
+
+
+def is_authorized(event: dict, subscription_id: str, athlete_id: str) -> bool:
+    """
+    Whether an event comes from our subscription and, if configured, our athlete.
+    """
+    if not subscription_id or str(event.get("subscription_id")) != subscription_id:
+        return False
+    return not athlete_id or str(event.get("owner_id")) == athlete_id
+
+
+def register_webhook(
+    server: Flask,
+    dataset: Dataset,
+    verify_token: str = STRAVA_WEBHOOK_VERIFY_TOKEN,
+    subscription_id: str = STRAVA_WEBHOOK_SUBSCRIPTION_ID,
+    athlete_id: str = STRAVA_ATHLETE_ID,
+) -> WebhookWorker:
+    """
+    Add the Strava webhook routes to the Flask server.
+
+    :param server: The Flask server (`app.server`).
+    :param dataset: The Dataset shared by the dashboard callbacks.
+    :param verify_token: Token Strava echoes back when validating a subscription.
+    :param subscription_id: Id of our subscription; events of others are rejected,
+        and all events when it is empty.
+    :param athlete_id: Id of our athlete; events of others are rejected if set.
+    :return: The worker applying the queued events.
+    """
+    worker = WebhookWorker(dataset)
+
+    @server.route(STRAVA_WEBHOOK_PATH, methods=["GET"])
+    def validate_subscription():
+        # Subscription handshake: echo the challenge if the verify token matches
+        if (
+            request.args.get("hub.mode") != "subscribe"
+            or not verify_token
+            or request.args.get("hub.verify_token") != verify_token
+        ):
+            return jsonify({"error": "Invalid verify token."}), 403
+        return jsonify({"hub.challenge": request.args.get("hub.challenge")})
+
+    @server.route(STRAVA_WEBHOOK_PATH, methods=["POST"])
+    def receive_event():
+        event = request.get_json(silent=True)
+        if not isinstance(event, dict) or "object_id" not in event:
+            return jsonify({"error": "Invalid event."}), 400
+        if not is_authorized(event, subscription_id, athlete_id):
+            return jsonify({"error": "Unknown subscription or athlete."}), 403
+
+        worker.submit(event)
+        return "", 200
+
+    return worker
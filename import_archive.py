@@ -0,0 +1,211 @@
+# import_archive.py
+import os
+import sys
+import zipfile
+import logging
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from assets.config import IMPORT_MAX_WORKERS, IMPORT_BATCH_SIZE, STREAMS_DIR
+from api.decode import RAW_COLUMNS
+from api.streams import save_streams
+from modules.activity_files import file_parser, parse_activity_file
+from modules.raw_store import RawActivityStore
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+Imports a Strava account export (the ZIP requested under Settings > My Account) into
+the raw activity store, as a faster alternative to backfilling through the API.
+
+The summaries come from the archive's activities.csv. The activity files it points to
+(FIT, GPX and TCX, optionally gzipped) are parsed in a process pool, each worker
+reading its files straight from the archive, and saved as streams next to the ones
+fetched from the API. Activities are written to the store in batches, so an interrupted import picks up
+where it stopped.
+
+The export has no time zone per activity, so "timezone" is left empty. "trainer" is
+set for rides and runs whose file has no GPS track.
+
+Usage: python import_archive.py export.zip [--workers N] [--overwrite]
+"""
+
+# activities.csv column for each raw field. Exports repeat some headers, pandas
+# suffixes the second one with ".1" (e.g. "Distance" is in km, "Distance.1" in m)
+EXPORT_COLUMNS = {
+    "moving_time": "Moving Time",
+    "total_elevation_gain": "Elevation Gain",
+    "average_speed": "Average Speed",
+    "max_speed": "Max Speed",
+    "average_heartrate": "Average Heart Rate",
+    "max_heartrate": "Max Heart Rate",
+    "suffer_score": "Relative Effort",
+    "average_watts": "Average Watts",
+    "average_cadence": "Average Cadence",
+}
+
+EXPORT_DATE_FORMAT = "%b %d, %Y, %I:%M:%S %p"  # e.g. "Jan 5, 2024, 7:12:33 AM", UTC
+
+TRAINER_SPORT_TYPES = ["Ride", "Run"]
+
+# Per-process state of the import workers, set by init_worker
+worker_archive = None
+worker_streams_dir = STREAMS_DIR
+
+
+def read_export_activities(file) -> pd.DataFrame:
+    """
+    Read the activities.csv of an export into the raw activity format.
+
+    :param file: File object of activities.csv.
+    :return: DataFrame with RAW_COLUMNS plus the "filename" of each activity file,
+        indexed by activity id.
+    """
+    export = pd.read_csv(file, thousands=",")
+
+    def number(column):
+        if column not in export:
+            return pd.Series(np.nan, index=export.index)
+        return pd.to_numeric(export[column], errors="coerce").astype(float)
+
+    sport_types = export["Activity Type"].str.replace(" ", "", regex=False)
+    df = pd.DataFrame(
+        {
+            "id": export["Activity ID"].astype("int64"),
+            "start_date": pd.to_datetime(
+                export["Activity Date"], format=EXPORT_DATE_FORMAT, utc=True
+            ).dt.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "timezone": pd.Series(None, index=export.index, dtype=object),
+            "sport_type": sport_types,
+            "trainer": sport_types.str.startswith("Virtual"),
+            "distance": (
+                number("Distance.1")
+                if "Distance.1" in export
+                else number("Distance") * 1000
+            ),
+            **{name: number(column) for name, column in EXPORT_COLUMNS.items()},
+            "filename": export.get("Filename", pd.Series(None, index=export.index)),
+        }
+    )
+    df = df[[*RAW_COLUMNS, "filename"]].drop_duplicates("id", keep="last")
+    return df.set_index("id", drop=False)
+
+
+def init_worker(archive_path: str, streams_dir: str) -> None:
+    """
+    Open the archive once per worker process.
+    """
+    global worker_archive, worker_streams_dir
+    worker_archive = zipfile.ZipFile(archive_path)
+    worker_streams_dir = streams_dir
+
+
+def import_activity_file(task: tuple) -> tuple:
+    """
+    Parse one activity file from the archive and save its streams. Runs in a worker.
+
+    :param task: (activity id, file name in the archive).
+    :return: (activity id, whether the file has a GPS track, error message or None).
+    """
+    activity_id, filename = task
+    try:
+        with worker_archive.open(filename) as file:
+            df = parse_activity_file(file, filename)
+        save_streams(df, activity_id, worker_streams_dir)
+        return activity_id, bool(df["lat"].notna().any()), None
+    except Exception as e:
+        return activity_id, None, str(e)
+
+
+def import_archive(
+    archive_path: str,
+    max_workers: int = IMPORT_MAX_WORKERS,
+    store: RawActivityStore = None,
+    streams_dir: str = STREAMS_DIR,
+    overwrite: bool = False,
+    batch_size: int = IMPORT_BATCH_SIZE,
+) -> int:
+    """
+    Import a Strava export archive into the raw activity store.
+
+    :param archive_path: Path to the export ZIP.
+    :param max_workers: Number of processes parsing activity files.
+    :param store: Raw activity store to write to. Defaults to RAW_STORE_DIR.
+    :param streams_dir: Directory to save the parsed streams to.
+    :param overwrite: Also import activities that are already in the store (e.g.
+        synced from the API). They are skipped by default.
+    :param batch_size: Number of activities written to the store at a time.
+    :return: Number of activities imported.
+    """
+    store = store or RawActivityStore()
+    os.makedirs(streams_dir, exist_ok=True)
+
+    with zipfile.ZipFile(archive_path) as archive:
+        with archive.open("activities.csv") as file:
+            activities = read_export_activities(file)
+        members = set(archive.namelist())
+
+    if not overwrite and not store.is_empty():
+        activities = activities[~activities["id"].isin(store.read(columns=["id"])["id"])]
+    if activities.empty:
+        logger.info("No new activities in the archive.")
+        return 0
+
+    filenames = activities.pop("filename").fillna("")
+    has_file = filenames.isin(members) & filenames.map(file_parser).notna()
+
+    # Activities without a (supported) file only have their summary
+    store.upsert(activities[~has_file])
+    imported = int((~has_file).sum())
+
+    tasks = list(zip(filenames.index[has_file], filenames[has_file]))
+    chunksize = max(1, len(tasks) // (max_workers * 8))
+    batch = {}
+
+    def write_batch():
+        rows = activities.loc[list(batch)]
+        no_gps = pd.Series(batch).eq(False).reindex(rows.index, fill_value=False)
+        indoor = no_gps & rows["sport_type"].isin(TRAINER_SPORT_TYPES)
+        store.upsert(rows.assign(trainer=rows["trainer"] | indoor))
+        batch.clear()
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=init_worker,
+        initargs=(archive_path, streams_dir),
+    ) as executor:
+        for activity_id, has_gps, error in executor.map(
+            import_activity_file, tasks, chunksize=chunksize
+        ):
+            if error:
+                logger.warning(f"Failed to parse the file of {activity_id}: {error}")
+            batch[activity_id] = has_gps
+            imported += 1
+
+            if len(batch) >= batch_size:
+                write_batch()
+                logger.info(f"Imported {imported}/{len(activities)} activities.")
+
+    if batch:
+        write_batch()
+
+    logger.info(f"Imported {imported} activities from '{archive_path}'.")
+    return imported
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import a Strava export archive.")
+    parser.add_argument("archive", help="Path to the export ZIP.")
+    parser.add_argument("--workers", type=int, default=IMPORT_MAX_WORKERS)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        logger.error(f"Archive '{args.archive}' not found.")
+        sys.exit(1)
+
+    import_archive(args.archive, max_workers=args.workers, overwrite=args.overwrite)
@@ -1,45 +1,141 @@
 # main.py
+import os
+import argparse
 import pandas as pd
 import logging
 
-from assets.utils import create_dataframe, save_to_csv
+from assets.config import RAW_DATA_PATH, CLEAN_PROFILE_PATH, CLEAN_BACKEND
+from assets.utils import create_dataframe, data_file_path
 from modules.processing import clean_data
+from modules.backends import CLEAN_BACKENDS, clean_with_backend
+from modules.incremental import IncrementalCleaner
+from modules.parallel import clean_data_parallel
+from modules.profiling import StageProfiler
+from modules.schema import save_clean_data
+from modules.stage_cache import StageCache
+from modules.streaming import clean_csv_in_chunks
+from modules.raw_store import RawActivityStore
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
-def main(csv_file: str = "data/raw_data.csv") -> pd.DataFrame:
+def open_raw_store() -> RawActivityStore:
     """
-    Main function to process Strava data from a CSV file.
+    Open the raw activity store. A legacy data/raw_data.csv is imported into the store
+    the first time the store is used.
+    """
+    store = RawActivityStore()
+    if store.is_empty() and os.path.exists(RAW_DATA_PATH):
+        count = store.import_csv(RAW_DATA_PATH)
+        logger.info(f"Imported {count} activities from '{RAW_DATA_PATH}'.")
+
+    return store
+
+
+def load_raw_data(
+    csv_file: str = None, start_date: str = None, end_date: str = None
+) -> pd.DataFrame:
+    """
+    Load raw activities from a CSV file, or from the raw activity store.
+
+    :param csv_file: Path to a raw CSV file. Reads the raw activity store if None.
+    :param start_date: Only load activities from this date on (store only).
+    :param end_date: Only load activities up to this date (store only).
+    :return: DataFrame with the raw activities.
+    """
+    if csv_file:
+        return create_dataframe(csv_file)
+
+    return open_raw_store().read(start_date=start_date, end_date=end_date)
+
+
+def main(
+    csv_file: str = None,
+    start_date: str = None,
+    end_date: str = None,
+    incremental: bool = False,
+    profile: str = None,
+    stream: bool = False,
+    workers: int = 1,
+    cache: bool = True,
+    backend: str = CLEAN_BACKEND,
+) -> pd.DataFrame:
+    """
+    Main function to process Strava data from the raw activity store or a CSV file.
 
     This function performs the following steps:
-    1. Reads raw data from the specified CSV file.
+    1. Reads raw data from the raw activity store (or the specified CSV file).
     2. Checks if the raw data is empty and logs a warning if it is.
     3. Cleans and processes the data.
     4. Saves the cleaned data to a new CSV file.
     5. Returns the cleaned DataFrame.
 
-    :param csv_file: Path to the CSV file containing raw data. Defaults to "data/raw_data.csv".
+    :param csv_file: Path to a CSV file containing raw data. Reads the raw activity
+        store if None.
     :type csv_file: str
+    :param start_date: Only process activities from this date on (store only).
+    :param end_date: Only process activities up to this date (store only).
+    :param incremental: Only clean the activities that changed in the raw activity
+        store since the previous incremental run (see modules.incremental). Ignored
+        when a CSV file or a date range is given.
+    :param profile: Profile the cleaning stages, log a report and save it as JSON to
+        this path.
+    :param stream: Clean the CSV file in chunks, with bounded memory (see
+        modules.streaming). The cleaned data is only written to clean_data.csv, since
+        it may not fit in memory, and None is returned. Requires csv_file.
+    :param workers: Number of processes cleaning the data (see modules.parallel).
+        Not used by the incremental and streaming modes, or when profiling.
+    :param cache: Serve the cleaning stages whose input, code and config did not change
+        from the stage cache (see modules.stage_cache). Not used when profiling or
+        with more than one worker.
+    :param backend: DataFrame library cleaning the data, "pandas" or "polars" (see
+        modules.backends). The profiler, the stage cache and the workers are only used
+        by the pandas backend.
 
     :return: A DataFrame containing the cleaned and processed data, or None if an error occurs.
     :rtype: pd.DataFrame or None
     """
-    try:
-        # Load raw data
-        raw_data = create_dataframe(csv_file)
+    profiler = StageProfiler() if profile else None
 
-        if raw_data.empty:
-            logger.warning("The raw data is empty. No processing will be done.")
+    try:
+        if stream:
+            if not csv_file:
+                raise Exception("Streaming requires a CSV file (csv_file).")
+            count = clean_csv_in_chunks(csv_file, data_file_path("clean_data.csv"))
+            logger.info(f"Cleaned data ({count} rows) saved to 'clean_data.csv'.")
             return None
 
-        # Clean and process data
-        clean_df = clean_data(raw_data)
+        if incremental and not (csv_file or start_date or end_date):
+            cleaner = IncrementalCleaner(profiler=profiler)
+            clean_df = cleaner.refresh(open_raw_store())
+            if clean_df is None:
+                logger.warning("The raw data is empty. No processing will be done.")
+                return None
+        else:
+            # Load raw data
+            raw_data = load_raw_data(csv_file, start_date, end_date)
 
-        # Save the cleaned data to a CSV file
-        save_to_csv(clean_df, "clean_data")
+            if raw_data.empty:
+                logger.warning("The raw data is empty. No processing will be done.")
+                return None
+
+            # Clean and process data
+            if backend != "pandas":
+                clean_df = clean_with_backend(raw_data, backend)
+            elif workers > 1 and not profiler:
+                clean_df = clean_data_parallel(raw_data, max_workers=workers)
+            else:
+                stage_cache = StageCache() if cache and not profiler else None
+                clean_df = clean_data(raw_data, profiler=profiler, cache=stage_cache)
+
+        if profiler:
+            logger.info(f"Cleaning stages:\n{profiler.report()}")
+            profiler.save(profile)
+
+        # Save the cleaned data to a CSV file, in the clean table schema
+        clean_df = save_clean_data(clean_df, data_file_path("clean_data.csv"))
         logger.info("Cleaned data successfully saved to 'clean_data.csv'.")
 
         return clean_df
@@ -50,4 +146,40 @@ def main(csv_file: str = "data/raw_data.csv") -> pd.DataFrame:
 
 
 if __name__ == "__main__":
-    df = main()
+    parser = argparse.ArgumentParser(description="Clean the raw Strava activities.")
+    parser.add_argument("--csv", help="Raw CSV file to clean instead of the store.")
+    parser.add_argument("--start-date")
+    parser.add_argument("--end-date")
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument(
+        "--stream", action="store_true", help="Clean the --csv file in chunks."
+    )
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument(
+        "--backend", choices=list(CLEAN_BACKENDS), default=CLEAN_BACKEND
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true", help="Re-run every cleaning stage."
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const=CLEAN_PROFILE_PATH,
+        help=f"Profile the cleaning stages, JSON report to PROFILE "
+        f"(default {CLEAN_PROFILE_PATH}).",
+    )
+    args = parser.parse_args()
+    if args.stream and not args.csv:
+        parser.error("--stream requires --csv")
+
+    df = main(
+        args.csv,
+        args.start_date,
+        args.end_date,
+        args.incremental,
+        args.profile,
+        args.stream,
+        args.workers,
+        not args.no_cache,
+        args.backend,
+    )
@@ -0,0 +1,138 @@
+# modules/activity_files.py
+import gzip
+import numpy as np
+import pandas as pd
+import xml.etree.ElementTree as ET
+
+from api.streams import STREAM_COLUMNS
+from modules.fit import parse_fit
+
+"""
+Parsers for the activity files in a Strava account export (FIT, GPX and TCX,
+optionally gzipped).
+
+FIT files are decoded by `modules.fit`. GPX and TCX files are read with `iterparse`, so
+a track is decoded point by point and every trackpoint element is removed from its
+parent once its values are recorded, keeping memory flat however long the track is. The
+result has the same columns as the streams fetched from the API (see `api.streams`),
+with "time" in seconds since the first sample.
+"""
+
+# Point element and the child elements (by local name) holding each stream value
+GPX_POINT = "trkpt"
+GPX_FIELDS = {
+    "time": "time",
+    "ele": "altitude",
+    "hr": "heartrate",
+    "cad": "cadence",
+    "power": "watts",
+}
+
+TCX_POINT = "Trackpoint"
+TCX_FIELDS = {
+    "Time": "time",
+    "LatitudeDegrees": "lat",
+    "LongitudeDegrees": "lng",
+    "AltitudeMeters": "altitude",
+    "Value": "heartrate",  # HeartRateBpm/Value
+    "Cadence": "cadence",
+    "Watts": "watts",
+}
+
+
+def local_name(tag: str) -> str:
+    """
+    Strip the namespace from an element tag.
+    """
+    return tag.rpartition("}")[2]
+
+
+def parse_track(file, point_tag: str, fields: dict) -> pd.DataFrame:
+    """
+    Stream the trackpoints of an XML activity file into columns.
+
+    :param file: Binary file object of the XML document.
+    :param point_tag: Local name of the trackpoint element.
+    :param fields: Mapping of child element local name to stream column.
+    :return: DataFrame with STREAM_COLUMNS, NaN where a value is missing.
+    """
+    values = {column: [] for column in STREAM_COLUMNS}
+    point = None
+    names = {}  # The same few tags repeat for every point
+    open_elements = []  # Path from the root to the current element
+
+    for event, element in ET.iterparse(file, events=("start", "end")):
+        tag = names.get(element.tag)
+        if tag is None:
+            tag = names[element.tag] = local_name(element.tag)
+
+        if event == "start":
+            open_elements.append(element)
+            if tag == point_tag:
+                # GPX keeps the position in attributes, which are set on start
+                point = {"lat": element.get("lat"), "lng": element.get("lon")}
+            continue
+
+        open_elements.pop()
+        if point is None:
+            continue
+
+        if tag == point_tag:
+            for column, column_values in values.items():
+                column_values.append(point.get(column))
+            point = None
+            # Detach the point, a cleared element would still hang off its parent
+            open_elements[-1].remove(element)
+        elif tag in fields and element.text is not None:
+            point[fields[tag]] = element.text.strip()
+
+    times = pd.to_datetime(pd.Series(values.pop("time"), dtype=object), utc=True)
+    data = {"time": (times - times.iloc[0]).dt.total_seconds() if len(times) else []}
+    for column, column_values in values.items():
+        data[column] = np.array(column_values, dtype=object).astype(float)
+
+    return pd.DataFrame(data).reindex(columns=STREAM_COLUMNS)
+
+
+def parse_gpx(file) -> pd.DataFrame:
+    return parse_track(file, GPX_POINT, GPX_FIELDS)
+
+
+def parse_tcx(file) -> pd.DataFrame:
+    return parse_track(file, TCX_POINT, TCX_FIELDS)
+
+
+# Parser per file extension (after stripping ".gz")
+PARSERS = {".fit": parse_fit, ".gpx": parse_gpx, ".tcx": parse_tcx}
+
+
+def file_parser(filename: str):
+    """
+    Pick the parser for an activity file name.
+
+    :param filename: File name, e.g. "activities/1234.gpx.gz".
+    :return: Parser function, or None if the format is not supported.
+    """
+    name = filename.lower().removesuffix(".gz")
+    for extension, parser in PARSERS.items():
+        if name.endswith(extension):
+            return parser
+    return None
+
+
+def parse_activity_file(file, filename: str) -> pd.DataFrame:
+    """
+    Parse an activity file, decompressing it on the fly if it is gzipped.
+
+    :param file: Binary file object.
+    :param filename: Name of the file, used to pick the parser.
+    :return: DataFrame with STREAM_COLUMNS.
+    """
+    parser = file_parser(filename)
+    if parser is None:
+        raise Exception(f"Unsupported activity file: {filename}")
+
+    if filename.lower().endswith(".gz"):
+        with gzip.open(file) as decompressed:
+            return parser(decompressed)
+    return parser(file)
@@ -0,0 +1,49 @@
+# modules/backends.py
+import logging
+import pandas as pd
+
+from assets.config import setup_logging, CLEAN_BACKEND
+from modules import processing, polars_processing
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+DataFrame backends of the clean_data pipeline.
+
+- pandas: `modules.processing`, eager, one stage after the other.
+- polars: `modules.polars_processing`, the same stages as a single lazy Polars query,
+  optimized as a whole and run on all cores. Requires polars.
+
+Both take the raw activities as a pandas DataFrame and return the same pandas clean
+table, so everything downstream (the clean table schema, the dashboard) works with
+either. benchmarks/bench_backends.py checks that their outputs are identical.
+"""
+
+CLEAN_BACKENDS = {
+    "pandas": processing.clean_data,
+    "polars": polars_processing.clean_data,
+}
+
+
+def clean_with_backend(
+    df: pd.DataFrame,
+    backend: str = CLEAN_BACKEND,
+    suffer_score_bins: list = None,
+    fill_values: dict = None,
+) -> pd.DataFrame:
+    """
+    Clean raw activities with one of the CLEAN_BACKENDS.
+
+    :param df: Raw activities.
+    :param backend: Name of the backend, "pandas" or "polars".
+    :param suffer_score_bins: Fixed suffer score bucket edges (optional).
+    :param fill_values: Fixed NaN fill values per column (optional).
+    :return: The clean activities.
+    """
+    if backend not in CLEAN_BACKENDS:
+        raise Exception(
+            f"Unknown backend '{backend}', expected one of {list(CLEAN_BACKENDS)}."
+        )
+
+    return CLEAN_BACKENDS[backend](df, suffer_score_bins, fill_values)
@@ -0,0 +1,276 @@
+# modules/fit.py
+import mmap
+import struct
+from array import array
+import numpy as np
+import pandas as pd
+
+from api.streams import STREAM_COLUMNS
+
+"""
+Decoder for FIT activity files (the binary format Garmin and most other devices
+record in).
+
+Only the per-second "record" messages are decoded, into the same columns as the
+streams fetched from the API (see `api.streams`).
+
+A FIT file is a sequence of definition messages, which describe the layout of a local
+message type, and data messages in that layout. The file is scanned once to find the
+record messages. Consecutive messages with the same header are detected in bulk, so the
+scan only steps through the file message by message where other messages are
+interleaved. Each run of records is then viewed in place as a NumPy structured array
+(no copy when the file is memory-mapped), and the columns are converted in bulk. No
+Python object is built per message.
+"""
+
+RECORD_MESSAGE = 20
+TIMESTAMP_FIELD = 253
+
+# Base type number (low 5 bits of the base type byte) -> NumPy type and invalid value
+BASE_TYPES = {
+    0: ("u1", 0xFF),  # enum
+    1: ("i1", 0x7F),
+    2: ("u1", 0xFF),
+    3: ("i2", 0x7FFF),
+    4: ("u2", 0xFFFF),
+    5: ("i4", 0x7FFFFFFF),
+    6: ("u4", 0xFFFFFFFF),
+    10: ("u1", 0),  # uint8z
+    11: ("u2", 0),  # uint16z
+    12: ("u4", 0),  # uint32z
+}
+
+# Record field number -> stream column, scale and offset (value / scale - offset)
+RECORD_FIELDS = {
+    TIMESTAMP_FIELD: ("time", 1, 0),
+    0: ("lat", 2**31 / 180, 0),  # semicircles
+    1: ("lng", 2**31 / 180, 0),
+    2: ("altitude", 5, 500),
+    78: ("altitude", 5, 500),  # enhanced_altitude, preferred over altitude
+    3: ("heartrate", 1, 0),
+    4: ("cadence", 1, 0),
+    7: ("watts", 1, 0),
+}
+
+
+class Definition:
+    """
+    Layout of a local message type, from a definition message.
+
+    :param global_number: Global message number (20 for records).
+    :param fields: (field number, size, base type) of each field, in order.
+    :param endian: "<" or ">", the architecture of the message.
+    :param developer_size: Total size of the developer fields.
+    """
+
+    def __init__(
+        self, global_number: int, fields: list, endian: str, developer_size: int = 0
+    ):
+        self.global_number = global_number
+        self.timestamp = None  # (format, offset) of the timestamp field
+        names, formats, offsets, invalid = [], [], [], {}
+
+        # Offsets include the one-byte record header, so messages can be viewed in place
+        position = 1
+        for number, size, base_type in fields:
+            numpy_type, invalid_value = BASE_TYPES.get(base_type & 0x1F, (None, None))
+            if numpy_type and np.dtype(numpy_type).itemsize == size:
+                if number == TIMESTAMP_FIELD:
+                    self.timestamp = (endian + "I", position)
+                if global_number == RECORD_MESSAGE and number in RECORD_FIELDS:
+                    names.append(f"f{number}")
+                    formats.append(endian + numpy_type)
+                    offsets.append(position)
+                    invalid[number] = invalid_value
+            position += size
+
+        self.size = position + developer_size
+        self.invalid = invalid
+        self.dtype = np.dtype(
+            {"names": names, "formats": formats, "offsets": offsets, "itemsize": self.size}
+        )
+
+
+def parse_definition(data, offset: int, has_developer_fields: bool) -> tuple:
+    """
+    Parse the definition message at `offset`.
+
+    :return: (Definition, size of the definition message in bytes).
+    """
+    endian = ">" if data[offset + 2] else "<"
+    global_number = struct.unpack_from(endian + "H", data, offset + 3)[0]
+    count = data[offset + 5]
+    fields = [
+        (data[position], data[position + 1], data[position + 2])
+        for position in range(offset + 6, offset + 6 + 3 * count, 3)
+    ]
+    size = 6 + 3 * count
+
+    developer_size = 0
+    if has_developer_fields:
+        developer_count = data[offset + size]
+        developer_size = sum(
+            data[offset + size + 2 + 3 * i] for i in range(developer_count)
+        )
+        size += 1 + 3 * developer_count
+
+    return Definition(global_number, fields, endian, developer_size), size
+
+
+def run_length(raw: np.ndarray, offset: int, end: int, step: int, header: int) -> int:
+    """
+    Count the consecutive messages from `offset` that have the same header (and so the
+    same size), probing the following headers in growing blocks.
+    """
+    count, probe = 0, 16
+    last = end - step + 1  # A message starting after this would not fit
+    while True:
+        headers = raw[offset + count * step : last : step][:probe]
+        mismatch = np.flatnonzero(headers != header)
+        if mismatch.size:
+            return count + int(mismatch[0])
+        count += len(headers)
+        if len(headers) < probe:
+            return count
+        probe *= 2
+
+
+def scan_records(data) -> list:
+    """
+    Find the record messages of a FIT file.
+
+    :param data: The file contents (bytes or a memory map).
+    :return: Runs of consecutive records as (definition, offset, count, timestamp),
+        where timestamp is only set for records with a compressed timestamp header.
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    runs = []
+    offset = 0
+
+    # A file can hold several FIT files back to back, each with its own header
+    while offset + 12 <= len(data):
+        header_size = data[offset]
+        data_size = struct.unpack_from("<I", data, offset + 4)[0]
+        if bytes(data[offset + 8 : offset + 12]) != b".FIT":
+            raise Exception("Not a FIT file.")
+
+        end = min(offset + header_size + data_size, len(data))
+        offset += header_size
+        definitions = [None] * 16
+        last_timestamp = 0
+
+        while offset < end:
+            header = data[offset]
+
+            if header & 0x80:
+                # Compressed timestamp header: 5-bit offset from the last timestamp
+                definition = definitions[(header >> 5) & 0x03]
+                time_offset = header & 0x1F
+                rollover = 0x20 if time_offset < (last_timestamp & 0x1F) else 0
+                last_timestamp = (last_timestamp & ~0x1F) + time_offset + rollover
+                if definition.global_number == RECORD_MESSAGE:
+                    runs.append((definition, offset, 1, last_timestamp))
+                offset += definition.size
+                continue
+
+            if header & 0x40:
+                definition, size = parse_definition(data, offset, bool(header & 0x20))
+                definitions[header & 0x0F] = definition
+                offset += size
+                continue
+
+            definition = definitions[header & 0x0F]
+            if definition is None:
+                raise Exception(f"FIT data message without a definition at {offset}.")
+
+            step = definition.size
+            count = 1
+            if offset + 2 * step <= end and data[offset + step] == header:
+                count = run_length(raw, offset, end, step, header)
+
+            if definition.global_number == RECORD_MESSAGE:
+                runs.append((definition, offset, count, None))
+            if definition.timestamp:
+                timestamp_format, position = definition.timestamp
+                last_timestamp = struct.unpack_from(
+                    timestamp_format, data, offset + (count - 1) * step + position
+                )[0]
+            offset += count * step
+
+        offset = end + 2  # File CRC
+
+    return runs
+
+
+def decode_fit(data) -> pd.DataFrame:
+    """
+    Decode the record messages of a FIT file into stream columns.
+
+    :param data: The file contents (bytes or a memory map).
+    :return: DataFrame with STREAM_COLUMNS, "time" in seconds since the first record
+        and NaN where a value is missing.
+    """
+    runs = scan_records(data)
+    total = sum(count for _, _, count, _ in runs)
+    columns = {column: np.full(total, np.nan) for column in STREAM_COLUMNS}
+
+    # Group the runs by layout, remembering where their rows go in the output
+    layouts = {}
+    row = 0
+    compressed_rows, compressed_times = array("q"), array("d")
+    for definition, offset, count, timestamp in runs:
+        views, rows = layouts.setdefault(id(definition), (definition, [], []))[1:]
+        views.append(np.frombuffer(data, definition.dtype, count, offset))
+        rows.append((row, count))
+        if timestamp is not None:
+            compressed_rows.append(row)
+            compressed_times.append(timestamp)
+        row += count
+
+    for definition, views, rows in layouts.values():
+        messages = views[0] if len(views) == 1 else np.concatenate(views)
+        del views[:]
+        if len(rows) == len(runs):
+            index = slice(None)
+        else:
+            index = np.concatenate([np.arange(start, start + n) for start, n in rows])
+
+        # Plain altitude first, so enhanced_altitude overwrites it where both exist
+        for number in sorted(definition.invalid, key=lambda number: number == 78):
+            column, scale, offset = RECORD_FIELDS[number]
+            values = messages[f"f{number}"]
+            converted = values / scale - offset
+            converted[values == definition.invalid[number]] = np.nan
+            if column == "altitude":
+                converted = np.where(
+                    np.isnan(converted), columns[column][index], converted
+                )
+            columns[column][index] = converted
+        del messages
+
+    columns["time"][np.frombuffer(compressed_rows, dtype=np.int64)] = np.frombuffer(
+        compressed_times, dtype=np.float64
+    )
+    if total:
+        columns["time"] -= columns["time"][0]
+
+    return pd.DataFrame(columns)
+
+
+def read_fit(path: str) -> pd.DataFrame:
+    """
+    Decode a FIT file, memory-mapping it instead of reading it into memory.
+
+    :param path: Path to the .fit file.
+    :return: DataFrame with STREAM_COLUMNS.
+    """
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            return decode_fit(data)
+
+
+def parse_fit(file) -> pd.DataFrame:
+    """
+    Decode a FIT file object (e.g. a member of an archive).
+    """
+    return decode_fit(file.read())
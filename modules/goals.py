@@ -25,7 +25,7 @@ def get_yearly_goal_data(
 
     # Create 'month_dt' column with the specified year
     df_filtered["month_dt"] = pd.to_datetime(
-        df_filtered["month"] + f" {year}", format="%b %Y"
+        df_filtered["month"].astype(str) + f" {year}", format="%b %Y"
     )
 
     # Filter by sport_type and sort data
@@ -0,0 +1,122 @@
+# modules/health.py
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+
+from assets.config import setup_logging
+from assets import health_data
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Health measurements over time (resting HR, weight, max HR), looked up as of each
+activity's start.
+
+In assets/health_data.py each measurement is either a number, used at all times, or a
+dict of date -> value:
+
+    resting_hr = {"2024-05": 48, "2024-05-20": 47, ...}  # Monthly or daily
+    weight_kg = 75
+    max_hr = {"2020-01": 192, "2024-01": 189}
+
+A dated value applies from its date ("YYYY-MM" is the first of the month, dates
+without a time zone are in UTC) until the next one. Every activity gets the latest
+measurement at or before its start, found with a binary search over the sorted
+measurement dates, so a lookup costs O(log measurements) per activity, and daily
+measurements over many years stay cheap. Activities before the first measurement get
+NaN.
+"""
+
+
+class HealthSeries:
+    """
+    One measurement over time, as sorted dates (UTC nanoseconds) and values.
+    """
+
+    def __init__(self, times: np.ndarray, values: np.ndarray):
+        order = np.argsort(times, kind="stable")
+        self.times = np.asarray(times, dtype=np.int64)[order]
+        self.values = np.asarray(values, dtype=np.float64)[order]
+
+    @classmethod
+    def from_value(cls, value) -> "HealthSeries":
+        """
+        Build from a number (the same value at all times) or a dict of date -> value.
+        """
+        if not isinstance(value, dict):
+            return cls(np.array([np.iinfo(np.int64).min]), np.array([value]))
+
+        measurements = {date: value for date, value in value.items() if pd.notna(value)}
+        dates = pd.to_datetime(list(measurements), format="ISO8601", utc=True)
+        return cls(dates.asi8, np.array(list(measurements.values()), dtype=float))
+
+    def at(self, times: np.ndarray) -> np.ndarray:
+        """
+        The latest value at or before each time.
+
+        :param times: UTC nanoseconds (e.g. from `utc_nanoseconds`).
+        :return: Array of values, NaN before the first measurement.
+        """
+        positions = np.searchsorted(self.times, times, side="right") - 1
+        values = np.full(len(positions), np.nan)
+        found = positions >= 0
+        values[found] = self.values[positions[found]]
+        return values
+
+
+def utc_nanoseconds(dates) -> np.ndarray:
+    """
+    Nanoseconds since the epoch (UTC) of dates; naive dates are taken to be in UTC.
+    """
+    dates = pd.Series(pd.to_datetime(dates))
+    if dates.dt.tz is None:
+        dates = dates.dt.tz_localize("UTC")
+    return dates.dt.tz_convert("UTC").astype("datetime64[ns, UTC]").array.asi8
+
+
+class HealthStore:
+    """
+    Resting HR, weight and max HR over time.
+    """
+
+    MEASUREMENTS = ["resting_hr", "weight_kg", "max_hr"]
+
+    def __init__(self, resting_hr, weight_kg, max_hr):
+        self.series = {
+            "resting_hr": HealthSeries.from_value(resting_hr),
+            "weight_kg": HealthSeries.from_value(weight_kg),
+            "max_hr": HealthSeries.from_value(max_hr),
+        }
+
+    @classmethod
+    def from_health_data(cls) -> "HealthStore":
+        """
+        The measurements of assets/health_data.py.
+        """
+        return cls(health_data.resting_hr, health_data.weight_kg, health_data.max_hr)
+
+    def at(self, dates) -> dict:
+        """
+        The measurements as of each date.
+
+        :param dates: Start dates of the activities.
+        :return: Dict of measurement name -> array of values.
+        """
+        times = utc_nanoseconds(dates)
+        return {name: series.at(times) for name, series in self.series.items()}
+
+    def fingerprint(self) -> str:
+        """
+        Hash of all measurements, e.g. for cache keys.
+        """
+        digest = hashlib.sha256()
+        for name in self.MEASUREMENTS:
+            digest.update(name.encode())
+            digest.update(self.series[name].times.tobytes())
+            digest.update(self.series[name].values.tobytes())
+        return digest.hexdigest()
+
+
+health_store = HealthStore.from_health_data()
@@ -0,0 +1,327 @@
+# modules/incremental.py
+import os
+import json
+import fcntl
+import logging
+from fractions import Fraction
+import numpy as np
+import pandas as pd
+
+from assets.config import setup_logging, CLEAN_STATE_DIR
+from modules.processing import (
+    NAN_FILL_COLUMNS,
+    SUFFER_SCORE_LABELS,
+    add_suffer_score_buckets,
+    get_clean_stages,
+    get_suffer_score_edges,
+    replace_nan_values,
+    run_stages,
+    sort_and_reset_index,
+)
+from modules.raw_store import RawActivityStore
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Incremental version of `modules.processing.clean_data`.
+
+Most stages only look at one activity at a time, so their output for an activity
+can be kept between refreshes and only new or changed activities need to go through
+them. Two stages depend on the whole dataset:
+
+- replace_nan_values fills missing values with the column means. The cleaner keeps
+  the exact sum and count of every column, so the means follow new, changed and
+  removed activities without rereading the old ones.
+- add_suffer_score_buckets buckets suffer scores by their quantiles. The cleaner
+  keeps all suffer scores sorted, and only re-buckets the old activities when new
+  ones actually move the bucket edges.
+
+The result is the same as cleaning the whole history with `clean_data`.
+"""
+
+BUCKET_COLUMN = "suffer_score_bucket"
+
+
+def add_empty_buckets(df: pd.DataFrame) -> pd.DataFrame:
+    # Placeholder, the cleaner buckets the rows from its running statistics
+    df[BUCKET_COLUMN] = np.nan
+    return df
+
+
+def skip_stage(df: pd.DataFrame, **kwargs) -> pd.DataFrame:
+    return df
+
+
+def add_sort_key(df: pd.DataFrame) -> pd.DataFrame:
+    # In place of the final sort, keep the start time (UTC nanoseconds) to sort on
+    df["_start"] = df["date"].astype("int64")
+    return df
+
+
+def bucket_suffer_scores(rows: pd.DataFrame, edges: list) -> None:
+    """
+    Set the (capitalized) suffer score buckets of cleaned rows from fixed edges.
+    """
+    rows[BUCKET_COLUMN] = pd.cut(
+        rows["suffer_score"],
+        bins=edges,
+        labels=[label.capitalize() for label in SUFFER_SCORE_LABELS][: len(edges) - 1],
+        include_lowest=True,
+    )
+
+
+# Dataset-wide stages, replaced in the per-activity pass and applied by the cleaner
+DATASET_STAGES = {
+    add_suffer_score_buckets: add_empty_buckets,
+    replace_nan_values: skip_stage,
+    sort_and_reset_index: add_sort_key,
+}
+
+
+def exact_sum(values) -> Fraction:
+    """
+    Exact sum of floats, in bulk: values are split into integer mantissas and
+    exponents, and the mantissas are summed per exponent.
+
+    :param values: Floats without NaN.
+    :return: The sum as a Fraction.
+    """
+    mantissas, exponents = np.frexp(np.asarray(values, dtype=float))
+    mantissas = (mantissas * 2**53).astype(np.int64)
+
+    total = Fraction(0)
+    for exponent in np.unique(exponents):
+        same = mantissas[exponents == exponent]
+        # Summed in two halves so int64 cannot overflow
+        high = int((same >> 26).sum())
+        low = int((same & (2**26 - 1)).sum())
+        total += Fraction((high << 26) + low) * Fraction(2) ** (int(exponent) - 53)
+    return total
+
+
+def get_row_stages() -> list:
+    """
+    The clean_data stages with the dataset-wide stages left out.
+    """
+    return [
+        (DATASET_STAGES[stage], {}) if stage in DATASET_STAGES else (stage, kwargs)
+        for stage, kwargs in get_clean_stages()
+    ]
+
+
+def clean_rows(raw_df: pd.DataFrame, profiler=None) -> pd.DataFrame:
+    """
+    Run raw activities through the per-activity stages. The rows get their start time
+    as "_start" (UTC nanoseconds), the key of the final sort.
+
+    :param raw_df: Raw activities.
+    :param profiler: StageProfiler recording the stages (see modules.profiling).
+    :return: Cleaned rows, keeping the index of their raw rows.
+    """
+    return run_stages(raw_df, get_row_stages(), profiler)
+
+
+class IncrementalCleaner:
+    """
+    Cleaned activities and the statistics of the dataset-wide stages, kept on disk
+    between refreshes.
+
+    :param state_dir: Directory holding the cleaned rows and the statistics.
+    :param profiler: StageProfiler recording the stages (see modules.profiling).
+    """
+
+    def __init__(self, state_dir: str = CLEAN_STATE_DIR, profiler=None):
+        self.state_dir = state_dir
+        self.profiler = profiler
+        self.rows = None  # Cleaned rows before the dataset-wide stages
+        self.sums = {column: Fraction(0) for column in NAN_FILL_COLUMNS}
+        self.counts = {column: 0 for column in NAN_FILL_COLUMNS}
+        self.suffer_scores = np.empty(0)  # Sorted
+        self.edges = None
+        self.written = 0  # Raw store "_written" sequence processed up to
+
+    @property
+    def rows_path(self) -> str:
+        return os.path.join(self.state_dir, "rows.parquet")
+
+    @property
+    def stats_path(self) -> str:
+        return os.path.join(self.state_dir, "stats.json")
+
+    def load(self) -> bool:
+        """
+        Load the saved state.
+
+        :return: False if there is no saved state.
+        """
+        try:
+            with open(self.stats_path) as f:
+                stats = json.load(f)
+            rows = pd.read_parquet(self.rows_path)
+        except FileNotFoundError:
+            return False
+
+        self.rows = rows
+        self.sums = {column: Fraction(total) for column, total in stats["sums"].items()}
+        self.counts = stats["counts"]
+        self.edges = stats["edges"]
+        self.written = stats["written"]
+        scores = rows["suffer_score"].dropna().to_numpy(dtype=float)
+        self.suffer_scores = np.sort(scores)
+        return True
+
+    def save(self) -> None:
+        """
+        Atomically save the state.
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+        stats = {
+            "sums": {column: str(total) for column, total in self.sums.items()},
+            "counts": self.counts,
+            "edges": self.edges,
+            "written": self.written,
+        }
+        self.rows.to_parquet(self.rows_path + ".tmp", index=False)
+        with open(self.stats_path + ".tmp", "w") as f:
+            json.dump(stats, f)
+        os.replace(self.rows_path + ".tmp", self.rows_path)
+        os.replace(self.stats_path + ".tmp", self.stats_path)
+
+    def fill_values(self) -> dict:
+        """
+        The column means replace_nan_values would compute over all rows.
+        """
+        return {
+            column: float(self.sums[column]) / self.counts[column]
+            if self.counts[column]
+            else np.nan
+            for column in NAN_FILL_COLUMNS
+        }
+
+    def update_statistics(self, rows: pd.DataFrame, sign: int) -> None:
+        """
+        Add (sign=1) or remove (sign=-1) the values of rows from the statistics.
+        """
+        for column in NAN_FILL_COLUMNS:
+            values = rows[column].dropna()
+            self.sums[column] += sign * exact_sum(values)
+            self.counts[column] += sign * len(values)
+
+        scores = np.sort(rows["suffer_score"].dropna().to_numpy(dtype=float))
+        if sign > 0:
+            positions = np.searchsorted(self.suffer_scores, scores)
+            self.suffer_scores = np.insert(self.suffer_scores, positions, scores)
+        else:
+            # Equal scores sit next to each other, remove the first of each run
+            positions = np.searchsorted(self.suffer_scores, scores)
+            positions += np.arange(len(positions)) - np.searchsorted(scores, scores)
+            self.suffer_scores = np.delete(self.suffer_scores, positions)
+
+    def drop_rows(self, ids) -> int:
+        """
+        Remove activities from the rows and the statistics.
+        """
+        if self.rows is None:
+            return 0
+
+        removed = self.rows["id"].isin(ids)
+        if removed.any():
+            self.update_statistics(self.rows[removed], -1)
+            self.rows = self.rows[~removed]
+        return int(removed.sum())
+
+    def remove(self, ids) -> int:
+        """
+        Remove activities.
+
+        :param ids: Ids of the activities to remove.
+        :return: Number of rows removed.
+        """
+        removed = self.drop_rows(ids)
+        if removed:
+            self.update_buckets()
+        return removed
+
+    def add(self, raw_df: pd.DataFrame) -> int:
+        """
+        Clean new or changed activities and add them, replacing older versions.
+
+        :param raw_df: Raw activities.
+        :return: Number of rows added (activities filtered out by the clean stages
+            are not added).
+        """
+        raw_df = raw_df.drop(columns="_written", errors="ignore")
+        self.drop_rows(raw_df["id"])
+
+        new_rows = clean_rows(raw_df.reset_index(drop=True), self.profiler)
+        self.update_statistics(new_rows, 1)
+
+        self.update_buckets(new_rows)
+        return len(new_rows)
+
+    def update_buckets(self, new_rows: pd.DataFrame = None) -> None:
+        """
+        Bucket the new rows, or all rows if the bucket edges moved, and append the
+        new rows.
+        """
+        edges = get_suffer_score_edges(self.suffer_scores)
+
+        if new_rows is not None and not new_rows.empty:
+            bucket_suffer_scores(new_rows, edges)
+            frames = [rows for rows in (self.rows, new_rows) if rows is not None]
+            self.rows = pd.concat(frames, ignore_index=True)
+
+        if edges != self.edges and self.rows is not None:
+            bucket_suffer_scores(self.rows, edges)
+            logger.info(
+                f"Suffer score buckets moved, re-bucketed {len(self.rows)} rows."
+            )
+
+        self.edges = edges
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Apply the dataset-wide stages and return the clean DataFrame.
+        """
+        # Same row order as clean_data on RawActivityStore.read, which orders the rows
+        # by start date and id before the sort
+        df = self.rows.sort_values(["_start", "id"]).drop(columns="_start")
+        stages = [
+            (replace_nan_values, {"fill_values": self.fill_values()}),
+            (sort_and_reset_index, {}),
+        ]
+        return run_stages(df, stages, self.profiler)
+
+    def refresh(self, store: RawActivityStore = None) -> pd.DataFrame:
+        """
+        Bring the state up to date with the raw activity store and save it.
+
+        Only activities written to the store since the last refresh are cleaned, and
+        activities no longer in the store are removed.
+
+        :param store: The raw activity store. Defaults to RAW_STORE_DIR.
+        :return: The clean DataFrame.
+        """
+        store = store or RawActivityStore()
+        os.makedirs(self.state_dir, exist_ok=True)
+
+        # Serialise refreshes from the refresh job and the webhook worker
+        with open(os.path.join(self.state_dir, ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self.load()
+
+            changed = store.read_written_since(self.written)
+            if self.rows is not None:
+                stored_ids = store.ids()
+                self.remove(self.rows.loc[~self.rows["id"].isin(stored_ids), "id"])
+            if not changed.empty:
+                self.add(changed)
+                self.written = int(changed["_written"].max())
+            if self.rows is None:
+                return None
+
+            self.save()
+            logger.info(f"Cleaned {len(changed)} new or changed activities.")
+
+        return self.to_frame()
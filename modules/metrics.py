@@ -0,0 +1,202 @@
+# modules/metrics.py
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+from assets.config import setup_logging, local_tz
+from assets.health_data import stride_length
+from modules.processing import estimate_vo2_max
+from modules.schema import to_minute_of_day
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Derived activity metrics, computed on demand.
+
+The clean table only holds the measured columns; pace, elevation rate, running cadence
+(spm) and VO2 max are not computed by clean_data. Every derived metric is registered
+with `derived_metric` as a function of the SI base columns of the clean table (metres,
+seconds, metres per second, watts). A metric is computed the first time it is asked
+for, over the whole table, and kept for as long as the dataset version it was computed
+for, so callbacks only pay for the metrics they use, once per dataset.
+
+Unit systems are views: a metric in any unit system is its SI value times a factor
+(e.g. metres per second to miles per hour), so switching the display units never
+re-runs the pipeline. The clean table keeps its base columns in metric units (km,
+hours, km/h, see modules.processing), which are served as they are when asked for in
+the same unit.
+"""
+
+METRES_PER_MILE = 1609.344
+METRES_PER_FOOT = 0.3048
+
+# Unit of every dimension per unit system: (factor from the SI value, label)
+UNIT_SYSTEMS = {
+    "metric": {
+        "distance": (1 / 1000, "km"),
+        "duration": (1 / 3600, "h"),
+        "speed": (3.6, "kph"),
+        "pace": (1000 / 60, "min/km"),
+        "elevation": (1.0, "m"),
+        "elevation_rate": (1000.0, "m/km"),
+        "cadence": (1.0, "spm"),
+        "vo2_max": (1.0, "ml/kg/min"),
+    },
+    "imperial": {
+        "distance": (1 / METRES_PER_MILE, "mi"),
+        "duration": (1 / 3600, "h"),
+        "speed": (3600 / METRES_PER_MILE, "mph"),
+        "pace": (METRES_PER_MILE / 60, "min/mi"),
+        "elevation": (1 / METRES_PER_FOOT, "ft"),
+        "elevation_rate": (METRES_PER_MILE / METRES_PER_FOOT, "ft/mi"),
+        "cadence": (1.0, "spm"),
+        "vo2_max": (1.0, "ml/kg/min"),
+    },
+}
+
+# SI base columns: (column of the clean table, factor to SI, dimension)
+BASE_COLUMNS = {
+    "distance": ("distance", 1000.0, "distance"),  # km
+    "duration": ("duration", 3600.0, "duration"),  # h
+    "elevation_gain": ("elevation_gain", 1.0, "elevation"),  # m
+    "average_speed": ("average_speed", 1 / 3.6, "speed"),  # km/h
+    "max_speed": ("max_speed", 1 / 3.6, "speed"),  # km/h
+}
+
+# Derived metrics: name -> (function of a DerivedMetrics, dimension)
+DERIVED_METRICS = {}
+
+
+def derived_metric(name: str, dimension: str):
+    """
+    Register a derived metric, computed from the SI values of other metrics.
+    """
+
+    def register(function):
+        DERIVED_METRICS[name] = (function, dimension)
+        return function
+
+    return register
+
+
+@derived_metric("pace", "pace")
+def pace(metrics) -> pd.Series:
+    # Seconds per metre, 0 without a distance
+    distance = metrics.si("distance")
+    return (metrics.si("duration") / distance).where(distance > 0, 0)
+
+
+@derived_metric("elevation_rate", "elevation_rate")
+def elevation_rate(metrics) -> pd.Series:
+    # Metres climbed per metre, 0 without a distance
+    distance = metrics.si("distance")
+    return (metrics.si("elevation_gain") / distance).where(distance > 0, 0)
+
+
+@derived_metric("spm", "cadence")
+def spm(metrics) -> pd.Series:
+    # Steps per minute of runs
+    is_run = metrics.df["sport_type"].str.lower() == "run"
+    steps = metrics.si("distance") / stride_length
+    return (steps / (metrics.si("duration") / 60)).where(is_run)
+
+
+@derived_metric("vo2_max", "vo2_max")
+def vo2_max(metrics) -> pd.Series:
+    # As of the start of the activity: its local date and start time (to the minute,
+    # "HH:MM" or the minute of the day, see modules.schema). The hour repeated when the
+    # clocks go back is taken as standard time
+    minutes = to_minute_of_day(metrics.df["start_time"]).astype(np.float64)
+    starts = pd.to_datetime(metrics.df["date"]) + pd.to_timedelta(minutes, unit="min")
+    standard_time = np.zeros(len(starts), dtype=bool)
+    starts = starts.dt.tz_localize(
+        local_tz, ambiguous=standard_time, nonexistent="shift_forward"
+    )
+    return estimate_vo2_max(metrics.df["average_watts"], starts)
+
+
+class DerivedMetrics:
+    """
+    Metrics of one version of the clean table, computed on first access.
+
+    :param df: The clean activities.
+    :param version: Version of the dataset the metrics belong to.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: int = 0):
+        self.df = df
+        self.version = version
+        self.lock = threading.Lock()
+        self.values = {}  # (name, unit system or "si") -> Series
+
+    def si(self, name: str) -> pd.Series:
+        """
+        A metric in SI units, computed once.
+        """
+        key = (name, "si")
+        if key not in self.values:
+            if name in BASE_COLUMNS:
+                column, factor, _ = BASE_COLUMNS[name]
+                values = self.df[column] * factor
+            elif name in DERIVED_METRICS:
+                values = DERIVED_METRICS[name][0](self)
+            else:
+                raise Exception(f"Unknown metric '{name}'.")
+            self.values[key] = values.astype(np.float64).rename(name)
+        return self.values[key]
+
+    def get(self, name: str, units: str = "metric") -> pd.Series:
+        """
+        A metric in a unit system, computed once per dataset version.
+
+        :param name: Name of a base column, derived metric or other column of the clean
+            table.
+        :param units: Unit system, a key of UNIT_SYSTEMS.
+        :return: The metric for every activity, indexed like the clean table.
+        """
+        if name not in BASE_COLUMNS and name not in DERIVED_METRICS:
+            return self.df[name]  # Same in every unit system, e.g. heart rates
+
+        key = (name, units)
+        with self.lock:
+            if key not in self.values:
+                factor, label = UNIT_SYSTEMS[units][dimension(name)]
+                if name in BASE_COLUMNS and label == unit_label(name, "metric"):
+                    # Stored by clean_data, in the same unit
+                    self.values[key] = self.df[name]
+                else:
+                    self.values[key] = self.si(name) * factor
+            return self.values[key]
+
+    def frame(self, names: list, units: str = "metric", index=None) -> pd.DataFrame:
+        """
+        Several metrics as a DataFrame, optionally for some activities only.
+
+        :param names: Names of the metrics.
+        :param units: Unit system, a key of UNIT_SYSTEMS.
+        :param index: Index labels of the activities (e.g. of a filtered table).
+        :return: DataFrame with one column per metric.
+        """
+        columns = {name: self.get(name, units) for name in names}
+        df = pd.DataFrame(columns, index=self.df.index)
+        return df if index is None else df.loc[index]
+
+
+def dimension(name: str) -> str:
+    """
+    The dimension (distance, speed, ...) of a base column or derived metric.
+    """
+    if name in BASE_COLUMNS:
+        return BASE_COLUMNS[name][2]
+    if name in DERIVED_METRICS:
+        return DERIVED_METRICS[name][1]
+    raise Exception(f"Unknown metric '{name}'.")
+
+
+def unit_label(name: str, units: str = "metric") -> str:
+    """
+    Unit of a metric in a unit system, e.g. "kph" for average_speed.
+    """
+    return UNIT_SYSTEMS[units][dimension(name)][1]
@@ -0,0 +1,106 @@
+# modules/parallel.py
+import logging
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from assets.config import setup_logging, CLEAN_MAX_WORKERS, CLEAN_SHARD_SIZE
+from modules.incremental import bucket_suffer_scores, clean_rows
+from modules.processing import (
+    get_suffer_score_edges,
+    replace_nan_values,
+    run_stages,
+    sort_and_reset_index,
+)
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+`modules.processing.clean_data` spread over several processes.
+
+The raw activities are cut into shards of consecutive rows, and the per-activity
+stages (see `modules.incremental.get_row_stages`) run on the shards in a process pool.
+The cleaned shards are merged in their original order, and the dataset-wide stages
+(suffer score buckets, NaN fill values and the sort) run once on the merged rows. The
+result is the same as clean_data.
+
+The workers get the raw activities once, when they start, and only the shard bounds
+are sent per task. With the fork start method (the Linux default) the workers inherit
+them from the memory of this process; with spawn or forkserver (e.g. the macOS and
+Windows default) they are pickled to each worker. The cleaned shards are sent back, so
+the speedup is bounded by the number of cores and the cost of sending the data.
+"""
+
+
+# Raw activities of the worker processes, set once per worker instead of sending
+# every shard to the pool
+raw_activities = None
+
+
+def init_worker(df: pd.DataFrame) -> None:
+    global raw_activities
+    raw_activities = df
+
+
+def clean_shard(bounds: tuple) -> pd.DataFrame:
+    """
+    Worker: run the per-activity stages on rows start:end of the raw activities.
+    """
+    start, end = bounds
+    return clean_rows(raw_activities.iloc[start:end])
+
+
+def shard_bounds(row_count: int, shard_count: int) -> list:
+    """
+    Cut `row_count` rows into `shard_count` shards of consecutive rows.
+
+    :return: List of (start, end) row positions.
+    """
+    bounds = [row_count * i // shard_count for i in range(shard_count + 1)]
+    return [(start, end) for start, end in zip(bounds, bounds[1:]) if end > start]
+
+
+def clean_data_parallel(
+    df: pd.DataFrame,
+    max_workers: int = CLEAN_MAX_WORKERS,
+    shard_size: int = CLEAN_SHARD_SIZE,
+) -> pd.DataFrame:
+    """
+    Clean raw activities like clean_data, with the per-activity stages in a process
+    pool.
+
+    :param df: Raw activities.
+    :param max_workers: Number of processes. Runs in this process if 1.
+    :param shard_size: Maximum number of raw rows per task. There are at least as
+        many tasks as workers.
+    :return: The clean DataFrame.
+    """
+    try:
+        # Row positions as the index, so the merged rows keep the input order
+        df = df.reset_index(drop=True)
+        shard_count = max(max_workers, -(-len(df) // shard_size), 1)
+        shards = shard_bounds(len(df), shard_count)
+
+        if max_workers > 1 and len(shards) > 1:
+            # Sent once per worker: inherited when forked, pickled otherwise
+            with ProcessPoolExecutor(
+                max_workers=max_workers, initializer=init_worker, initargs=(df,)
+            ) as executor:
+                cleaned = list(executor.map(clean_shard, shards))
+        else:
+            cleaned = [clean_rows(df.iloc[start:end]) for start, end in shards]
+
+        rows = pd.concat(cleaned) if cleaned else clean_rows(df)
+        bucket_suffer_scores(rows, get_suffer_score_edges(rows["suffer_score"]))
+
+        # Stable, so activities starting at the same time keep the input order
+        rows = rows.sort_values("_start", kind="stable").drop(columns="_start")
+        stages = [(replace_nan_values, {}), (sort_and_reset_index, {})]
+        clean_df = run_stages(rows, stages)
+
+    except Exception as e:
+        logger.error(f"Error during parallel DataFrame cleaning: {e}")
+        raise
+
+    logger.info(f"Cleaned {len(df)} activities in {len(shards)} shards.")
+    return clean_df
@@ -0,0 +1,335 @@
+# modules/polars_processing.py
+import logging
+import pandas as pd
+
+from assets.utils import ms_to_kph, ALL_WEEKDAYS, MONTH_MAPPING
+from assets.config import local_tz, ignored_tzs, setup_logging
+from modules.processing import (
+    NAN_FILL_COLUMNS,
+    SUFFER_SCORE_LABELS,
+    column_mean,
+    get_suffer_score_edges,
+)
+
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+The stages of `modules.processing.clean_data` on Polars.
+
+Every stage takes and returns a LazyFrame, so the whole chain is a single query plan
+that Polars optimizes (e.g. raw columns dropped by filter_columns are never read,
+filters run before the derived columns are computed) and runs on all cores.
+
+The output is the same as the pandas stages, value for value:
+
+- The dataset-wide statistics (suffer score bucket edges, NaN fill values) are
+  computed inside the plan by the same functions as the pandas stages, since Polars'
+  own quantile and mean can differ in the last bit.
+- Divisions by a constant and the end time use pandas/NumPy for the same reason
+  (Polars divides by a constant by multiplying with its inverse).
+- `to_pandas_clean` converts the result to the pandas clean table: object dates,
+  ordered suffer score buckets and an index starting from 1.
+
+Polars is optional, it is only needed when this backend is used (see
+modules.backends).
+"""
+
+
+def capitalize(values):
+    # Same as str.capitalize for the ASCII strings of the clean table
+    return values.str.slice(0, 1).str.to_uppercase() + values.str.slice(
+        1
+    ).str.to_lowercase()
+
+
+def divide(values, divisor: float):
+    # NumPy's division, exact unlike Polars' multiplication by 1 / divisor
+    return values.map_batches(
+        lambda series: pl.Series(series.to_numpy() / divisor, nan_to_null=True),
+        return_dtype=pl.Float64,
+        is_elementwise=True,
+    )
+
+
+def rename_columns(lf):
+    rename_mapping = {
+        "trainer": "environment",
+        "start_date": "date",
+        "moving_time": "duration",
+        "total_elevation_gain": "elevation_gain",
+    }
+    return lf.rename(rename_mapping, strict=False)
+
+
+def filter_by_timezone(lf, excluded_timezones: list):
+    # Activities without a time zone are kept, like with pandas' isin
+    return lf.filter(~pl.col("timezone").is_in(excluded_timezones).fill_null(False))
+
+
+def rename_sport_types(lf):
+    lf = lf.with_columns(
+        pl.col("sport_type").replace({"Ride": "Bike", "Hike": "Walk"})
+    )
+    return lf.filter(~pl.col("sport_type").is_in(["Swims", "Rowing"]).fill_null(False))
+
+
+def convert_units(lf):
+    return lf.with_columns(
+        divide(pl.col("distance"), 1000),  # m_to_km
+        divide(pl.col("duration"), 3600),  # sec_to_h
+        ms_to_kph(pl.col("average_speed")),
+        ms_to_kph(pl.col("max_speed")),
+    )
+
+
+def convert_datatypes(lf):
+    date = pl.col("date")
+    if lf.collect_schema()["date"] == pl.String:
+        # Naive dates are taken to be in UTC, as add_time_columns does
+        date = date.str.to_datetime(time_unit="ns", time_zone="UTC")
+    else:
+        date = date.cast(pl.Datetime("ns", lf.collect_schema()["date"].time_zone))
+    return lf.with_columns(date)
+
+
+def filter_by_period(lf, year: int = None):
+    if year:
+        lf = lf.filter(pl.col("date").dt.year() >= year)
+    return lf
+
+
+def add_year_month_column(lf):
+    return lf.with_columns(
+        pl.col("date").dt.month().replace_strict(MONTH_MAPPING).alias("month"),
+        pl.col("date").dt.year().cast(pl.Int64).alias("year"),
+    )
+
+
+def add_day_of_week(lf):
+    weekdays = dict(enumerate(ALL_WEEKDAYS, start=1))
+    return lf.with_columns(
+        pl.col("date").dt.weekday().replace_strict(weekdays).alias("day_of_week")
+    )
+
+
+def hours_to_duration(hours):
+    # pd.to_timedelta, so the end times round the same way as the pandas stage
+    durations = pd.to_timedelta(hours.to_numpy(), unit="h").to_numpy()
+    return pl.Series(durations.astype("timedelta64[ns]"))
+
+
+def add_time_columns(lf):
+    if lf.collect_schema()["date"].time_zone is None:
+        lf = lf.with_columns(pl.col("date").dt.replace_time_zone("UTC"))
+    lf = lf.with_columns(pl.col("date").dt.convert_time_zone(str(local_tz)))
+
+    end_time = pl.col("date") + pl.col("duration").map_batches(
+        hours_to_duration, return_dtype=pl.Duration("ns"), is_elementwise=True
+    )
+    return lf.with_columns(
+        pl.col("date").dt.strftime("%H:%M").alias("start_time"),
+        end_time.dt.strftime("%H:%M").alias("end_time"),
+    )
+
+
+def add_suffer_score_buckets(lf, num_bins: int = 3, bins: list = None):
+    if bins is None:
+        # Quantiles of the whole (filtered) table, inside the plan
+        edges = pl.col("suffer_score").map_batches(
+            lambda scores: pl.Series(
+                [get_suffer_score_edges(scores.to_numpy(), num_bins)]
+            ),
+            return_dtype=pl.List(pl.Float64),
+            returns_scalar=True,
+        )
+        edges = [edges.list.get(position) for position in range(num_bins + 1)]
+        labels = SUFFER_SCORE_LABELS[:num_bins]
+    else:
+        edges = [pl.lit(edge) for edge in bins]
+        labels = SUFFER_SCORE_LABELS[: len(bins) - 1]
+
+    # Same intervals as pd.cut with include_lowest: [e0, e1], (e1, e2], ...
+    score = pl.col("suffer_score")
+    bucket = pl.when(score.is_between(edges[0], edges[1])).then(pl.lit(labels[0]))
+    for position, label in enumerate(labels[1:], start=1):
+        bucket = bucket.when(
+            (score > edges[position]) & (score <= edges[position + 1])
+        ).then(pl.lit(label))
+    return lf.with_columns(
+        bucket.otherwise(None).cast(pl.Enum(labels)).alias("suffer_score_bucket")
+    )
+
+
+def add_average_running_speed(lf):
+    is_run = (pl.col("sport_type") == "Run") & (pl.col("duration") > 0)
+    return lf.with_columns(
+        pl.when(is_run)
+        .then(pl.col("distance") / pl.col("duration"))
+        .otherwise(pl.col("average_speed"))
+        .alias("average_speed")
+    )
+
+
+def update_environment(lf):
+    # Missing values count as indoor, like bool(NaN) in the pandas stage
+    indoor = pl.col("environment").cast(pl.Boolean).fill_null(True)
+    return lf.with_columns(
+        pl.when(indoor).then(pl.lit("indoor")).otherwise(pl.lit("outdoor"))
+        .alias("environment")
+    )
+
+
+def replace_nan_values(lf, fill_values: dict = None):
+    columns = []
+    for column in NAN_FILL_COLUMNS:
+        if fill_values is not None:
+            mean_value = pl.lit(fill_values[column], dtype=pl.Float64)
+        else:
+            mean_value = pl.col(column).map_batches(
+                lambda values: pl.Series([column_mean(values.to_pandas())]),
+                return_dtype=pl.Float64,
+                returns_scalar=True,
+            )
+        columns.append(pl.col(column).cast(pl.Float64).fill_null(mean_value))
+    return lf.with_columns(columns)
+
+
+def filter_columns(lf):
+    columns = [
+        "id",
+        "date",
+        "year",
+        "month",
+        "day_of_week",
+        "start_time",
+        "end_time",
+        "duration",
+        "distance",
+        "elevation_gain",
+        "average_speed",
+        "max_speed",
+        "average_heartrate",
+        "max_heartrate",
+        "suffer_score",
+        "suffer_score_bucket",
+        "average_watts",
+        "average_cadence",
+        "sport_type",
+        "environment",
+    ]
+    return lf.select(columns)
+
+
+def sort_and_reset_index(lf):
+    # Stable, like the pandas stage; the index is added by to_pandas_clean
+    return lf.sort("date", maintain_order=True)
+
+
+def convert_date_to_yyyymmdd(lf):
+    return lf.with_columns(pl.col("date").dt.date())
+
+
+def capitalize_all_strings(lf):
+    schema = lf.collect_schema()
+    columns = []
+    for column, dtype in schema.items():
+        if dtype == pl.String:
+            columns.append(capitalize(pl.col(column)))
+        elif isinstance(dtype, pl.Enum):
+            categories = [label.capitalize() for label in dtype.categories]
+            columns.append(
+                pl.col(column)
+                .cast(pl.String)
+                .pipe(capitalize)
+                .cast(pl.Enum(categories))
+            )
+    return lf.with_columns(columns)
+
+
+def get_clean_stages(suffer_score_bins: list = None, fill_values: dict = None) -> list:
+    """
+    The stages of `clean_data`, in the same order as `modules.processing`.
+
+    :return: List of (stage function, keyword arguments).
+    """
+    return [
+        (rename_columns, {}),
+        (filter_by_timezone, {"excluded_timezones": ignored_tzs}),
+        (rename_sport_types, {}),
+        (convert_units, {}),
+        (convert_datatypes, {}),
+        (filter_by_period, {"year": 2023}),
+        (add_year_month_column, {}),
+        (add_day_of_week, {}),
+        (add_time_columns, {}),
+        (add_suffer_score_buckets, {"bins": suffer_score_bins}),
+        (add_average_running_speed, {}),
+        (update_environment, {}),
+        (replace_nan_values, {"fill_values": fill_values}),
+        (filter_columns, {}),
+        (sort_and_reset_index, {}),
+        (convert_date_to_yyyymmdd, {}),
+        (capitalize_all_strings, {}),
+    ]
+
+
+def clean_lazy(df, suffer_score_bins: list = None, fill_values: dict = None):
+    """
+    Query plan of the clean activity table.
+
+    :param df: Raw activities, as a pandas DataFrame or a Polars DataFrame/LazyFrame.
+    :param suffer_score_bins: Fixed suffer score bucket edges (optional).
+    :param fill_values: Fixed NaN fill values per column (optional).
+    :return: LazyFrame of the clean activities, in Polars types.
+    """
+    if pl is None:
+        raise Exception("The polars backend requires polars (pip install polars).")
+
+    if isinstance(df, pd.DataFrame):
+        # NaN becomes null, as missing values are in Polars
+        df = pl.from_pandas(df, nan_to_null=True)
+    lf = df.lazy()
+
+    for stage, kwargs in get_clean_stages(suffer_score_bins, fill_values):
+        lf = stage(lf, **kwargs)
+    return lf
+
+
+def to_pandas_clean(df) -> pd.DataFrame:
+    """
+    Convert the clean table from Polars to the pandas clean table of
+    `modules.processing.clean_data`.
+    """
+    clean_df = df.to_pandas(date_as_object=True)
+
+    # Ordered buckets, as made by pd.cut
+    buckets = clean_df["suffer_score_bucket"]
+    clean_df["suffer_score_bucket"] = buckets.astype(
+        pd.CategoricalDtype(list(buckets.cat.categories), ordered=True)
+    )
+    clean_df.index += 1  # Index starting from 1, like sort_and_reset_index
+    return clean_df
+
+
+def clean_data(df, suffer_score_bins: list = None, fill_values: dict = None):
+    """
+    Clean raw activities on Polars, same result as `modules.processing.clean_data`.
+
+    :param df: Raw activities, as a pandas DataFrame or a Polars DataFrame/LazyFrame.
+    :return: The clean activities as a pandas DataFrame.
+    """
+    try:
+        lf = clean_lazy(df, suffer_score_bins, fill_values)
+        clean_df = to_pandas_clean(lf.collect())
+
+    except Exception as e:
+        logger.error(f"Error during DataFrame cleaning: {e}")
+        raise
+
+    return clean_df
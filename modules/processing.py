@@ -1,4 +1,6 @@
 # modules/processing.py
+import math
+import numpy as np
 import pandas as pd
 import logging
 
@@ -7,9 +9,11 @@ from assets.utils import (
     m_to_km,
     ms_to_kph,
     sec_to_h,
+    ALL_WEEKDAYS,
+    MONTH_MAPPING,
 )
-from assets.health_data import resting_hr, max_hr, weight_kg, stride_length
 from assets.config import local_tz, ignored_tzs, setup_logging
+from modules.health import health_store
 
 setup_logging()
 logger = logging.getLogger(__name__)
@@ -26,8 +30,15 @@ The main tasks performed by this module include:
 4. **Data Compilation**: Organizing and compiling the cleaned data into structured DataFrames for further analysis or reporting.
 
 This module ensures that Strava data is processed efficiently, providing clean and actionable insights.
+
+Every stage works on whole columns, no stage runs Python code per row or per cell.
 """
 
+# "HH:MM" label for every minute of the day
+TIME_LABELS = {
+    minute: f"{minute // 60:02d}:{minute % 60:02d}" for minute in range(1440)
+}
+
 
 def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -44,9 +55,7 @@ def rename_columns(df: pd.DataFrame) -> pd.DataFrame:
         "moving_time": "duration",
         "total_elevation_gain": "elevation_gain",
     }
-    df.rename(columns=rename_mapping, inplace=True)
-
-    return df
+    return df.rename(columns=rename_mapping)
 
 
 def filter_by_timezone(df: pd.DataFrame, excluded_timezones: list) -> pd.DataFrame:
@@ -83,8 +92,6 @@ def filter_by_period(
     :return: DataFrame filtered by given period.
     :rtype: pd.DataFrame
     """
-    df = df.sort_values(by="date", ascending=True)
-
     if start_date:
         try:
             start_date = pd.to_datetime(start_date)
@@ -120,13 +127,13 @@ def convert_units(df: pd.DataFrame) -> pd.DataFrame:
     """
 
     if "distance" in df.columns:
-        df["distance"] = df["distance"].apply(m_to_km)
+        df["distance"] = m_to_km(df["distance"])
     if "duration" in df.columns:
-        df["duration"] = df["duration"].apply(sec_to_h)
+        df["duration"] = sec_to_h(df["duration"])
     if "average_speed" in df.columns:
-        df["average_speed"] = df["average_speed"].apply(ms_to_kph)
+        df["average_speed"] = ms_to_kph(df["average_speed"])
     if "max_speed" in df.columns:
-        df["max_speed"] = df["max_speed"].apply(ms_to_kph)
+        df["max_speed"] = ms_to_kph(df["max_speed"])
 
     return df
 
@@ -165,18 +172,13 @@ def filter_columns(df: pd.DataFrame) -> pd.DataFrame:
         "max_heartrate",
         "suffer_score",
         "suffer_score_bucket",
-        "elevation_rate",
         "average_watts",
         "average_cadence",
-        "pace",
-        "spm",
-        "vo2_max",
         "sport_type",
         "environment",
     ]
 
-    df = df[columns].copy()
-    return df
+    return df[columns]
 
 
 def add_year_month_column(df: pd.DataFrame) -> pd.DataFrame:
@@ -188,7 +190,7 @@ def add_year_month_column(df: pd.DataFrame) -> pd.DataFrame:
     :rtype: pd.DataFrame
     """
 
-    df["month"] = df["date"].dt.month_name().str.slice(stop=3).str.lower()
+    df["month"] = df["date"].dt.month.map(MONTH_MAPPING)
     df["year"] = df["date"].dt.year
     return df
 
@@ -204,8 +206,7 @@ def add_day_of_week(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: DataFrame with "day_of_week"-column added.
     """
 
-    weekdays = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
-    df["day_of_week"] = df["date"].dt.weekday.map(lambda x: weekdays[x])
+    df["day_of_week"] = df["date"].dt.weekday.map(dict(enumerate(ALL_WEEKDAYS)))
     return df
 
 
@@ -230,30 +231,12 @@ def add_time_columns(df: pd.DataFrame) -> pd.DataFrame:
     df["date"] = df["date"].dt.tz_convert(local_tz)
 
     # Calculate end_time based on duration
-    df["end_time"] = df["date"] + pd.to_timedelta(df["duration"], unit="h")
-
-    df["start_time"] = df["date"].dt.strftime("%H:%M")
-    df["end_time"] = df["end_time"].dt.strftime("%H:%M")
-
-    return df
-
+    end_time = df["date"] + pd.to_timedelta(df["duration"], unit="h")
 
-def add_elevation_rate(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Add "elevation_rate"-column (elevation gained per kilometer).
+    # Same as strftime("%H:%M"), via the minute of the day
+    df["start_time"] = (df["date"].dt.hour * 60 + df["date"].dt.minute).map(TIME_LABELS)
+    df["end_time"] = (end_time.dt.hour * 60 + end_time.dt.minute).map(TIME_LABELS)
 
-    :param
-        df (pd.DataFrame): The DataFrame containing Strava data.
-
-    :returns
-        pd.DataFrame: DataFrame with "elevation_rate"-column added.
-    """
-    df["elevation_rate"] = df.apply(
-        lambda row: (
-            (row["elevation_gain"] / row["distance"]) if row["distance"] > 0 else 0
-        ),
-        axis=1,
-    )
     return df
 
 
@@ -261,6 +244,9 @@ def sort_and_reset_index(df: pd.DataFrame) -> pd.DataFrame:
     """
     Sort DataFrame by 'date' column and reset index.
 
+    This is the only sort of the pipeline. It is stable, so activities with the same
+    start keep their input order.
+
     :param
         df (pd.DataFrame): The DataFrame containing Strava data.
 
@@ -268,9 +254,7 @@ def sort_and_reset_index(df: pd.DataFrame) -> pd.DataFrame:
         pd.DataFrame: Sorted and reindexed DataFrame.
     """
 
-    df = df.sort_values(by="date")
-
-    df.reset_index(drop=True, inplace=True)
+    df = df.sort_values(by="date", kind="stable", ignore_index=True)
     df.index += 1  # Shift index to start from 1
 
     return df
@@ -286,32 +270,59 @@ def update_environment(df: pd.DataFrame) -> pd.DataFrame:
     :rtype: pd.DataFrame
     """
 
-    df["environment"] = df["environment"].apply(lambda x: "indoor" if x else "outdoor")
+    indoor = df["environment"].astype(bool)
+    df["environment"] = np.where(indoor, "indoor", "outdoor").astype(object)
 
     return df
 
 
-def replace_nan_values(df: pd.DataFrame) -> pd.DataFrame:
+NAN_FILL_COLUMNS = ["max_heartrate", "average_heartrate", "suffer_score"]
+SUFFER_SCORE_LABELS = ["low", "medium", "high"]
+
+
+def column_mean(values: pd.Series) -> float:
+    """
+    Mean of the non-NaN values of a column.
+
+    The sum is correctly rounded (math.fsum), so unlike a plain float sum it does not
+    depend on the order of the rows, and the same mean can be kept up to date from
+    running statistics (see modules.incremental).
+
+    :param values: Numeric column.
+    :return: The mean, NaN if the column has no values.
+    """
+    values = values.dropna().to_numpy(dtype=float)
+    if len(values) == 0:
+        return np.nan
+    return math.fsum(values) / len(values)
+
+
+def replace_nan_values(df: pd.DataFrame, fill_values: dict = None) -> pd.DataFrame:
     """
     Replace NaN values with the mean for columns with missing heart rate data.
 
     :param
         df (pd.DataFrame): The DataFrame containing Strava data.
+        fill_values (dict): Values to fill with per column, instead of this
+            DataFrame's means (optional).
 
     :returns
         pd.DataFrame: DataFrame with NaN values replaced.
     """
-    columns_to_fill = ["max_heartrate", "average_heartrate", "suffer_score"]
-
-    for column in columns_to_fill:
+    for column in NAN_FILL_COLUMNS:
         if column in df.columns:
-            mean_value = df[column].mean()
+            if fill_values is not None:
+                mean_value = fill_values[column]
+            else:
+                mean_value = column_mean(df[column])
             df[column] = df[column].fillna(mean_value)
 
     return df
 
 
-def add_suffer_score_buckets(df: pd.DataFrame, num_bins: int = 3) -> pd.DataFrame:
+def add_suffer_score_buckets(
+    df: pd.DataFrame, num_bins: int = 3, bins: list = None
+) -> pd.DataFrame:
     """
     Categorize the 'suffer_score' column into discrete buckets.
 
@@ -323,16 +334,36 @@ def add_suffer_score_buckets(df: pd.DataFrame, num_bins: int = 3) -> pd.DataFram
     :type df: pd.DataFrame
     :param num_bins: The number of quantile bins to create. Default is 5.
     :type num_bins: int
+    :param bins: Fixed bucket edges to use instead of this DataFrame's quantiles.
+    :type bins: list
     :return: DataFrame with an additional 'suffer_score_bucket' column.
     :rtype: pd.DataFrame
     """
-    labels = ["low", "medium", "high"]
-    df["suffer_score_bucket"] = pd.qcut(
-        df["suffer_score"], q=num_bins, labels=labels[:num_bins]
+    if bins is None:
+        bins = get_suffer_score_edges(df["suffer_score"], num_bins)
+
+    # Same buckets as pd.qcut when the edges are the quantiles
+    df["suffer_score_bucket"] = pd.cut(
+        df["suffer_score"],
+        bins=bins,
+        labels=SUFFER_SCORE_LABELS[: len(bins) - 1],
+        include_lowest=True,
     )
     return df
 
 
+def get_suffer_score_edges(suffer_scores, num_bins: int = 3) -> list:
+    """
+    Quantile edges of the suffer score buckets.
+
+    :param suffer_scores: Suffer scores, NaN values are ignored.
+    :param num_bins: The number of quantile bins.
+    :return: List of `num_bins + 1` edges, from the lowest to the highest score.
+    """
+    scores = pd.Series(suffer_scores, dtype=float).dropna()
+    return scores.quantile(np.linspace(0, 1, num_bins + 1)).tolist()
+
+
 def remove_short_rides(df: pd.DataFrame) -> pd.DataFrame:
     """
     Remove rides under 10 km from the DataFrame.
@@ -354,76 +385,24 @@ def remove_short_rides(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def calculate_vo2_max(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Calculate the VO2 max for each activity in the DataFrame.
-    :param
-        df (pd.DataFrame): The DataFrame containing Strava data.
-    :return:
-        pd.DataFrame: DataFrame with Vo2-max estimates added.
+def estimate_vo2_max(average_watts: pd.Series, dates: pd.Series) -> pd.Series:
     """
+    VO2 max estimate from the average power and the resting HR, weight and max HR
+    measured last before each activity (see modules.health).
 
-    # Convert dictionary to DataFrame
-    resting_hr_df = pd.DataFrame(
-        list(resting_hr.items()), columns=["year_month", "average_resting_hr"]
-    )
-    resting_hr_df["year_month"] = pd.to_datetime(
-        resting_hr_df["year_month"] + "-01"
-    ).dt.to_period("M")
-
-    if df["date"].dt.tz is None:
-        df["date"] = df["date"].dt.tz_localize("UTC")
-
-    # Extract Year-Month to match the "resting_hr" data
-    df["year_month"] = df["date"].dt.tz_convert(None).dt.to_period("M")
-
-    # Merge resting HR data with the original DataFrame
-    df = df.merge(resting_hr_df, on="year_month", how="left")
-
-    # Calculate VO2 max using vectorized operations
-    df["vo2_max"] = (df["average_watts"] * 10.8 / weight_kg) + (
-        7 * (max_hr / df["average_resting_hr"])
-    )
-
-    # Round data and drop the helper columns
-    df["vo2_max"] = df["vo2_max"].round(2)
-    df.drop(columns=["average_resting_hr", "year_month"], inplace=True)
-
-    return df
-
-
-def calculate_running_cadence(df: pd.DataFrame) -> pd.DataFrame:
-    """
-    Add SPM (steps per minute) to runs.
-
-    :param df (pd.DataFrame): The DataFrame containing Strava data.
-    :return: pd.DataFrame: DataFrame with running cadence (SPM) added.
-    """
-
-    df["spm"] = None
-    df.loc[df["sport_type"] == "Run", "spm"] = (
-        df["distance"] * 1000 / stride_length
-    ) / (df["duration"] * 60)
-
-    return df
-
-
-def calculate_pace(df: pd.DataFrame) -> pd.DataFrame:
+    :param average_watts: Average power per activity.
+    :param dates: Start date per activity.
+    :return: VO2 max estimates, rounded to 2 decimals.
     """
-    Calculate pace (minutes per kilometer)
-
-    :param df (pd.DataFrame): The DataFrame containing Strava data.
+    # As-of lookup in the sorted measurements, instead of merging a copy of the whole
+    # DataFrame
+    health = health_store.at(dates)
 
-    :return: pd.DataFrame: DataFrame with pace.
-    """
-    df["pace"] = df.apply(
-        lambda row: (
-            (row["duration"] * 60 / row["distance"]) if row["distance"] > 0 else 0
-        ),
-        axis=1,
+    # Calculate VO2 max using vectorized operations
+    vo2_max = (average_watts * 10.8 / health["weight_kg"]) + (
+        7 * (health["max_hr"] / health["resting_hr"])
     )
-
-    return df
+    return vo2_max.round(2)
 
 
 def capitalize_all_strings(df: pd.DataFrame) -> pd.DataFrame:
@@ -434,7 +413,34 @@ def capitalize_all_strings(df: pd.DataFrame) -> pd.DataFrame:
 
     :return: pd.DataFrame: DataFrame with all strings capitalized.
     """
-    df = df.map(lambda x: x.capitalize() if isinstance(x, str) else x)
+
+    def capitalize(value):
+        return value.capitalize() if isinstance(value, str) else value
+
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Maps the categories, not the rows
+            df[column] = values.map(capitalize)
+        elif values.dtype == object:
+            kind = pd.api.types.infer_dtype(values, skipna=True)
+            if kind == "string":
+                # Capitalize each distinct string once
+                codes, uniques = pd.factorize(values)
+                capitalized = np.array(
+                    [value.capitalize() for value in uniques], dtype=object
+                )
+                result = values.to_numpy(dtype=object, copy=True)
+                found = codes >= 0
+                result[found] = capitalized[codes[found]]
+                df[column] = result
+            elif kind not in ("date", "datetime", "time", "empty"):
+                # Mixed columns keep the per-cell path (and its dtype inference)
+                df[column] = values.map(capitalize)
+        elif values.dtype.kind in "iuf":
+            # Numbers came back from the per-cell map as Python numbers, i.e. 64 bits
+            df[column] = values.astype(np.int64 if values.dtype.kind in "iu" else float)
+
     return df
 
 
@@ -443,8 +449,7 @@ def rename_sport_types(df: pd.DataFrame) -> pd.DataFrame:
     :param df (pd.DataFrame): The DataFrame containing Strava data.
     :return: pd.DataFrame: DataFrame with renamed sport types.
     """
-    # Use .loc to avoid SettingWithCopyWarning
-    df.loc[:, "sport_type"] = df["sport_type"].replace({"Ride": "Bike", "Hike": "Walk"})
+    df["sport_type"] = df["sport_type"].replace({"Ride": "Bike", "Hike": "Walk"})
 
     # Remove unwanted sport types
     df = df[~df["sport_type"].isin(["Swims", "Rowing"])]
@@ -474,45 +479,85 @@ def add_average_running_speed(df: pd.DataFrame) -> pd.DataFrame:
     :return: DataFrame with running speed added.
     """
 
-    # Calculate average speed (distance / duration) for running activities only
-    df["average_speed"] = df.apply(
-        lambda row: (
-            row["distance"] / row["duration"]
-            if row["sport_type"] == "Run" and row["duration"] > 0
-            else row[
-                "average_speed"
-            ]  # Preserve existing speed for non-running activities
-        ),
-        axis=1,
+    # Calculate average speed (distance / duration) for running activities only,
+    # preserve existing speed for non-running activities
+    is_run = (df["sport_type"] == "Run") & (df["duration"] > 0)
+    df["average_speed"] = (df["distance"] / df["duration"]).where(
+        is_run, df["average_speed"]
     )
 
     return df
 
 
-def clean_data(df):
+def get_clean_stages(suffer_score_bins: list = None, fill_values: dict = None) -> list:
+    """
+    The stages of `clean_data`, in order.
+
+    :param suffer_score_bins: Fixed suffer score bucket edges (optional).
+    :param fill_values: Fixed NaN fill values per column (optional).
+    :return: List of (stage function, keyword arguments).
+    """
+    return [
+        (rename_columns, {}),
+        (filter_by_timezone, {"excluded_timezones": ignored_tzs}),
+        (rename_sport_types, {}),
+        (convert_units, {}),
+        (convert_datatypes, {}),
+        (filter_by_period, {"year": 2023}),
+        (add_year_month_column, {}),
+        (add_day_of_week, {}),
+        (add_time_columns, {}),
+        (add_suffer_score_buckets, {"bins": suffer_score_bins}),
+        (add_average_running_speed, {}),
+        (update_environment, {}),
+        (replace_nan_values, {"fill_values": fill_values}),
+        (filter_columns, {}),
+        (sort_and_reset_index, {}),
+        (convert_date_to_yyyymmdd, {}),
+        (capitalize_all_strings, {}),
+    ]
+
+
+def run_stages(
+    df: pd.DataFrame, stages: list, profiler=None, cache=None
+) -> pd.DataFrame:
+    """
+    Run a DataFrame through a list of stages.
+
+    :param df: The DataFrame to process.
+    :param stages: List of (stage function, keyword arguments).
+    :param profiler: StageProfiler recording each stage (see modules.profiling).
+    :param cache: StageCache serving unchanged stage outputs from disk (see
+        modules.stage_cache). Stages served from the cache are not profiled.
+    :return: The DataFrame returned by the last stage.
+    """
+
+    def run_stage(stage, df, kwargs):
+        if profiler is None:
+            return stage(df, **kwargs)
+        return profiler.run(stage, df, kwargs)
+
+    # The stages assign columns on filtered DataFrames and rely on copy-on-write:
+    # data is only copied when a column is modified, and never in the caller's
+    # DataFrame
+    with pd.option_context("mode.copy_on_write", True):
+        if cache is not None:
+            return cache.run(df, stages, run_stage)
+        for stage, kwargs in stages:
+            df = run_stage(stage, df, kwargs)
+    return df
+
+
+def clean_data(
+    df,
+    suffer_score_bins: list = None,
+    fill_values: dict = None,
+    profiler=None,
+    cache=None,
+):
     try:
-        clean_df = (
-            df.pipe(rename_columns)
-            .pipe(filter_by_timezone, ignored_tzs)
-            .pipe(rename_sport_types)
-            .pipe(convert_units)
-            .pipe(convert_datatypes)
-            .pipe(filter_by_period, year=2023)
-            .pipe(add_year_month_column)
-            .pipe(add_day_of_week)
-            .pipe(add_time_columns)
-            .pipe(add_elevation_rate)
-            .pipe(add_suffer_score_buckets)
-            .pipe(calculate_vo2_max)
-            .pipe(calculate_pace)
-            .pipe(calculate_running_cadence)
-            .pipe(add_average_running_speed)
-            .pipe(update_environment)
-            .pipe(replace_nan_values)
-            .pipe(filter_columns)
-            .pipe(convert_date_to_yyyymmdd)
-            .pipe(capitalize_all_strings)
-            .pipe(sort_and_reset_index)
+        clean_df = run_stages(
+            df, get_clean_stages(suffer_score_bins, fill_values), profiler, cache
         )
 
     except Exception as e:
@@ -0,0 +1,333 @@
+# modules/raw_store.py
+import os
+import glob
+import time
+import fcntl
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import logging
+from contextlib import contextmanager
+
+from assets.config import setup_logging, RAW_STORE_DIR, RAW_STORE_MAX_PARTS
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+"""
+Append-only store for raw Strava activities, partitioned by year and month.
+
+Layout:
+
+    data/raw/year=2024/month=05/part-<sequence>.parquet
+
+Every write adds a new Parquet part to the partitions it touches, and never rewrites
+the rest of the history. Rows carry the sequence they were written at, so when an
+activity id appears more than once (in the same or another month) the most recently
+written row wins. Partitions with many parts are compacted into a single part.
+
+Writers (the refresh job and the webhook worker) take an exclusive lock on the store
+while they stamp and publish a part, so parts become visible in sequence order, and
+while compact and delete replace a partition's parts. Reads take a shared lock, so they
+never list a part that is removed before they open it, and once read_written_since sees
+a sequence, every part with an earlier one is already there.
+
+Reads can be limited to a date range, in which case only the partitions overlapping
+that range are opened.
+"""
+
+
+def to_utc(date) -> pd.Timestamp:
+    """
+    Parse a date as a UTC timestamp; naive dates are taken to be in UTC.
+    """
+    timestamp = pd.Timestamp(date)
+    if timestamp.tzinfo is None:
+        return timestamp.tz_localize("UTC")
+    return timestamp.tz_convert("UTC")
+
+
+def partition_keys(start_dates: pd.Series) -> pd.Series:
+    """
+    Map UTC start dates to "year=YYYY/month=MM" partition keys.
+    """
+    dates = pd.to_datetime(start_dates, utc=True)
+    return "year=" + dates.dt.strftime("%Y") + "/month=" + dates.dt.strftime("%m")
+
+
+def part_sequence(path: str) -> int:
+    """
+    The nanosecond timestamp a part file was created at, from its name.
+    """
+    return int(os.path.basename(path).split("-")[1])
+
+
+def latest_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keep the most recently written row per activity id.
+    """
+    df = df.sort_values("_written", kind="stable")
+    return df.drop_duplicates("id", keep="last")
+
+
+class RawActivityStore:
+    """
+    Year/month partitioned Parquet store of raw activities, keyed by activity id.
+
+    :param root: Directory holding the partitions.
+    :param max_parts: Number of parts after which a partition is compacted.
+    """
+
+    def __init__(self, root: str = RAW_STORE_DIR, max_parts: int = RAW_STORE_MAX_PARTS):
+        self.root = root
+        self.max_parts = max_parts
+
+    def partitions(self) -> list:
+        """
+        List the partition keys in the store, oldest first.
+        """
+        paths = glob.glob(os.path.join(self.root, "year=*", "month=*"))
+        return sorted(os.path.relpath(path, self.root) for path in paths)
+
+    def parts(self, partition: str) -> list:
+        """
+        List the part files of a partition in write order.
+        """
+        return sorted(glob.glob(os.path.join(self.root, partition, "part-*.parquet")))
+
+    def is_empty(self) -> bool:
+        return not any(self.parts(partition) for partition in self.partitions())
+
+    @contextmanager
+    def locked(self, operation: int = fcntl.LOCK_EX):
+        """
+        Hold the store lock, exclusive by default (fcntl.LOCK_SH for readers).
+
+        The lock is not reentrant: methods that already hold it use the unlocked
+        helpers (_write_part, _read_parts).
+        """
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "w") as lock:
+            fcntl.flock(lock, operation)
+            yield
+
+    @staticmethod
+    def new_part_name(sequence: int) -> str:
+        # Nanosecond timestamp plus pid keeps names ordered and unique across writers
+        return f"part-{sequence:020d}-{os.getpid()}.parquet"
+
+    def write_part(self, df: pd.DataFrame, partition: str) -> str:
+        """
+        Atomically write a new part to a partition.
+
+        Rows are stamped with a "_written" sequence (kept through compaction) that
+        decides which copy of an activity is the latest one. The sequence is taken and
+        the part published under the store lock, so no part with an earlier sequence
+        can appear after it.
+        """
+        with self.locked():
+            return self._write_part(df, partition)
+
+    def _write_part(self, df: pd.DataFrame, partition: str) -> str:
+        # write_part, for callers holding the exclusive lock
+        directory = os.path.join(self.root, partition)
+        os.makedirs(directory, exist_ok=True)
+
+        sequence = time.time_ns()
+        if "_written" not in df.columns:
+            df = df.assign(_written=sequence)
+        path = os.path.join(directory, self.new_part_name(sequence))
+
+        df.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        return path
+
+    def upsert(self, df: pd.DataFrame) -> int:
+        """
+        Append activities to the store. Existing rows with the same id are replaced.
+
+        :param df: Raw activities with at least "id" and "start_date" columns.
+        :return: Number of partitions written to.
+        """
+        if df.empty:
+            return 0
+
+        df = df.drop(columns="_written", errors="ignore")
+        keys = partition_keys(df["start_date"])
+        for partition, rows in df.groupby(keys, sort=True):
+            self.write_part(rows.drop_duplicates("id", keep="last"), partition)
+            if len(self.parts(partition)) > self.max_parts:
+                self.compact(partition)
+
+        return keys.nunique()
+
+    def read_parts(self, partition: str, columns: list = None) -> pd.DataFrame:
+        """
+        Read a partition, keeping the latest row per activity id and its "_written"
+        sequence.
+        """
+        with self.locked(fcntl.LOCK_SH):
+            return self._read_parts(partition, columns)
+
+    def _read_parts(self, partition: str, columns: list = None) -> pd.DataFrame:
+        # read_parts, for callers holding the lock
+        if columns is not None:
+            columns = list(dict.fromkeys(["id", *columns, "_written"]))
+
+        frames = [pd.read_parquet(path, columns=columns) for path in self.parts(partition)]
+        if not frames:
+            return pd.DataFrame(columns=columns or ["id", "_written"])
+
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return latest_rows(df)
+
+    def read_partition(self, partition: str, columns: list = None) -> pd.DataFrame:
+        """
+        Read a partition, keeping the latest row per activity id.
+        """
+        return self.read_parts(partition, columns).drop(columns="_written")
+
+    def read(
+        self, start_date: str = None, end_date: str = None, columns: list = None
+    ) -> pd.DataFrame:
+        """
+        Read activities, optionally only those within a date range.
+
+        Partitions outside the range are not opened.
+
+        :param start_date: Earliest start date to include (inclusive, UTC).
+        :param end_date: Latest start date to include (inclusive, UTC).
+        :param columns: Columns to read. All columns if None.
+        :return: DataFrame of activities ordered by start date.
+        """
+        start = to_utc(start_date) if start_date else None
+        end = to_utc(end_date) if end_date else None
+        if columns is not None:
+            columns = list(dict.fromkeys(["id", "start_date", *columns]))
+
+        frames = []
+        with self.locked(fcntl.LOCK_SH):
+            for partition in self.partitions():
+                first_day = pd.Timestamp(
+                    partition.replace("year=", "").replace("/month=", "-") + "-01",
+                    tz="UTC",
+                )
+                if start is not None and first_day + pd.offsets.MonthBegin(1) <= start:
+                    continue
+                if end is not None and first_day > end:
+                    continue
+                frames.append(self._read_parts(partition, columns))
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+
+        # An activity that moved to another month keeps only its latest copy
+        df = latest_rows(pd.concat(frames, ignore_index=True))
+        dates = pd.to_datetime(df["start_date"], utc=True)
+        if start is not None:
+            df, dates = df[dates >= start], dates[dates >= start]
+        if end is not None:
+            df = df[dates <= end]
+
+        df = df.drop(columns="_written")
+        return df.sort_values(["start_date", "id"]).reset_index(drop=True)
+
+    def ids(self) -> pd.Series:
+        """
+        Ids of all activities in the store, reading only the id column.
+        """
+        with self.locked(fcntl.LOCK_SH):
+            ids = [
+                pq.read_table(path, columns=["id"])["id"].to_numpy()
+                for partition in self.partitions()
+                for path in self.parts(partition)
+            ]
+        return pd.Series(np.unique(np.concatenate(ids or [[]])), name="id")
+
+    def read_written_since(self, written: int) -> pd.DataFrame:
+        """
+        Read the activities written after a "_written" sequence, e.g. the last one a
+        consumer has processed. Only parts created after that sequence are opened.
+
+        :param written: "_written" sequence to read from (exclusive).
+        :return: DataFrame of the new or changed activities, with their "_written".
+        """
+        frames = []
+        # No writer can publish a part while the store is scanned, which could leave
+        # it out while a later one is read
+        with self.locked(fcntl.LOCK_SH):
+            for partition in self.partitions():
+                for path in self.parts(partition):
+                    # Parts are named after their sequence, which is never earlier than
+                    # the rows first written in them. Compacted parts also hold older
+                    # rows.
+                    if part_sequence(path) > written:
+                        df = pd.read_parquet(path)
+                        frames.append(df[df["_written"] > written])
+
+        if not frames:
+            return pd.DataFrame(columns=["id", "_written"])
+
+        df = latest_rows(pd.concat(frames, ignore_index=True))
+        return df.reset_index(drop=True)
+
+    def compact(self, partition: str = None) -> None:
+        """
+        Rewrite partitions as a single deduplicated part each.
+
+        :param partition: Partition to compact. All partitions if None.
+        """
+        # Under the lock, so another compactor or delete cannot remove the same parts
+        # and readers never list a part that is gone before they open it
+        with self.locked():
+            for key in [partition] if partition else self.partitions():
+                old_parts = self.parts(key)
+                if len(old_parts) <= 1:
+                    continue
+
+                # Write the merged part before removing the old ones, a crash in
+                # between only leaves duplicates that reads already resolve
+                self._write_part(self._read_parts(key), key)
+                for path in old_parts:
+                    os.remove(path)
+                logger.info(f"Compacted {len(old_parts)} parts in '{key}'.")
+
+    def delete(self, ids: list) -> int:
+        """
+        Remove activities from the store.
+
+        :param ids: Activity ids to remove.
+        :return: Number of partitions rewritten.
+        """
+        ids = set(ids)
+        rewritten = 0
+        with self.locked():
+            for partition in self.partitions():
+                found = self._read_parts(partition, columns=[])["id"].isin(ids)
+                if not found.any():
+                    continue
+
+                old_parts = self.parts(partition)
+                df = self._read_parts(partition)
+                df = df[~df["id"].isin(ids)]
+                if not df.empty:
+                    self._write_part(df, partition)
+                for path in old_parts:
+                    os.remove(path)
+                if df.empty:
+                    os.rmdir(os.path.join(self.root, partition))
+                rewritten += 1
+
+        return rewritten
+
+    def import_csv(self, csv_file: str) -> int:
+        """
+        Load a raw CSV export (e.g. the legacy data/raw_data.csv) into the store.
+
+        :param csv_file: Path to the CSV file.
+        :return: Number of activities imported.
+        """
+        df = pd.read_csv(csv_file)
+        self.upsert(df)
+        return len(df)
@@ -0,0 +1,174 @@
+# modules/schema.py
+import os
+import logging
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype
+
+from assets.config import setup_logging
+from assets.utils import ALL_MONTHS, ALL_WEEKDAYS
+from modules.processing import SUFFER_SCORE_LABELS, TIME_LABELS
+from modules.polars_processing import to_pandas_clean
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Declared schema of the clean activity table (the output of clean_data).
+
+- Low-cardinality strings are categoricals: months, weekdays and suffer score buckets
+  in their natural order, so filters compare integer codes instead of strings.
+- start_time and end_time are the minute of the day (0-1439) instead of "HH:MM".
+- Metrics are float32, except distance and duration, which are summed into yearly
+  totals and goals and keep float64.
+- year is a nullable Int16.
+
+The schema is applied when the clean table is saved and when it is loaded, and
+values that do not fit it (e.g. an unknown month) raise an error instead of silently
+becoming NaN.
+"""
+
+MONTH_DTYPE = CategoricalDtype(ALL_MONTHS, ordered=True)
+WEEKDAY_DTYPE = CategoricalDtype(
+    [day.capitalize() for day in ALL_WEEKDAYS], ordered=True
+)
+BUCKET_DTYPE = CategoricalDtype(
+    [label.capitalize() for label in SUFFER_SCORE_LABELS], ordered=True
+)
+ENVIRONMENT_DTYPE = CategoricalDtype(["Indoor", "Outdoor"])
+
+# Minute of the day for each "HH:MM" label
+TIME_MINUTES = {label: minute for minute, label in TIME_LABELS.items()}
+
+CLEAN_SCHEMA = {
+    "id": np.dtype("int64"),
+    "date": np.dtype("datetime64[ns]"),
+    "year": pd.Int16Dtype(),
+    "month": MONTH_DTYPE,
+    "day_of_week": WEEKDAY_DTYPE,
+    "start_time": np.dtype("int16"),  # Minute of the day
+    "end_time": np.dtype("int16"),
+    "duration": np.dtype("float64"),
+    "distance": np.dtype("float64"),
+    "elevation_gain": np.dtype("float32"),
+    "average_speed": np.dtype("float32"),
+    "max_speed": np.dtype("float32"),
+    "average_heartrate": np.dtype("float32"),
+    "max_heartrate": np.dtype("float32"),
+    "suffer_score": np.dtype("float32"),
+    "suffer_score_bucket": BUCKET_DTYPE,
+    "average_watts": np.dtype("float32"),
+    "average_cadence": np.dtype("float32"),
+    "sport_type": CategoricalDtype(),  # Categories are the sport types found
+    "environment": ENVIRONMENT_DTYPE,
+}
+
+TIME_COLUMNS = ["start_time", "end_time"]
+
+
+def to_minute_of_day(values: pd.Series) -> pd.Series:
+    """
+    Convert "HH:MM" times to the minute of the day. Numbers are kept as they are.
+    """
+    if values.dtype != object:
+        return values
+    return values.map(TIME_MINUTES)
+
+
+def apply_clean_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert a clean activity table to CLEAN_SCHEMA.
+
+    :param df: Clean activities, e.g. from clean_data or a clean CSV file, as a pandas
+        DataFrame or a Polars DataFrame (see modules.polars_processing).
+    :return: DataFrame with the columns of CLEAN_SCHEMA, in its order and types.
+    """
+    if not isinstance(df, pd.DataFrame):
+        df = to_pandas_clean(df)
+
+    missing = [column for column in CLEAN_SCHEMA if column not in df.columns]
+    if missing:
+        raise Exception(f"Clean data is missing columns: {missing}")
+
+    columns = {}
+    for column, dtype in CLEAN_SCHEMA.items():
+        values = df[column]
+        if column in TIME_COLUMNS:
+            values = to_minute_of_day(values)
+        elif column == "date":
+            values = pd.to_datetime(values)
+
+        converted = values.astype(dtype)
+        if isinstance(dtype, CategoricalDtype) and dtype.categories is None:
+            # Same categories (in sorted order) however the values were read
+            categories = sorted(converted.cat.categories)
+            converted = converted.cat.reorder_categories(categories)
+        # Values outside the categories (or times that are not "HH:MM") become NaN
+        invalid = converted.isna() & df[column].notna()
+        if invalid.any():
+            examples = df.loc[invalid, column].unique()[:5].tolist()
+            raise Exception(f"Values of '{column}' do not fit the schema: {examples}")
+        columns[column] = converted
+
+    return pd.DataFrame(columns, index=df.index)
+
+
+def save_clean_data(df: pd.DataFrame, path: str) -> pd.DataFrame:
+    """
+    Apply the schema and save the clean activity table as CSV, atomically.
+
+    :param df: Clean activities.
+    :param path: Path of the CSV file.
+    :return: The DataFrame in CLEAN_SCHEMA.
+    """
+    df = apply_clean_schema(df)
+    df.to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return df
+
+
+def load_clean_data(path: str) -> pd.DataFrame:
+    """
+    Load a clean activity CSV file in CLEAN_SCHEMA.
+
+    Categorical columns are parsed as categoricals directly, without building a column
+    of strings first (with the categories found, so apply_clean_schema can still
+    reject values outside the declared ones). Floats are parsed exactly, so a saved
+    table loads back unchanged.
+
+    :param path: Path of the CSV file.
+    :return: DataFrame in CLEAN_SCHEMA.
+    """
+    dtypes = {
+        column: "category"
+        for column, dtype in CLEAN_SCHEMA.items()
+        if isinstance(dtype, CategoricalDtype)
+    }
+    df = pd.read_csv(
+        path, dtype=dtypes, parse_dates=["date"], float_precision="round_trip"
+    )
+    return apply_clean_schema(df)
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> str:
+    """
+    Memory per column of two versions of a table (e.g. before and after the schema),
+    as a text table.
+    """
+    before_sizes = before.memory_usage(deep=True, index=False)
+    after_sizes = after.memory_usage(deep=True, index=False)
+
+    lines = [f"{'Column':<22} {'Before':>12} {'After':>12} {'Ratio':>7}"]
+    for column in after.columns:
+        size_before, size_after = before_sizes.get(column, 0), after_sizes[column]
+        ratio = size_after / size_before if size_before else np.nan
+        lines.append(
+            f"{column:<22} {size_before / 2**10:>9.0f} KiB "
+            f"{size_after / 2**10:>9.0f} KiB {ratio:>7.2f}"
+        )
+    total_before, total_after = before_sizes.sum(), after_sizes.sum()
+    lines.append(
+        f"{'Total':<22} {total_before / 2**10:>9.0f} KiB "
+        f"{total_after / 2**10:>9.0f} KiB {total_after / total_before:>7.2f}"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,262 @@
+# modules/stage_cache.py
+import os
+import glob
+import pickle
+import hashlib
+import inspect
+import logging
+import numpy as np
+import pandas as pd
+
+from assets.config import (
+    setup_logging,
+    local_tz,
+    ignored_tzs,
+    CLEAN_CACHE_DIR,
+    CLEAN_CACHE_MAX_BYTES,
+    CLEAN_CACHE_CHECKPOINTS,
+)
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+On-disk cache of the outputs of `modules.processing.run_stages`.
+
+Every stage output is stored under a key chained from the stage's input:
+
+    key(input)    = hash of the DataFrame's content, index, columns and dtypes
+    key(output)   = hash(key(input), stage source code, stage kwargs, config version)
+
+The stage source code includes the functions the stage calls and the module-level
+constants they read (e.g. MONTH_MAPPING or NAN_FILL_COLUMNS), so a change to a helper
+or a constant invalidates the stages using it.
+
+The config version covers what the stages read besides their arguments: ignored_tzs,
+local_tz and the pandas version (the health measurements only enter the derived metrics,
+see modules.metrics). A run computes the keys of all stages up front, loads the output
+of the last stage found in the cache and only runs the stages after it, so an unchanged
+input is served from disk without running any stage, and a change to a stage re-runs the
+stages from the closest stored output before it.
+
+Writing an entry costs about as much as running a stage, so only the output of the
+last stage and of the checkpoint stages (CLEAN_CACHE_CHECKPOINTS) are stored.
+
+Entries are pickled DataFrames (exact dtypes, time zones, categories and index). The
+cache is kept under a size budget by evicting the least recently used entries; a hit
+touches the entry's modification time.
+"""
+
+
+def config_version() -> str:
+    """
+    Fingerprint of the configuration the stages depend on.
+    """
+    config = [
+        sorted(ignored_tzs),
+        str(local_tz),
+        pd.__version__,
+    ]
+    return hashlib.sha256(repr(config).encode()).hexdigest()
+
+
+# Module-level values hashed by their repr; other objects (modules, loggers, ...) are
+# skipped, their repr can hold a memory address
+CONSTANT_TYPES = (bool, int, float, str, bytes, list, tuple, dict, set, frozenset)
+
+
+def constant_repr(value) -> str:
+    """
+    Stable repr of a module-level constant, or None if it is not a plain value.
+    """
+    if isinstance(value, (set, frozenset)):
+        return repr(sorted(value, key=repr))  # Set order varies between processes
+    if isinstance(value, CONSTANT_TYPES) or isinstance(value, np.generic):
+        return repr(value)
+    return None
+
+
+def function_sources(function, seen: set) -> list:
+    """
+    Source of a function, of the functions it calls by name, transitively (e.g. the
+    helpers of a stage, like the unit conversions), and of the module-level constants
+    they read.
+    """
+    if function in seen:
+        return []
+    seen.add(function)
+
+    try:
+        sources = [inspect.getsource(function)]
+    except (OSError, TypeError):
+        return [f"{function.__module__}.{function.__qualname__}"]
+
+    code = getattr(function, "__code__", None)
+    if code is not None:
+        for name in code.co_names:
+            value = function.__globals__.get(name)
+            if inspect.isfunction(value):
+                sources.extend(function_sources(value, seen))
+            elif constant_repr(value) is not None:
+                sources.append(f"{name} = {constant_repr(value)}")
+    return sources
+
+
+def stage_fingerprint(stage, kwargs: dict) -> str:
+    """
+    Fingerprint of a stage's code (including the functions it calls) and keyword
+    arguments.
+    """
+    source = "\n".join(function_sources(stage, set()))
+    arguments = repr(sorted(kwargs.items()))
+    return hashlib.sha256(f"{source}\n{arguments}".encode()).hexdigest()
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """
+    Hash of a DataFrame's values, index, column names and dtypes.
+
+    Columns of numbers and dates are hashed as their bytes, other columns (strings,
+    mixed objects, categoricals) as their pickle, which keeps the type of each value.
+    """
+    digest = hashlib.sha256()
+    digest.update(repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode())
+    for values in [df.index, *(df[column] for column in df.columns)]:
+        dtype = values.dtype
+        if isinstance(dtype, np.dtype) and dtype != object:
+            digest.update(np.ascontiguousarray(values.to_numpy()).tobytes())
+        elif dtype.kind in "mM":
+            # Dates with a time zone (the time zone is part of the dtype)
+            digest.update(values.array.asi8.tobytes())
+        else:
+            digest.update(pickle.dumps(values.to_numpy(), protocol=5))
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    LRU cache of stage outputs in a directory, one pickle file per entry.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = CLEAN_CACHE_DIR,
+        max_bytes: int = CLEAN_CACHE_MAX_BYTES,
+        checkpoints: list = CLEAN_CACHE_CHECKPOINTS,
+    ):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.checkpoints = set(checkpoints)
+        self.config = config_version()
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def stage_keys(self, df: pd.DataFrame, stages: list) -> list:
+        """
+        The cache key of every stage output, in order.
+
+        :param df: Input of the first stage.
+        :param stages: List of (stage function, keyword arguments).
+        :return: List of keys, one per stage.
+        """
+        key = frame_fingerprint(df)
+        keys = []
+        for stage, kwargs in stages:
+            fingerprint = f"{key}:{stage_fingerprint(stage, kwargs)}:{self.config}"
+            key = hashlib.sha256(fingerprint.encode()).hexdigest()
+            keys.append(key)
+        return keys
+
+    def get(self, key: str):
+        """
+        Load a cached DataFrame, None if the key is not cached.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                df = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # Unreadable entry (e.g. written by another pandas version), drop it
+            logger.warning(f"Dropping unreadable cache entry '{path}': {e}")
+            self.remove(path)
+            return None
+
+        os.utime(path)
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        """
+        Store a DataFrame, then evict entries over the size budget.
+        """
+        path = self.path(key)
+        with open(path + ".tmp", "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        self.evict()
+
+    def remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache fits its budget.
+        """
+        entries = []
+        for path in glob.glob(os.path.join(self.cache_dir, "*.pkl")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.remove(path)
+            total -= size
+
+    def size(self) -> int:
+        """
+        Total size of the cached entries, in bytes.
+        """
+        return sum(
+            os.path.getsize(path)
+            for path in glob.glob(os.path.join(self.cache_dir, "*.pkl"))
+        )
+
+    def run(self, df: pd.DataFrame, stages: list, run_stage) -> pd.DataFrame:
+        """
+        Run the stages, starting from the last stage output found in the cache.
+
+        :param df: Input of the first stage.
+        :param stages: List of (stage function, keyword arguments).
+        :param run_stage: Function (stage, df, kwargs) -> DataFrame running one stage.
+        :return: The output of the last stage.
+        """
+        keys = self.stage_keys(df, stages)
+
+        start = 0
+        for position in range(len(stages) - 1, -1, -1):
+            cached = self.get(keys[position])
+            if cached is not None:
+                df, start = cached, position + 1
+                break
+
+        if start:
+            logger.info(f"Stage cache: {start} of {len(stages)} stages from disk.")
+
+        for position in range(start, len(stages)):
+            stage, kwargs = stages[position]
+            df = run_stage(stage, df, kwargs)
+            if position == len(stages) - 1 or stage.__name__ in self.checkpoints:
+                self.put(keys[position], df)
+
+        return df
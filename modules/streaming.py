@@ -0,0 +1,171 @@
+# modules/streaming.py
+import os
+import shutil
+import logging
+import tempfile
+from fractions import Fraction
+import numpy as np
+import pandas as pd
+
+from assets.config import setup_logging, STREAM_CHUNK_SIZE
+from modules.incremental import bucket_suffer_scores, clean_rows, exact_sum
+from modules.processing import (
+    NAN_FILL_COLUMNS,
+    get_suffer_score_edges,
+    replace_nan_values,
+)
+from modules.schema import apply_clean_schema
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Streaming version of `modules.processing.clean_data` for raw CSV files too large to
+load at once.
+
+The file is read three times, a chunk at a time:
+
+1. Schema pass: the dtype pandas would infer for each column over the whole file, so
+   every chunk is parsed the same way as a single read_csv of the file.
+2. Clean pass: the per-activity stages (see `modules.incremental.get_row_stages`) run
+   on each chunk. The exact sums and counts of the NaN-filled columns and the suffer
+   scores are collected, and the cleaned rows are spilled to Parquet files per month
+   of their start date.
+3. Merge pass: month by month, the spilled rows get their suffer score buckets and
+   NaN fill values from the statistics of the whole file, are sorted, and appended
+   to the output CSV in the clean table schema (see `modules.schema`).
+
+Memory is bounded by the chunk size and the largest month, plus 8 bytes per
+activity for the suffer scores the bucket quantiles are computed from. The output is
+the same as cleaning the whole file with `clean_data`.
+"""
+
+
+def merge_dtypes(first: np.dtype, second: np.dtype) -> np.dtype:
+    """
+    The dtype of a column read as one, from the dtypes of two of its parts (as
+    read_csv unifies the dtypes of its internal chunks).
+    """
+    if first == second:
+        return first
+    if first.kind in "iuf" and second.kind in "iuf":
+        return np.result_type(first, second)
+    return np.dtype(object)
+
+
+def read_csv_schema(csv_file: str, chunksize: int) -> dict:
+    """
+    Infer the dtype of every column of a CSV file, a chunk at a time.
+
+    :return: Mapping of column name to dtype.
+    """
+    schema = {}
+    for chunk in pd.read_csv(csv_file, chunksize=chunksize):
+        for column, dtype in chunk.dtypes.items():
+            schema[column] = merge_dtypes(schema.get(column, dtype), dtype)
+    return schema
+
+
+class ChunkStatistics:
+    """
+    Mergeable statistics of the dataset-wide stages, collected chunk by chunk.
+    """
+
+    def __init__(self):
+        self.sums = {column: Fraction(0) for column in NAN_FILL_COLUMNS}
+        self.counts = {column: 0 for column in NAN_FILL_COLUMNS}
+        self.suffer_scores = []
+
+    def add(self, rows: pd.DataFrame) -> None:
+        for column in NAN_FILL_COLUMNS:
+            values = rows[column].dropna()
+            self.sums[column] += exact_sum(values)
+            self.counts[column] += len(values)
+        self.suffer_scores.append(rows["suffer_score"].dropna().to_numpy(dtype=float))
+
+    def fill_values(self) -> dict:
+        """
+        The column means replace_nan_values would compute over all rows.
+        """
+        return {
+            column: float(self.sums[column]) / self.counts[column]
+            if self.counts[column]
+            else np.nan
+            for column in NAN_FILL_COLUMNS
+        }
+
+    def suffer_score_edges(self) -> list:
+        return get_suffer_score_edges(np.concatenate(self.suffer_scores or [[]]))
+
+
+def clean_csv_in_chunks(
+    csv_file: str,
+    output_path: str,
+    chunksize: int = STREAM_CHUNK_SIZE,
+    spill_dir: str = None,
+) -> int:
+    """
+    Clean a raw CSV file in chunks and write the result to a CSV file.
+
+    :param csv_file: Path to the raw CSV file.
+    :param output_path: Path of the clean CSV file, replaced atomically.
+    :param chunksize: Number of raw rows per chunk.
+    :param spill_dir: Directory for the temporary files (system default if None).
+    :return: Number of clean rows written.
+    """
+    schema = read_csv_schema(csv_file, chunksize)
+    statistics = ChunkStatistics()
+    spill = tempfile.mkdtemp(dir=spill_dir)
+
+    try:
+        offset = 0
+        header = None
+        for number, chunk in enumerate(pd.read_csv(csv_file, chunksize=chunksize)):
+            chunk = chunk.astype(schema)
+            # Row numbers within the file, so ties in start time keep the file order
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+
+            rows = clean_rows(chunk).assign(_row=lambda rows: rows.index)
+            statistics.add(rows)
+            header = rows.iloc[:0].drop(columns=["_start", "_row"])
+
+            starts = pd.to_datetime(rows["_start"], utc=True)
+            months = starts.dt.year * 100 + starts.dt.month
+            for month, month_rows in rows.groupby(months, sort=False):
+                directory = os.path.join(spill, str(month))
+                os.makedirs(directory, exist_ok=True)
+                month_rows.to_parquet(
+                    os.path.join(directory, f"part-{number:06d}.parquet"), index=False
+                )
+
+        fill_values = statistics.fill_values()
+        edges = statistics.suffer_score_edges()
+
+        written = 0
+        with open(output_path + ".tmp", "w", newline="") as output:
+            for month in sorted(os.listdir(spill), key=int):
+                directory = os.path.join(spill, month)
+                parts = [
+                    pd.read_parquet(os.path.join(directory, name))
+                    for name in sorted(os.listdir(directory))
+                ]
+                rows = pd.concat(parts, ignore_index=True)
+                bucket_suffer_scores(rows, edges)
+                rows = replace_nan_values(rows, fill_values=fill_values)
+                rows = rows.sort_values(["_start", "_row"])
+                rows = apply_clean_schema(rows.drop(columns=["_start", "_row"]))
+
+                rows.to_csv(output, header=written == 0, index=False)
+                written += len(rows)
+
+            if written == 0 and header is not None:
+                # Header only, like an empty clean DataFrame
+                apply_clean_schema(header).to_csv(output, index=False)
+
+        os.replace(output_path + ".tmp", output_path)
+        logger.info(f"Streamed {offset} raw rows into {written} clean rows.")
+        return written
+
+    finally:
+        shutil.rmtree(spill, ignore_errors=True)
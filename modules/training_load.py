@@ -0,0 +1,296 @@
+# modules/training_load.py
+import logging
+import threading
+import numpy as np
+import pandas as pd
+
+from assets.config import (
+    setup_logging,
+    CTL_DAYS,
+    ATL_DAYS,
+    FTP_WATTS,
+    TRAINING_LOAD_INPUT,
+)
+
+setup_logging()
+logger = logging.getLogger(__name__)
+
+"""
+Training load over the activity history: fitness (CTL, chronic training load), fatigue
+(ATL, acute training load) and form (TSB, training stress balance).
+
+CTL and ATL are exponentially weighted averages of the daily load over CTL_DAYS and
+ATL_DAYS days:
+
+    ctl[d] = (1 - 1 / CTL_DAYS) * ctl[d - 1] + load[d] / CTL_DAYS
+    atl[d] = (1 - 1 / ATL_DAYS) * atl[d - 1] + load[d] / ATL_DAYS
+    tsb[d] = ctl[d - 1] - atl[d - 1]  # Form going into the day
+
+starting from 0 the day before the first activity, with 0 load on days without one.
+Each day only needs the day before, so TrainingLoad keeps the latest values and
+appending a day costs O(1); a refresh appends the new days and only recomputes from
+the first stored day whose load changed, instead of re-running the averages over the
+whole history.
+compute_training_load is the full recompute with pandas, e.g. to check against.
+
+The daily load is the suffer score or the power-based TSS of the day's activities (see
+daily_loads).
+"""
+
+TRAINING_LOAD_COLUMNS = ["date", "load", "ctl", "atl", "tsb"]
+NANOSECONDS_PER_DAY = 86_400 * 10**9
+
+
+def power_tss(duration: pd.Series, average_watts: pd.Series, ftp: float) -> pd.Series:
+    """
+    Training stress score from power: hours * intensity factor² * 100.
+
+    The clean table has no normalized power, so the intensity factor is the average
+    power over the FTP. Activities without power get 0.
+
+    :param duration: Durations (h).
+    :param average_watts: Average power (W).
+    :param ftp: Functional threshold power (W).
+    :return: TSS of every activity.
+    """
+    intensity = average_watts / ftp
+    return (duration * intensity**2 * 100).fillna(0)
+
+
+def daily_loads(
+    df: pd.DataFrame,
+    load: str = TRAINING_LOAD_INPUT,
+    ftp: float = FTP_WATTS,
+    end=None,
+) -> pd.Series:
+    """
+    Total load per day, from the first activity day to the last (or `end`), with 0 on
+    days without an activity.
+
+    :param df: The clean activities.
+    :param load: "suffer_score" or "tss" (power-based, see power_tss).
+    :param ftp: Functional threshold power (W) for "tss".
+    :param end: Last day of the series, e.g. today, so fitness and fatigue decay over
+        the days since the last activity.
+    :return: Series of loads indexed by day.
+    """
+    if load == "suffer_score":
+        values = df["suffer_score"].fillna(0)
+    elif load == "tss":
+        values = power_tss(df["duration"], df["average_watts"], ftp)
+    else:
+        raise Exception(f"Unknown training load input '{load}'.")
+
+    days = pd.to_datetime(df["date"])
+    if days.dt.tz is not None:
+        days = days.dt.tz_localize(None)
+    totals = values.astype(np.float64).groupby(days.dt.normalize()).sum()
+
+    if totals.empty:
+        return pd.Series(dtype=np.float64, index=pd.DatetimeIndex([], name="date"))
+
+    last = totals.index.max() if end is None else pd.Timestamp(end).normalize()
+    index = pd.date_range(totals.index.min(), last, freq="D", name="date")
+    return totals.reindex(index, fill_value=0.0)
+
+
+def day_numbers(days) -> np.ndarray:
+    """
+    Days since the epoch of (naive) dates.
+    """
+    return pd.DatetimeIndex(days).asi8 // NANOSECONDS_PER_DAY
+
+
+class TrainingLoad:
+    """
+    CTL, ATL and TSB of a daily load series, updated a day at a time.
+
+    The values are kept in NumPy buffers that grow by doubling, so appending a day is
+    O(1) (amortized) and comparing a refreshed series with the stored one is a
+    vectorized comparison of views, without copying the history.
+
+    :param ctl_days: Time constant of fitness (CTL), in days.
+    :param atl_days: Time constant of fatigue (ATL), in days.
+    """
+
+    ARRAYS = ["days", "loads", "ctl", "atl", "tsb"]
+
+    def __init__(self, ctl_days: int = CTL_DAYS, atl_days: int = ATL_DAYS):
+        self.ctl_alpha = 1 / ctl_days
+        self.atl_alpha = 1 / atl_days
+        self.lock = threading.Lock()
+        # One entry per day, without gaps; the first `length` entries are in use
+        self.length = 0
+        self.days = np.empty(0, dtype=np.int64)  # Days since the epoch
+        self.loads = np.empty(0, dtype=np.float64)
+        self.ctl = np.empty(0, dtype=np.float64)
+        self.atl = np.empty(0, dtype=np.float64)
+        self.tsb = np.empty(0, dtype=np.float64)
+
+    def copy(self) -> "TrainingLoad":
+        """
+        An independent copy, to update while readers keep using this one.
+        """
+        copied = TrainingLoad.__new__(TrainingLoad)
+        copied.ctl_alpha, copied.atl_alpha = self.ctl_alpha, self.atl_alpha
+        copied.lock = threading.Lock()
+        with self.lock:
+            copied.length = self.length
+            for name in self.ARRAYS:
+                setattr(copied, name, getattr(self, name).copy())
+        return copied
+
+    def _reserve(self, length: int) -> None:
+        if length <= len(self.days):
+            return
+        capacity = max(length, 2 * len(self.days), 256)
+        for name in self.ARRAYS:
+            values = getattr(self, name)
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[: self.length] = values[: self.length]
+            setattr(self, name, grown)
+
+    def _state(self) -> tuple:
+        # CTL and ATL of the last day, 0 before the first one
+        if self.length == 0:
+            return 0.0, 0.0
+        return float(self.ctl[self.length - 1]), float(self.atl[self.length - 1])
+
+    def _next(self, ctl: float, atl: float, load: float) -> tuple:
+        return (
+            (1 - self.ctl_alpha) * ctl + self.ctl_alpha * load,
+            (1 - self.atl_alpha) * atl + self.atl_alpha * load,
+        )
+
+    def _append(self, day: int, load: float) -> None:
+        ctl, atl = self._state()
+        position = self.length
+        self._reserve(position + 1)
+        self.days[position] = day
+        self.loads[position] = load
+        self.ctl[position], self.atl[position] = self._next(ctl, atl, load)
+        self.tsb[position] = ctl - atl
+        self.length += 1
+
+    def append(self, day, load: float) -> None:
+        """
+        Add the load of the day after the last one; days in between get 0 load.
+
+        :param day: The day (date or Timestamp).
+        :param load: The day's total load.
+        """
+        day = int(day_numbers([day])[0])
+        with self.lock:
+            if self.length:
+                last_day = int(self.days[self.length - 1])
+                if day <= last_day:
+                    raise Exception(
+                        f"Cannot append {pd.to_datetime(day, unit='D').date()}, the "
+                        f"training load already goes to "
+                        f"{pd.to_datetime(last_day, unit='D').date()}."
+                    )
+                for gap_day in range(last_day + 1, day):
+                    self._append(gap_day, 0.0)
+            self._append(day, float(load))
+
+    def update(self, loads: pd.Series) -> int:
+        """
+        Bring the training load in line with a daily load series (see daily_loads).
+
+        The days after the stored ones are appended. Only if the load of a stored day
+        changed (e.g. an edited or deleted activity) is the training load recomputed
+        from that day on.
+
+        :param loads: Loads indexed by consecutive days.
+        :return: The number of days appended or recomputed.
+        """
+        days = day_numbers(loads.index)
+        values = loads.to_numpy(dtype=np.float64)
+
+        with self.lock:
+            overlap = min(self.length, len(days))
+            changed = (self.days[:overlap] != days[:overlap]) | (
+                self.loads[:overlap] != values[:overlap]
+            )
+            if changed.any():
+                start = int(np.argmax(changed))
+                logger.info(
+                    f"Training load: recomputing from "
+                    f"{pd.to_datetime(days[start], unit='D').date()}"
+                )
+            else:
+                start = overlap
+            self.length = start  # Drops the stored days from `start` on
+
+            for day, load in zip(days[start:].tolist(), values[start:].tolist()):
+                self._append(day, load)
+
+        return len(days) - start
+
+    def to_frame(self, end=None) -> pd.DataFrame:
+        """
+        The training load per day.
+
+        :param end: Last day to show, e.g. today. The days after the last stored one
+            get 0 load, so fitness and fatigue decay up to it; the stored training
+            load is not changed.
+        :return: DataFrame with date, load, ctl, atl and tsb columns.
+        """
+        with self.lock:
+            # Copies, an update may overwrite the buffers once the lock is released
+            arrays = {
+                name: getattr(self, name)[: self.length].copy() for name in self.ARRAYS
+            }
+            ctl, atl = self._state()
+
+        if end is not None and len(arrays["days"]):
+            last_day = int(arrays["days"][-1])
+            rest = np.arange(last_day + 1, int(day_numbers([end])[0]) + 1)
+            extra = {name: np.empty(len(rest)) for name in ["ctl", "atl", "tsb"]}
+            for position in range(len(rest)):
+                extra["tsb"][position] = ctl - atl
+                ctl, atl = self._next(ctl, atl, 0.0)
+                extra["ctl"][position], extra["atl"][position] = ctl, atl
+            arrays["days"] = np.concatenate([arrays["days"], rest])
+            arrays["loads"] = np.concatenate([arrays["loads"], np.zeros(len(rest))])
+            for name, values in extra.items():
+                arrays[name] = np.concatenate([arrays[name], values])
+
+        return pd.DataFrame(
+            {
+                "date": pd.to_datetime(arrays["days"], unit="D"),
+                "load": arrays["loads"],
+                "ctl": arrays["ctl"],
+                "atl": arrays["atl"],
+                "tsb": arrays["tsb"],
+            },
+            columns=TRAINING_LOAD_COLUMNS,
+        )
+
+
+def compute_training_load(
+    loads: pd.Series, ctl_days: int = CTL_DAYS, atl_days: int = ATL_DAYS
+) -> pd.DataFrame:
+    """
+    CTL, ATL and TSB of the whole daily load series at once, with pandas ewm.
+
+    :param loads: Loads indexed by consecutive days (see daily_loads).
+    :param ctl_days: Time constant of fitness (CTL), in days.
+    :param atl_days: Time constant of fatigue (ATL), in days.
+    :return: DataFrame like TrainingLoad.to_frame.
+    """
+    # The averages start at 0 the day before the first load
+    padded = pd.Series(np.concatenate([[0.0], loads.to_numpy(dtype=np.float64)]))
+    ctl = padded.ewm(alpha=1 / ctl_days, adjust=False).mean().to_numpy()
+    atl = padded.ewm(alpha=1 / atl_days, adjust=False).mean().to_numpy()
+
+    return pd.DataFrame(
+        {
+            "date": pd.DatetimeIndex(loads.index).normalize(),
+            "load": padded.to_numpy()[1:],
+            "ctl": ctl[1:],
+            "atl": atl[1:],
+            "tsb": ctl[:-1] - atl[:-1],
+        },
+        columns=TRAINING_LOAD_COLUMNS,
+    )
@@ -0,0 +1,73 @@
+# tests/test_clean_equivalence.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from assets.utils import create_dataframe
+from conftest import ACTIVITY_COUNT, reference_clean_data
+from modules.incremental import IncrementalCleaner
+from modules.processing import clean_data
+from modules.raw_store import RawActivityStore
+
+"""
+clean_data against the frozen row-by-row reference in conftest.py, and the other ways
+of cleaning against clean_data:
+
+- the Polars backend against pandas (skipped without polars),
+- the incremental cleaner against a full rebuild.
+"""
+
+FIXED = {
+    "suffer_score_bins": [0.0, 40.0, 90.0, 10_000.0],
+    "fill_values": {
+        "max_heartrate": 170.0,
+        "average_heartrate": 140.0,
+        "suffer_score": 50.0,
+    },
+}
+
+
+def test_clean_data_matches_reference(raw_df):
+    result = clean_data(raw_df)
+    expected = reference_clean_data(raw_df.copy())
+
+    # The means that fill the gaps are now correctly rounded sums (column_mean), which
+    # can differ from the reference's pandas sums in the last bit
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12)
+
+
+@pytest.mark.parametrize("kwargs", [{}, FIXED], ids=["own statistics", "fixed"])
+def test_polars_backend_matches_pandas(raw_csv, kwargs):
+    pytest.importorskip("polars")
+    from modules.backends import clean_with_backend
+
+    # Gaps in part of the columns, so the backends also agree on missing values
+    raw_df = create_dataframe(raw_csv)
+
+    pd.testing.assert_frame_equal(
+        clean_with_backend(raw_df, "polars", **kwargs),
+        clean_with_backend(raw_df, "pandas", **kwargs),
+        check_exact=True,
+    )
+
+
+def test_incremental_matches_full_rebuild(tmp_path, raw_df):
+    rng = np.random.default_rng(1)
+    store = RawActivityStore(str(tmp_path / "raw"))
+    state_dir = str(tmp_path / "state")
+
+    initial = ACTIVITY_COUNT - 60
+    store.upsert(raw_df.iloc[:initial])
+    IncrementalCleaner(state_dir).refresh(store)
+
+    for position in range(initial, ACTIVITY_COUNT, 20):
+        new = raw_df.iloc[position : position + 20]
+        changed = raw_df.iloc[rng.choice(position, 10)].copy()
+        changed["suffer_score"] = rng.integers(1, 600, 10).astype(float)
+        store.upsert(pd.concat([new, changed], ignore_index=True))
+        store.delete(rng.choice(store.read(columns=[])["id"], 5))
+
+        # A fresh cleaner, so the state is loaded from disk as in a new process
+        result = IncrementalCleaner(state_dir).refresh(store)
+        expected = clean_data(store.read())
+        pd.testing.assert_frame_equal(result, expected, check_exact=True)
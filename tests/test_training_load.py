@@ -0,0 +1,86 @@
+# tests/test_training_load.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.processing import clean_data
+from modules.training_load import TrainingLoad, compute_training_load, daily_loads
+
+"""
+The incremental training load (modules.training_load) against the full recompute with
+pandas ewm, for appends, refreshes and the decay up to a later day.
+"""
+
+
+@pytest.fixture(scope="module")
+def clean_df(raw_df):
+    return clean_data(raw_df)
+
+
+def assert_same(training_load: pd.DataFrame, expected: pd.DataFrame) -> None:
+    pd.testing.assert_series_equal(training_load["date"], expected["date"])
+    for column in ["load", "ctl", "atl", "tsb"]:
+        np.testing.assert_allclose(
+            training_load[column], expected[column], rtol=1e-9, atol=1e-9
+        )
+
+
+@pytest.mark.parametrize("load", ["suffer_score", "tss"])
+def test_appends_match_full_recompute(clean_df, load):
+    loads = daily_loads(clean_df, load)
+    training_load = TrainingLoad()
+    # Only the activity days, the days in between are filled with 0 load
+    for day, value in loads[loads > 0].items():
+        training_load.append(day, value)
+    assert_same(training_load.to_frame(), compute_training_load(loads.loc[:day]))
+
+
+def test_update_appends_new_days(clean_df):
+    loads = daily_loads(clean_df)
+    training_load = TrainingLoad()
+    assert training_load.update(loads.iloc[:-10]) == len(loads) - 10
+    assert training_load.update(loads) == 10
+    assert training_load.update(loads) == 0
+    assert_same(training_load.to_frame(), compute_training_load(loads))
+
+
+def test_update_recomputes_from_changed_day(clean_df):
+    loads = daily_loads(clean_df)
+    training_load = TrainingLoad()
+    training_load.update(loads)
+
+    changed = loads.copy()
+    changed.iloc[-30] += 50.0
+    assert training_load.update(changed) == 30
+    assert_same(training_load.to_frame(), compute_training_load(changed))
+
+    # The last activities deleted
+    shorter = changed.iloc[:-5]
+    assert training_load.update(shorter) == 0
+    assert_same(training_load.to_frame(), compute_training_load(shorter))
+
+
+def test_to_frame_decays_up_to_end(clean_df):
+    training_load = TrainingLoad()
+    training_load.update(daily_loads(clean_df))
+    last_day = pd.Timestamp(training_load.to_frame()["date"].iloc[-1])
+    end = last_day + pd.Timedelta(days=20)
+
+    expected = compute_training_load(daily_loads(clean_df, end=end))
+    assert_same(training_load.to_frame(end=end), expected)
+    assert len(training_load.to_frame()) == len(expected) - 20
+
+
+def test_update_of_copy_leaves_original(clean_df):
+    loads = daily_loads(clean_df)
+    training_load = TrainingLoad()
+    training_load.update(loads.iloc[:-10])
+    before = training_load.to_frame()
+
+    changed = loads.copy()
+    changed.iloc[-30] += 50.0
+    copied = training_load.copy()
+    copied.update(changed)
+
+    pd.testing.assert_frame_equal(training_load.to_frame(), before)
+    assert_same(copied.to_frame(), compute_training_load(changed))